@@ -0,0 +1,114 @@
+"""
+Measure the adaptive testing engine of `quizzes.adaptive` on simulated takers.
+
+Calibrates `--questions` questions from the answers of `--takers` simulated takers to
+`--answers-per-taker` random questions each, then runs adaptive attempts of `--length` questions
+with `--attempts` new takers on the calibrated item bank. Reports as JSON how well the calibration
+recovers the parameters, its time, the median and 99th percentile time of a step, ability estimate
+and question selection, and how close the final estimates are to the abilities of the takers:
+
+    python benchmarks/adaptive.py --questions 2000 --takers 20000 --length 30
+
+No database is needed, the answers are simulated in memory.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+
+from quizzes.adaptive import ItemBank, calibrate, probability  # noqa: E402
+
+
+def simulate_responses(rng, discrimination, difficulty, takers, answers_per_taker):
+    persons = np.repeat(np.arange(takers), answers_per_taker)
+    items = np.concatenate([
+        rng.choice(len(difficulty), answers_per_taker, replace=False) for _ in range(takers)
+    ])
+    theta = rng.normal(size=takers)
+    correct = rng.random(len(persons)) < probability(theta[persons], discrimination[items], difficulty[items])
+    return persons, items, correct
+
+
+def run_attempt(rng, bank, theta, length):
+    """
+    An adaptive attempt of a taker of ability `theta`, returns the final estimate and the step times.
+    """
+    asked, correct, step_times = [], [], []
+    available = np.arange(len(bank.question_ids))
+    estimate = 0.0
+    for _ in range(length):
+        started = time.perf_counter()
+        estimate, _ = bank.estimate_ability(np.array(asked, dtype=np.int64), np.array(correct, dtype=bool))
+        index = bank.most_informative(estimate, np.setdiff1d(available, asked, assume_unique=True))
+        step_times.append(time.perf_counter() - started)
+
+        asked.append(index)
+        correct.append(rng.random() < probability(theta, bank.discrimination[index], bank.difficulty[index]))
+    estimate, _ = bank.estimate_ability(np.array(asked, dtype=np.int64), np.array(correct, dtype=bool))
+    return estimate, step_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('--takers', type=int, default=20000)
+    parser.add_argument('--answers-per-taker', type=int, default=40)
+    parser.add_argument('--attempts', type=int, default=200)
+    parser.add_argument('--length', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    discrimination = rng.lognormal(0, 0.3, args.questions)
+    difficulty = rng.normal(0, 1, args.questions)
+    persons, items, correct = simulate_responses(rng, discrimination, difficulty, args.takers,
+                                                 args.answers_per_taker)
+
+    started = time.perf_counter()
+    estimated_discrimination, estimated_difficulty = calibrate(persons, items, correct, np.zeros(args.questions))
+    calibration_seconds = time.perf_counter() - started
+
+    bank = ItemBank(range(args.questions), estimated_discrimination, estimated_difficulty, {})
+    abilities = rng.normal(size=args.attempts)
+    estimates, step_times = [], []
+    for theta in abilities:
+        estimate, times = run_attempt(rng, bank, theta, args.length)
+        estimates.append(estimate)
+        step_times += times
+
+    step_times.sort()
+    report = {
+        'questions': args.questions,
+        'responses': len(persons),
+        'calibration': {
+            'seconds': round(calibration_seconds, 2),
+            'difficulty_correlation': round(float(np.corrcoef(difficulty, estimated_difficulty)[0, 1]), 3),
+            'discrimination_correlation': round(
+                float(np.corrcoef(discrimination, estimated_discrimination)[0, 1]), 3
+            ),
+        },
+        'attempts': args.attempts,
+        'length': args.length,
+        'step_ms': {
+            'median': round(statistics.median(step_times) * 1000, 3),
+            'p99': round(step_times[int(len(step_times) * 0.99)] * 1000, 3),
+        },
+        'ability_correlation': round(float(np.corrcoef(abilities, estimates)[0, 1]), 3),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
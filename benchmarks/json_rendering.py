@@ -0,0 +1,129 @@
+"""
+Compare DRF's `JSONRenderer` and `JSONParser` with the orjson based `ORJSONRenderer` and
+`ORJSONParser` on large payloads shaped like the quiz detail, question select and result detail
+responses.
+
+Reports the payload sizes and the median render and parse times of both as JSON, e.g.
+
+    python benchmarks/json_rendering.py --questions 2000 --repeat 20
+
+No database is needed, the payloads are built in memory.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from utils.parsers import ORJSONParser  # noqa: E402
+from utils.renderers import ORJSONRenderer  # noqa: E402
+
+
+def image(path):
+    return {size: f'https://qweasy.example/media/renditions/{path}-{size}.webp' for size in ('small', 'medium')}
+
+
+def question(index, answers):
+    return {
+        'id': index,
+        'category': index % 20,
+        'text': f'Which of the following statements about query number {index} is correct?',
+        'image': image(f'question-{index}') if index % 5 == 0 else None,
+        'answer_type': index % 3,
+        'difficulty': index % 3,
+        'answers': [
+            {'id': index * answers + i, 'text': f'Answer {i} to question {index}', 'image': None,
+             'is_correct': i == 0}
+            for i in range(answers)
+        ],
+        'score': 10,
+    }
+
+
+def payloads(questions, answers):
+    """
+    Serializer output shaped payloads by name, and one with the raw values the encoder converts.
+    """
+    now = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    quiz_detail = {
+        'id': 1, 'title': 'Large quiz', 'category': 1, 'time_limit': '00:30:00',
+        'questions': [question(index, answers) for index in range(questions)],
+    }
+    question_select = {'questions': quiz_detail['questions']}
+    result_detail = {
+        'id': 1, 'score': 87.5, 'time_taken': '00:12:31', 'feedback': 'Well done',
+        'submission_time': now.isoformat().replace('+00:00', 'Z'), 'user': 1, 'quiz': 1,
+        'answers': [
+            {'question': item['id'], 'selected_answers': item['answers'][:1],
+             'open_ended_answer': {'id': item['id'], 'answer_text': 'Because of the index.', 'score': None}}
+            for item in quiz_detail['questions']
+        ],
+    }
+    raw_values = [
+        {'id': index, 'overall_percentage': Decimal('87.25'), 'total_time_spent': timedelta(minutes=index),
+         'date_joined': now - timedelta(days=index)}
+        for index in range(questions)
+    ]
+    return {'quiz_detail': quiz_detail, 'question_select': question_select, 'result_detail': result_detail,
+            'raw_values': raw_values}
+
+
+def median_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def measure(data, repeat):
+    content = JSONRenderer().render(data)
+    render = {
+        'json': median_time(lambda: JSONRenderer().render(data), repeat),
+        'orjson': median_time(lambda: ORJSONRenderer().render(data), repeat),
+    }
+    parse = {
+        'json': median_time(lambda: JSONParser().parse(io.BytesIO(content)), repeat),
+        'orjson': median_time(lambda: ORJSONParser().parse(io.BytesIO(content)), repeat),
+    }
+    return {
+        'bytes': len(content),
+        'same_output': ORJSONRenderer().render(data) == content,
+        'render_ms': {name: round(seconds * 1000, 2) for name, seconds in render.items()},
+        'render_speedup': round(render['json'] / render['orjson'], 1),
+        'parse_ms': {name: round(seconds * 1000, 2) for name, seconds in parse.items()},
+        'parse_speedup': round(parse['json'] / parse['orjson'], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('--answers', type=int, default=4, help="Answers per question.")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    report = {'questions': args.questions, 'answers': args.answers, 'repeat': args.repeat, 'payloads': {}}
+    for name, data in payloads(args.questions, args.answers).items():
+        report['payloads'][name] = measure(data, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
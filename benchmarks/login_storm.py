@@ -0,0 +1,118 @@
+"""
+Measure the latency of an unrelated endpoint while a login storm is running.
+
+Start the sync and the ASGI servers against the same database, e.g.
+
+    gunicorn core.wsgi:application --workers 4 --bind 127.0.0.1:8000
+    gunicorn core.asgi:application -k uvicorn.workers.UvicornWorker --workers 4 --bind 127.0.0.1:8001
+
+then run
+
+    python benchmarks/login_storm.py --logins 400 --concurrency 32
+
+Probes go to the sync server in both runs, logins go to `/users/login/` of the sync server in the
+first run and to `/users/login/async/` of the ASGI server in the second, like the nginx routing.
+The benchmark user is created in the configured database and deleted afterwards.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+
+User = get_user_model()
+
+EMAIL = 'login-storm@qweasy.local'
+PASSWORD = 'login-storm-password'
+
+
+def request(url, data=None):
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            status = response.status
+            response.read()
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    return status, time.perf_counter() - started
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def storm(login_url, probe_url, logins, concurrency):
+    stop = threading.Event()
+    probe_latencies = []
+
+    def probe():
+        while not stop.is_set():
+            probe_latencies.append(request(probe_url)[1])
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(lambda _: request(login_url, {'email': EMAIL, 'password': PASSWORD}),
+                                    range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'logins_per_second': round(logins / elapsed, 1),
+        'login_statuses': statuses,
+        'login_p99_ms': round(percentile([latency for _, latency in results], 99) * 1000, 1),
+        'probes': len(probe_latencies),
+        'probe_p50_ms': round(statistics.median(probe_latencies) * 1000, 1),
+        'probe_p99_ms': round(percentile(probe_latencies, 99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sync-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--asgi-url', default='http://127.0.0.1:8001')
+    parser.add_argument('--probe-path', default='/schema/')
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    user = User.objects.create_user(email=EMAIL, password=PASSWORD)
+    probe_url = args.sync_url + args.probe_path
+    try:
+        report = {
+            'logins': args.logins,
+            'concurrency': args.concurrency,
+            'sync_login': storm(f'{args.sync_url}/users/login/', probe_url, args.logins, args.concurrency),
+            'async_login': storm(f'{args.asgi_url}/users/login/async/', probe_url, args.logins, args.concurrency),
+        }
+    finally:
+        user.delete()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Measure quiz link email throughput against a local aiosmtpd server.
+
+Compares opening one SMTP connection per message with the chunked `send_quiz_link_chunk` task,
+which reuses one connection for a whole chunk, and prints messages per second as JSON. The task
+runs eagerly in this process and writes its delivery rows, so use a scratch database:
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/quiz_emails.py --recipients 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from core.celery import app  # noqa: E402
+from quizzes.models import Category, Quiz, QuizEmailDelivery  # noqa: E402
+from utils.mail import build_quiz_link_message, send_quiz_link_chunk  # noqa: E402
+
+
+class CountingHandler:
+    def __init__(self):
+        self.messages = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return '250 Message accepted for delivery'
+
+
+def connection_per_message(emails, quiz):
+    for email in emails:
+        build_quiz_link_message(email, None, quiz.unique_link).send()
+
+
+def pooled_chunks(emails, quiz):
+    deliveries = QuizEmailDelivery.objects.bulk_create(QuizEmailDelivery(quiz=quiz, email=email) for email in emails)
+    delivery_ids = [delivery.id for delivery in deliveries]
+    chunk_size = settings.QUIZ_EMAIL_CHUNK_SIZE
+    for i in range(0, len(delivery_ids), chunk_size):
+        send_quiz_link_chunk.apply(args=[delivery_ids[i:i + chunk_size]])
+
+
+def measure(strategy, emails, quiz, handler):
+    handler.messages = 0
+    started = time.perf_counter()
+    strategy(emails, quiz)
+    elapsed = time.perf_counter() - started
+    return {
+        'messages': handler.messages,
+        'seconds': round(elapsed, 3),
+        'messages_per_second': round(handler.messages / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipients', type=int, default=500)
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=args.port)
+    controller.start()
+
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST, settings.EMAIL_PORT = '127.0.0.1', args.port
+    settings.EMAIL_USE_TLS, settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD = False, '', ''
+    # Remove the rate limit, the benchmark measures the transport.
+    settings.QUIZ_EMAIL_RATE_LIMIT = float('inf')
+    app.conf.task_always_eager = True
+
+    category = Category.objects.create(name='benchmark')
+    quiz = Quiz.objects.create(title='benchmark', category=category, time_limit=timedelta(minutes=30))
+    emails = [f'student{i}@qweasy.local' for i in range(args.recipients)]
+    try:
+        report = {
+            'recipients': args.recipients,
+            'chunk_size': settings.QUIZ_EMAIL_CHUNK_SIZE,
+            'connection_per_message': measure(connection_per_message, emails, quiz, handler),
+            'pooled_chunks': measure(pooled_chunks, emails, quiz, handler),
+        }
+    finally:
+        quiz.delete()
+        category.delete()
+        controller.stop()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Load test the main user flows against a running server and report throughput and latencies.
+
+Fill a scratch database with `manage.py generate_dataset`, start the application against it, e.g.
+
+    gunicorn core.wsgi:application --workers 4 --bind 127.0.0.1:8000
+
+then run
+
+    python benchmarks/scenarios.py --requests 2000 --concurrency 32 --output before.json
+    python benchmarks/scenarios.py --requests 2000 --concurrency 32 --baseline before.json
+
+Scenarios:
+
+    quiz_open          GET  /quiz/<link>/ of a random quiz, as a sensei
+    question_select    GET  /question/ filtered by a random category and difficulty, as a sensei
+    submit             POST /quiz/submit with answers to every question of a random quiz, as a noob
+    open_ended_review  POST /quiz/open-ended-review scoring an ungraded open-ended answer, as a sensei
+    result_history     GET  /quiz/user-results/<id>/ of a random noob, as a sensei
+    autosave           PATCH /quiz/attempt/<id>/ saving an answer to an open attempt of a random noob
+
+The report is JSON with the requests per second, the status codes and the p50, p95 and p99
+latencies of every scenario, labelled with the current commit. With `--baseline`, the relative
+change of the throughput and latencies to an earlier report is added. Requests go through the
+given URL, so the same runs can compare the sync and ASGI servers or nginx.
+
+Every request of `open_ended_review` grades another answer, so a run needs as many ungraded
+answers as requests and warmup requests; generate a new dataset once they are used up.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+
+from quizzes.attempts import start_attempt  # noqa: E402
+from quizzes.dataset import DATASET_EMAIL_DOMAIN, DATASET_LINK_PREFIX  # noqa: E402
+from quizzes.models import Answer, Category, OpenEndedAnswer, Question, Quiz  # noqa: E402
+from utils.token import create_custom_token  # noqa: E402
+
+User = get_user_model()
+
+SCENARIOS = ('quiz_open', 'question_select', 'submit', 'open_ended_review', 'result_history', 'autosave')
+
+# Quizzes whose questions are loaded for the submit scenario.
+SUBMIT_QUIZZES = 50
+
+
+def request(url, token, data=None, method=None):
+    body = json.dumps(data).encode() if data is not None else None
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+    req = urllib.request.Request(url, data=body, headers=headers, method=method)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            status = response.status
+            response.read()
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except urllib.error.URLError:
+        status = 'error'
+    return status, time.perf_counter() - started
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Dataset:
+    """
+    Ids of the generated dataset the scenarios pick their requests from.
+    """
+
+    def __init__(self, users=200):
+        dataset_users = User.objects.filter(email__endswith=f'@{DATASET_EMAIL_DOMAIN}')
+        senseis = list(dataset_users.filter(role='sensei')[:users])
+        noobs = list(dataset_users.filter(role='noob')[:users])
+        if not senseis or not noobs:
+            raise SystemExit("No dataset found, run `manage.py generate_dataset` first.")
+        self.sensei_tokens = [str(create_custom_token(user).access_token) for user in senseis]
+        self.noob_tokens = {user.id: str(create_custom_token(user).access_token) for user in noobs}
+
+        quizzes = Quiz.objects.filter(unique_link__startswith=DATASET_LINK_PREFIX)
+        self.quiz_links = list(quizzes.values_list('unique_link', flat=True))
+        self.category_ids = list(Category.objects.filter(quiz__in=quizzes).distinct().values_list('id', flat=True))
+        self.open_ended_answer_ids = list(
+            OpenEndedAnswer.objects
+            .filter(submitted_answer__quiz_result__user__in=noobs, score__isnull=True, lease_expires__isnull=True)
+            .values_list('id', flat=True)[:100000]
+        )
+        random.shuffle(self.open_ended_answer_ids)
+        self.submit_quizzes = self.load_submit_quizzes(quizzes.order_by('?')[:SUBMIT_QUIZZES])
+        self.attempts = {}
+
+    @staticmethod
+    def load_submit_quizzes(quizzes):
+        submit_quizzes = {}
+        for quiz in quizzes.prefetch_related('questions'):
+            submit_quizzes[quiz.id] = [(question.id, question.answer_type) for question in quiz.questions.all()]
+        question_ids = {question_id for questions in submit_quizzes.values() for question_id, _ in questions}
+        answers = {}
+        for question_id, answer_id in Answer.objects.filter(question_id__in=question_ids).values_list('question_id',
+                                                                                                     'id'):
+            answers.setdefault(question_id, []).append(answer_id)
+        return {
+            quiz_id: [
+                (question_id, answer_type, answers.get(question_id, [])) for question_id, answer_type in questions
+            ]
+            for quiz_id, questions in submit_quizzes.items()
+        }
+
+    def sensei_token(self):
+        return random.choice(self.sensei_tokens)
+
+    def ungraded_answer(self):
+        """
+        Id of an open-ended answer no other request has graded yet.
+        """
+        try:
+            return self.open_ended_answer_ids.pop()
+        except IndexError:
+            raise SystemExit("No ungraded open-ended answers left, run `manage.py generate_dataset` again.")
+
+    def attempt(self, user_id):
+        """
+        Id and questions of the open attempt of a noob at one of the submit quizzes, started on first use.
+        """
+        if user_id not in self.attempts:
+            quiz_id = random.choice([quiz_id for quiz_id, questions in self.submit_quizzes.items() if questions])
+            attempt, _ = start_attempt(User(pk=user_id), Quiz.objects.get(pk=quiz_id))
+            self.attempts[user_id] = (attempt.id, self.submit_quizzes[quiz_id])
+        return self.attempts[user_id]
+
+
+def quiz_open(dataset, base_url):
+    return request(f'{base_url}/quiz/{random.choice(dataset.quiz_links)}/', dataset.sensei_token())
+
+
+def question_select(dataset, base_url):
+    category = random.choice(dataset.category_ids)
+    difficulty = random.choice(Question.DifficultyLevel.values)
+    return request(f'{base_url}/question/?category={category}&difficulty={difficulty}&quantity=20',
+                   dataset.sensei_token())
+
+
+def submit(dataset, base_url):
+    user_id, token = random.choice(list(dataset.noob_tokens.items()))
+    quiz_id, questions = random.choice(list(dataset.submit_quizzes.items()))
+    answers = []
+    for question_id, answer_type, answer_ids in questions:
+        answer = {'question': question_id, 'answer_type': answer_type}
+        if answer_type == Question.AnswerType.OPEN_ENDED:
+            answer['open_ended_answer'] = 'Load test answer'
+        else:
+            answer['selected_answers'] = random.sample(answer_ids, 1) if answer_ids else []
+        answers.append(answer)
+    data = {'user': user_id, 'quiz': quiz_id, 'answers': answers, 'time_taken': '00:10:00',
+            'feedback': 'Load test'}
+    return request(f'{base_url}/quiz/submit', token, data)
+
+
+def open_ended_review(dataset, base_url):
+    # Graded answers can't be reviewed again, so every request grades another answer.
+    data = {'open_ended_answer_id': dataset.ungraded_answer(), 'score': 0}
+    return request(f'{base_url}/quiz/open-ended-review', dataset.sensei_token(), data)
+
+
+def result_history(dataset, base_url):
+    return request(f'{base_url}/quiz/user-results/{random.choice(list(dataset.noob_tokens))}/',
+                   dataset.sensei_token())
+
+
+def autosave(dataset, base_url):
+    user_id, token = random.choice(list(dataset.noob_tokens.items()))
+    attempt_id, questions = dataset.attempt(user_id)
+    question_id, answer_type, answer_ids = random.choice(questions)
+    answer = {'question': question_id}
+    if answer_type == Question.AnswerType.OPEN_ENDED:
+        answer['open_ended_answer'] = 'Load test answer'
+    else:
+        answer['selected_answers'] = random.sample(answer_ids, 1) if answer_ids else []
+    return request(f'{base_url}/quiz/attempt/{attempt_id}/', token, {'answers': [answer]}, method='PATCH')
+
+
+def run(scenario, dataset, base_url, requests, concurrency, warmup):
+    for _ in range(warmup):
+        scenario(dataset, base_url)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(lambda _: scenario(dataset, base_url), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    latencies = [latency for _, latency in results]
+    return {
+        'requests_per_second': round(requests / elapsed, 1),
+        'statuses': statuses,
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def compare(report, baseline):
+    """
+    Relative change of every metric to the baseline report, e.g. -0.1 for 10% less.
+    """
+    changes = {}
+    for name, metrics in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        changes[name] = {
+            metric: round(metrics[metric] / previous[metric] - 1, 3)
+            for metric in ('requests_per_second', 'p50_ms', 'p95_ms', 'p99_ms') if previous.get(metric)
+        }
+    return {'baseline': baseline.get('commit'), 'changes': changes}
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append',
+                        help="Scenario to run, may be repeated. All of them by default.")
+    parser.add_argument('--requests', type=int, default=1000, help="Requests per scenario.")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--warmup', type=int, default=20, help="Requests per scenario before measuring.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Also write the report to this file.")
+    parser.add_argument('--baseline', help="Report of an earlier run to compare with.")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    dataset = Dataset()
+    report = {
+        'commit': current_commit(),
+        'url': args.url,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'scenarios': {},
+    }
+    for name in args.scenario or SCENARIOS:
+        report['scenarios'][name] = run(globals()[name], dataset, args.url, args.requests, args.concurrency,
+                                        args.warmup)
+    if args.baseline:
+        with open(args.baseline) as file:
+            report['comparison'] = compare(report, json.load(file))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Compare the legacy (through table) and packed (`selected_answer_ids`) layouts of selected answers.
+
+Writes `--submissions` results of `--questions` multiple-choice questions in both layouts, then
+reports write time, read time and the on-disk growth of the answer tables as JSON. Run it against
+a scratch database, the rows it creates are deleted afterwards but the tables are not vacuumed:
+
+    python benchmarks/selected_answers.py --submissions 2000 --questions 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from quizzes.models import Answer, Category, Question, Quiz, Result, SelectedAnswer, SubmittedAnswer  # noqa: E402
+from quizzes.partitioning import table_size  # noqa: E402
+
+TABLES = ('quizzes_submittedanswer', 'quizzes_submittedanswer_selected_answers')
+
+
+def create_quiz(question_count):
+    category = Category.objects.create(name='benchmark')
+    quiz = Quiz.objects.create(title='benchmark', category=category, time_limit=timedelta(minutes=30))
+    questions = Question.objects.bulk_create(
+        Question(category=category, text=f'Question {i}', answer_type=Question.AnswerType.MULTIPLE_ANSWERS)
+        for i in range(question_count)
+    )
+    Answer.objects.bulk_create(
+        Answer(question=question, text=f'Answer {i}', is_correct=i % 2 == 0)
+        for question in questions for i in range(4)
+    )
+    quiz.questions.set(questions)
+    answers = {}
+    for answer in Answer.objects.filter(question__in=questions):
+        answers.setdefault(answer.question_id, []).append(answer.id)
+    return category, quiz, answers
+
+
+def write_submissions(user, quiz, answers, submissions, packed):
+    started = time.perf_counter()
+    for _ in range(submissions):
+        submission_time = timezone.now()
+        with transaction.atomic():
+            result = Result.objects.create(user=user, quiz=quiz, time_taken=timedelta(minutes=5),
+                                           submission_time=submission_time)
+            selections = {question_id: random.sample(answer_ids, 2) for question_id, answer_ids in answers.items()}
+            submitted = SubmittedAnswer.objects.bulk_create(
+                SubmittedAnswer(quiz_result=result, question_id=question_id, submission_time=submission_time,
+                                selected_answer_ids=selected if packed else None)
+                for question_id, selected in selections.items()
+            )
+            if not packed:
+                SelectedAnswer.objects.bulk_create(
+                    SelectedAnswer(submitted_answer=submitted_answer, answer_id=answer_id,
+                                   submission_time=submission_time)
+                    for submitted_answer, selected in zip(submitted, selections.values())
+                    for answer_id in selected
+                )
+    return time.perf_counter() - started
+
+
+def read_submissions(user):
+    started = time.perf_counter()
+    for result in Result.objects.filter(user=user).prefetch_related('answers'):
+        SubmittedAnswer.load_selected_answers(result.answers.all())
+    return time.perf_counter() - started
+
+
+def sizes():
+    with connection.cursor() as cursor:
+        return {table: table_size(cursor, table) for table in TABLES}
+
+
+def run_layout(quiz, answers, submissions, packed):
+    user = get_user_model().objects.create_user(email=f'benchmark-{time.time_ns()}@qweasy.local', password=None)
+    before = sizes()
+    write_seconds = write_submissions(user, quiz, answers, submissions, packed)
+    read_seconds = read_submissions(user)
+    after = sizes()
+    user.delete()
+    return {
+        'write_ms_per_submission': round(write_seconds * 1000 / submissions, 3),
+        'read_ms_per_submission': round(read_seconds * 1000 / submissions, 3),
+        'bytes_per_submission': {table: (after[table] - before[table]) // submissions for table in TABLES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submissions', type=int, default=500)
+    parser.add_argument('--questions', type=int, default=20)
+    args = parser.parse_args()
+
+    category, quiz, answers = create_quiz(args.questions)
+    try:
+        report = {
+            'submissions': args.submissions,
+            'questions': args.questions,
+            'legacy': run_layout(quiz, answers, args.submissions, packed=False),
+            'packed': run_layout(quiz, answers, args.submissions, packed=True),
+        }
+    finally:
+        quiz.delete()
+        Question.objects.filter(category=category).delete()
+        category.delete()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Compare the throughput and latency of the sync and the async read endpoints at high concurrency.
+
+Start the sync and the ASGI servers against the same database, e.g.
+
+    gunicorn core.wsgi:application --workers 4 --bind 127.0.0.1:8000
+    gunicorn core.asgi:application -k uvicorn.workers.UvicornWorker --workers 4 --bind 127.0.0.1:8001
+
+then run
+
+    python benchmarks/serving_modes.py --requests 2000 --concurrency 128
+
+Every endpoint is requested on its sync path on the sync server and on its `async/` path on the
+ASGI server, like the nginx routing. The benchmark data is created in the configured database and
+deleted afterwards.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import transaction  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from quizzes.models import Answer, Category, Question, QuestionScore, Quiz, Result  # noqa: E402
+from utils.token import create_custom_token  # noqa: E402
+
+User = get_user_model()
+
+EMAIL = 'serving-modes@qweasy.local'
+
+
+@transaction.atomic
+def create_fixture(questions, results):
+    user = User.objects.create_user(email=EMAIL, password='serving-modes-password', role='sensei',
+                                    status='accepted')
+    category = Category.objects.create(name='Serving modes benchmark')
+    question_objects = Question.objects.bulk_create(
+        Question(text=f'Question {index}', category=category, difficulty=index % 3) for index in range(questions)
+    )
+    Answer.objects.bulk_create(
+        Answer(question=question, text=f'Answer {index}', is_correct=index == 0)
+        for question in question_objects for index in range(4)
+    )
+    quiz = Quiz.objects.create(title='Serving modes benchmark', category=category, time_limit=timedelta(minutes=10))
+    quiz.questions.add(*question_objects)
+    QuestionScore.objects.bulk_create(
+        QuestionScore(quiz=quiz, question=question, score=1) for question in question_objects
+    )
+    now = timezone.now()
+    Result.objects.bulk_create(
+        Result(user=user, quiz=quiz, score=index % 100, time_taken=timedelta(minutes=5),
+               submission_time=now - timedelta(hours=index))
+        for index in range(results)
+    )
+    return user, category, quiz
+
+
+def delete_fixture(user, category, quiz):
+    Result.objects.filter(user=user).delete()
+    quiz.delete()
+    Question.objects.filter(category=category).delete()
+    category.delete()
+    user.delete()
+
+
+def request(url, token):
+    req = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            status = response.status
+            response.read()
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except urllib.error.URLError:
+        status = 'error'
+    return status, time.perf_counter() - started
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def load(url, token, requests, concurrency):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(lambda _: request(url, token), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    latencies = [latency for _, latency in results]
+    return {
+        'requests_per_second': round(requests / elapsed, 1),
+        'statuses': statuses,
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sync-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--asgi-url', default='http://127.0.0.1:8001')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=128)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--results', type=int, default=50)
+    args = parser.parse_args()
+
+    user, category, quiz = create_fixture(args.questions, args.results)
+    token = str(create_custom_token(user).access_token)
+    paths = {
+        'quiz_detail': f'/quiz/{quiz.unique_link}/',
+        'question_select': f'/question/?category={category.pk}&quantity={args.questions}',
+        'user_results': f'/quiz/user-results/{user.pk}/',
+    }
+    try:
+        report = {'requests': args.requests, 'concurrency': args.concurrency}
+        for name, path in paths.items():
+            path, _, query = path.partition('?')
+            query = f'?{query}' if query else ''
+            report[name] = {
+                'sync': load(f'{args.sync_url}{path}{query}', token, args.requests, args.concurrency),
+                'async': load(f'{args.asgi_url}{path}async/{query}', token, args.requests, args.concurrency),
+            }
+    finally:
+        delete_fixture(user, category, quiz)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
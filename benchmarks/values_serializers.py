@@ -0,0 +1,147 @@
+"""
+Compare the DRF serializers of the question select, quiz list and result list endpoints with the
+`.values()` based serializers standing in for them.
+
+Creates `--questions` questions with 4 answers each, `--quizzes` quizzes of all of them and
+`--results` results, then reports the median time to serialize them with both, queries included,
+as JSON. Run it against a scratch database, the rows it creates are deleted afterwards:
+
+    python benchmarks/values_serializers.py --questions 1000 --quizzes 5 --results 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from quizzes.models import Answer, Category, Question, QuestionScore, Quiz, Result  # noqa: E402
+from quizzes.serializers import QuestionSerializer, QuestionValuesSerializer, QuizDetailSerializer, \
+    QuizValuesSerializer, UserResultListSerializer, UserResultValuesSerializer  # noqa: E402
+from quizzes.views import QuestionSelectView, UserResultListView  # noqa: E402
+from utils.renderers import ORJSONRenderer  # noqa: E402
+
+
+def create_data(question_count, quiz_count, result_count):
+    category = Category.objects.create(name='benchmark')
+    questions = Question.objects.bulk_create(
+        Question(category=category, text=f'Question {i}', difficulty=i % 3, answer_type=i % 2)
+        for i in range(question_count)
+    )
+    Answer.objects.bulk_create(
+        Answer(question=question, text=f'Answer {i}', is_correct=i == 0)
+        for question in questions for i in range(4)
+    )
+    quizzes = Quiz.objects.bulk_create(
+        Quiz(title=f'benchmark {i}', category=category, time_limit=timedelta(minutes=30), unique_link=f'bench-{i}')
+        for i in range(quiz_count)
+    )
+    for quiz in quizzes:
+        quiz.questions.set(questions)
+        QuestionScore.objects.bulk_create(
+            QuestionScore(quiz=quiz, question=question, score=1) for question in questions
+        )
+
+    user = get_user_model().objects.create_user(email=f'benchmark-{time.time_ns()}@qweasy.local', password=None)
+    now = timezone.now()
+    Result.objects.bulk_create(
+        Result(user=user, quiz=quizzes[i % quiz_count], score=i % 10, time_taken=timedelta(minutes=5),
+               submission_time=now - timedelta(minutes=i))
+        for i in range(result_count)
+    )
+    return category, user
+
+
+def delete_data(category, user):
+    Result.objects.filter(user=user).delete()
+    user.delete()
+    Quiz.objects.filter(category=category).delete()
+    Question.objects.filter(category=category).delete()
+    category.delete()
+
+
+def median_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def measure(serialize, serialize_values, repeat):
+    same = ORJSONRenderer().render(serialize()) == ORJSONRenderer().render(serialize_values())
+    serializer_seconds = median_time(serialize, repeat)
+    values_seconds = median_time(serialize_values, repeat)
+    return {
+        'same_output': same,
+        'serializer_ms': round(serializer_seconds * 1000, 2),
+        'values_ms': round(values_seconds * 1000, 2),
+        'speedup': round(serializer_seconds / values_seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=1000)
+    parser.add_argument('--quizzes', type=int, default=5)
+    parser.add_argument('--results', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    category, user = create_data(args.questions, args.quizzes, args.results)
+    try:
+        context = {'request': Request(APIRequestFactory().get('/'))}
+
+        def questions():
+            return QuestionSelectView.select_questions(user, {'category': category.id})
+
+        def quizzes():
+            return Quiz.objects.filter(category=category)
+
+        def results():
+            return UserResultListView.filter_results(user.id, {})
+
+        report = {
+            'questions': args.questions,
+            'quizzes': args.quizzes,
+            'results': args.results,
+            'repeat': args.repeat,
+            'question_select': measure(
+                lambda: QuestionSerializer(questions(), many=True).data,
+                lambda: QuestionValuesSerializer(questions()).data,
+                args.repeat,
+            ),
+            'quiz_list': measure(
+                lambda: QuizDetailSerializer(quizzes().prefetch_related(*QuizDetailSerializer.prefetch), many=True,
+                                             context=context).data,
+                lambda: QuizValuesSerializer(quizzes(), context=context).data,
+                args.repeat,
+            ),
+            'user_results': measure(
+                lambda: UserResultListSerializer(results(), many=True).data,
+                lambda: UserResultValuesSerializer(results()).data,
+                args.repeat,
+            ),
+        }
+    finally:
+        delete_data(category, user)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
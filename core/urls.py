@@ -1,18 +1,24 @@
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from drf_spectacular.views import SpectacularSwaggerView, SpectacularRedocView
 
 from core import settings
+from utils.views import CacheMetricsView, DatabaseMetricsView, PrometheusMetricsView, ProtectedMediaView, SchemaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls', namespace='users')),
     path('', include('quizzes.urls')),
 
-    path('schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('schema/', SchemaView.as_view(), name='schema'),
     path('docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('cache/metrics/', CacheMetricsView.as_view(), name='cache-metrics'),
+    path('db/metrics/', DatabaseMetricsView.as_view(), name='database-metrics'),
+    path('metrics', PrometheusMetricsView.as_view(), name='prometheus-metrics'),
+    path(f'{settings.PROTECTED_MEDIA_URL.lstrip("/")}<path:path>', ProtectedMediaView.as_view(),
+         name='protected-media'),
 ]
 
 if settings.DEBUG:
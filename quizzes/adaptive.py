@@ -0,0 +1,311 @@
+"""
+Computerized adaptive testing.
+
+Questions are modelled with the two-parameter logistic model of item response theory: a taker of
+ability `theta` answers a question of `discrimination` a and `difficulty` b correctly with the
+probability 1 / (1 + exp(-a * (theta - b))). An answer is correct when exactly the correct answers
+of the question are selected; open-ended questions are graded later and are never asked adaptively.
+
+The `calibrate_item_parameters` task estimates the parameters of the questions of every category
+from their submitted answers, each result being one taker, and stores them as `ItemParameters`.
+Questions without enough answers are held close to the difficulty their author chose.
+
+The calibrated questions of a category are loaded once per process into an `ItemBank` of arrays.
+An adaptive attempt asks `Quiz.adaptive_length` of the questions of the quiz in its category: every
+step estimates the ability of the taker from the answers so far and asks the question which is the
+most informative at that ability, see `next_question()`.
+"""
+import logging
+
+import numpy as np
+from celery import shared_task
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from quizzes.attempts import administer_question, get_attempt
+from quizzes.models import Answer, Category, ItemParameters, Question, SubmittedAnswer
+from utils.cache import LocalLRUCache, tagged_cache
+
+logger = logging.getLogger(__name__)
+
+CHOICE_ANSWER_TYPES = (Question.AnswerType.ONE_ANSWER, Question.AnswerType.MULTIPLE_ANSWERS)
+
+# Difficulty of the questions which have not been calibrated, by their difficulty level. It is also
+# the prior mean of their calibrated difficulty.
+DIFFICULTY_PRIORS = {
+    Question.DifficultyLevel.EASY: -1.0,
+    Question.DifficultyLevel.MEDIUM: 0.0,
+    Question.DifficultyLevel.HARD: 1.0,
+}
+# Standard deviations of the priors of the calibration: abilities are standard normal, the
+# discrimination is around 1 and the intercept around the one of the difficulty level.
+DISCRIMINATION_PRIOR_SD = 0.5
+INTERCEPT_PRIOR_SD = 1.5
+DISCRIMINATION_BOUNDS = (0.2, 4.0)
+
+# Abilities at which the posterior of the ability of a taker is evaluated.
+ABILITY_GRID = np.linspace(-4, 4, 81)
+ABILITY_LOG_PRIOR = -ABILITY_GRID ** 2 / 2
+
+
+def probability(theta, discrimination, difficulty):
+    """
+    Probability of a correct answer, broadcast over the arguments.
+    """
+    return 1 / (1 + np.exp(-np.clip(discrimination * (theta - difficulty), -30, 30)))
+
+
+def is_correct(selected_answers, correct_answers):
+    return bool(correct_answers) and set(selected_answers) == correct_answers
+
+
+def calibrate(persons, items, correct, prior_difficulty, iterations=None, tolerance=1e-4):
+    """
+    Estimate the discrimination and difficulty of items from responses, the arrays `persons` and
+    `items` of indices and `correct`. `prior_difficulty` has the prior difficulty of every item.
+
+    Joint maximum a posteriori estimation: the abilities and the item parameters are updated in
+    turn by Newton steps until no parameter changes by more than `tolerance`. The abilities are
+    standardized after every step, so that the item parameters are on the scale of the takers.
+    """
+    iterations = settings.ADAPTIVE_CALIBRATION_ITERATIONS if iterations is None else iterations
+    item_count = len(prior_difficulty)
+    person_count = int(persons.max()) + 1 if len(persons) else 0
+    outcomes = correct.astype(float)
+
+    theta = np.zeros(person_count)
+    discrimination = np.ones(item_count)
+    # The logit is `discrimination * theta + intercept`, the difficulty is `-intercept / discrimination`.
+    prior_intercept = -np.asarray(prior_difficulty, dtype=float)
+    intercept = prior_intercept.copy()
+
+    for _ in range(iterations):
+        a = discrimination[items]
+        p = probability(theta[persons], a, -intercept[items] / a)
+        residual = outcomes - p
+        weight = p * (1 - p)
+        theta_step = (
+            (np.bincount(persons, a * residual, person_count) - theta)
+            / (np.bincount(persons, a ** 2 * weight, person_count) + 1)
+        )
+        theta += theta_step
+        # The abilities fix the scale of the parameters, which the priors alone would let shrink.
+        if person_count > 1 and theta.std() > 0:
+            theta = (theta - theta.mean()) / theta.std()
+
+        p = probability(theta[persons], a, -intercept[items] / a)
+        residual = outcomes - p
+        weight = p * (1 - p)
+        intercept_step = (
+            (np.bincount(items, residual, item_count) - (intercept - prior_intercept) / INTERCEPT_PRIOR_SD ** 2)
+            / (np.bincount(items, weight, item_count) + 1 / INTERCEPT_PRIOR_SD ** 2)
+        )
+        person_theta = theta[persons]
+        discrimination_step = (
+            (np.bincount(items, person_theta * residual, item_count)
+             - (discrimination - 1) / DISCRIMINATION_PRIOR_SD ** 2)
+            / (np.bincount(items, person_theta ** 2 * weight, item_count) + 1 / DISCRIMINATION_PRIOR_SD ** 2)
+        )
+        intercept += intercept_step
+        discrimination = np.clip(discrimination + discrimination_step, *DISCRIMINATION_BOUNDS)
+
+        if max(np.abs(theta_step).max(initial=0), np.abs(intercept_step).max(initial=0),
+               np.abs(discrimination_step).max(initial=0)) < tolerance:
+            break
+
+    return discrimination, -intercept / discrimination
+
+
+def category_responses(category_id):
+    """
+    The submitted answers to the choice questions of a category, as the arrays of result ids,
+    question ids and whether they are correct. Submissions which are not packed are left out.
+    """
+    correct_answers = {}
+    for question_id, answer_id in Answer.objects.filter(
+            question__category_id=category_id, is_correct=True).values_list('question_id', 'id'):
+        correct_answers.setdefault(question_id, set()).add(answer_id)
+
+    rows = SubmittedAnswer.objects.filter(
+        question__category_id=category_id,
+        question__answer_type__in=CHOICE_ANSWER_TYPES,
+        selected_answer_ids__isnull=False,
+    ).values_list('quiz_result_id', 'question_id', 'selected_answer_ids')
+
+    results, questions, correct = [], [], []
+    for result_id, question_id, selected_answer_ids in rows.iterator(
+            chunk_size=settings.ADAPTIVE_CALIBRATION_CHUNK_SIZE):
+        results.append(result_id)
+        questions.append(question_id)
+        correct.append(is_correct(selected_answer_ids, correct_answers.get(question_id)))
+    return np.array(results, dtype=np.int64), np.array(questions, dtype=np.int64), np.array(correct, dtype=bool)
+
+
+def calibrate_category(category_id):
+    """
+    Calibrate the questions of a category which have been answered and store their parameters.
+    Returns how many were calibrated.
+    """
+    results, questions, correct = category_responses(category_id)
+    if not len(questions):
+        return 0
+
+    question_ids, items = np.unique(questions, return_inverse=True)
+    _, persons = np.unique(results, return_inverse=True)
+    levels = dict(Question.objects.filter(pk__in=question_ids.tolist()).values_list('id', 'difficulty'))
+    prior_difficulty = [DIFFICULTY_PRIORS.get(levels.get(question_id), 0.0) for question_id in question_ids.tolist()]
+
+    discrimination, difficulty = calibrate(persons, items, correct, prior_difficulty)
+
+    now = timezone.now()
+    responses = np.bincount(items, minlength=len(question_ids))
+    ItemParameters.objects.bulk_create(
+        [
+            ItemParameters(question_id=question_id, discrimination=float(discrimination[index]),
+                           difficulty=float(difficulty[index]), responses=int(responses[index]),
+                           date_calibrated=now)
+            for index, question_id in enumerate(question_ids.tolist())
+        ],
+        update_conflicts=True,
+        unique_fields=['question'],
+        update_fields=['discrimination', 'difficulty', 'responses', 'date_calibrated'],
+    )
+    tagged_cache.invalidate(item_bank_tag(category_id))
+    return len(question_ids)
+
+
+@shared_task(serializer='json', name="calibrate_item_parameters")
+def calibrate_item_parameters():
+    """
+    Calibrate the questions of every category with submitted answers. Returns how many questions
+    were calibrated, categories which fail are logged and left to the next run.
+    """
+    calibrated = 0
+    category_ids = Category.objects.annotate(
+        questions=Count('question')
+    ).filter(questions__gt=0).values_list('id', flat=True)
+    for category_id in category_ids:
+        try:
+            calibrated += calibrate_category(category_id)
+        except Exception:
+            logger.exception('Could not calibrate the questions of category %s', category_id)
+    return calibrated
+
+
+class ItemBank:
+    """
+    The parameters of the choice questions of a category, as arrays indexed like `question_ids`,
+    and their correct answers. Uncalibrated questions have the priors of their difficulty level.
+    """
+
+    def __init__(self, question_ids, discrimination, difficulty, correct_answers):
+        self.question_ids = np.asarray(question_ids, dtype=np.int64)
+        self.discrimination = np.asarray(discrimination, dtype=float)
+        self.difficulty = np.asarray(difficulty, dtype=float)
+        self.correct_answers = correct_answers
+        self.index = {question_id: index for index, question_id in enumerate(self.question_ids.tolist())}
+
+    @classmethod
+    def load(cls, category_id):
+        rows = list(
+            Question.objects.filter(
+                category_id=category_id, answer_type__in=CHOICE_ANSWER_TYPES
+            ).order_by('id').values_list(
+                'id', 'difficulty', 'item_parameters__discrimination', 'item_parameters__difficulty'
+            )
+        )
+        correct_answers = {}
+        for question_id, answer_id in Answer.objects.filter(
+                question__category_id=category_id, question__answer_type__in=CHOICE_ANSWER_TYPES,
+                is_correct=True).values_list('question_id', 'id'):
+            correct_answers.setdefault(question_id, set()).add(answer_id)
+        return cls(
+            [row[0] for row in rows],
+            [1.0 if row[2] is None else row[2] for row in rows],
+            [DIFFICULTY_PRIORS.get(row[1], 0.0) if row[3] is None else row[3] for row in rows],
+            correct_answers,
+        )
+
+    def indices(self, question_ids):
+        return np.array([self.index[question_id] for question_id in question_ids if question_id in self.index],
+                        dtype=np.int64)
+
+    def estimate_ability(self, indices, correct):
+        """
+        Expected a posteriori ability and its standard error given the answers to the questions at
+        `indices`, with a standard normal prior.
+        """
+        p = probability(ABILITY_GRID[:, np.newaxis], self.discrimination[indices], self.difficulty[indices])
+        log_posterior = ABILITY_LOG_PRIOR + np.where(correct, np.log(p), np.log1p(-p)).sum(axis=1)
+        posterior = np.exp(log_posterior - log_posterior.max())
+        posterior /= posterior.sum()
+        theta = float(posterior @ ABILITY_GRID)
+        return theta, float(np.sqrt(posterior @ (ABILITY_GRID - theta) ** 2))
+
+    def most_informative(self, theta, indices):
+        """
+        The index among `indices` of the question with the highest Fisher information at `theta`.
+        """
+        a = self.discrimination[indices]
+        p = probability(theta, a, self.difficulty[indices])
+        return int(indices[np.argmax(a ** 2 * p * (1 - p))])
+
+
+_item_banks = LocalLRUCache(settings.ADAPTIVE_ITEM_BANK_CACHE_SIZE, settings.ADAPTIVE_ITEM_BANK_TTL)
+
+
+def item_bank_tag(category_id):
+    return f'item-bank:{category_id}'
+
+
+def get_item_bank(category_id):
+    """
+    The item bank of a category, loaded at most once per process until it is invalidated by a
+    calibration or a change of a question of the category.
+    """
+    [version] = tagged_cache.get_tag_versions([item_bank_tag(category_id)])
+    key = (category_id, version)
+    bank = _item_banks.get(key)
+    if bank is None:
+        bank = ItemBank.load(category_id)
+        _item_banks.set(key, bank)
+    return bank
+
+
+def next_question(attempt, quiz):
+    """
+    The question to ask next in an adaptive attempt at `quiz`, and the ability estimate and its
+    standard error from the answers so far. The question is None once `Quiz.adaptive_length`
+    questions have been answered or no question is left.
+
+    The current question is returned again until it is answered.
+    """
+    bank = get_item_bank(quiz.category_id)
+    answered = {question_id: answer for question_id, answer in attempt.answers.items() if answer}
+    indices = bank.indices(answered)
+    correct = np.array([
+        is_correct(answered[question_id].get('selected_answers', ()), bank.correct_answers.get(question_id))
+        for question_id in bank.question_ids[indices].tolist()
+    ], dtype=bool)
+    theta, standard_error = bank.estimate_ability(indices, correct)
+
+    if attempt.current_question_id is not None and attempt.current_question_id not in answered:
+        return attempt.current_question_id, theta, standard_error
+    if len(answered) >= quiz.adaptive_length:
+        return None, theta, standard_error
+
+    available = np.setdiff1d(bank.indices(quiz.questions.values_list('id', flat=True)),
+                             bank.indices(attempt.answers), assume_unique=True)
+    if not len(available):
+        return None, theta, standard_error
+
+    question_id = int(bank.question_ids[bank.most_informative(theta, available)])
+    if not administer_question(attempt, question_id):
+        # Another request has asked a question since the attempt was read, it is asked again.
+        attempt = get_attempt(attempt.id)
+        if attempt is None:
+            raise NotFound('Attempt not found')
+        return next_question(attempt, quiz)
+    return question_id, theta, standard_error
@@ -5,7 +5,9 @@ from quizzes.models import (
     Question,
     Answer,
     Quiz,
-    QuestionScore
+    QuestionScore,
+    QuizEmailDelivery,
+    ItemParameters
 )
 
 
@@ -33,3 +35,14 @@ class AnswerInlineAdmin(admin.TabularInline):
 class QuestionAdmin(admin.ModelAdmin):
     list_display = ['text']
     inlines = [AnswerInlineAdmin]
+
+
+@admin.register(QuizEmailDelivery)
+class QuizEmailDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['email', 'quiz', 'status', 'attempts', 'date_updated']
+    list_filter = ['status']
+
+
+@admin.register(ItemParameters)
+class ItemParametersAdmin(admin.ModelAdmin):
+    list_display = ['question', 'discrimination', 'difficulty', 'responses', 'date_calibrated']
@@ -0,0 +1,333 @@
+"""
+Timed quiz attempts, kept in Redis until they are submitted.
+
+Starting a quiz opens an attempt with a deadline of `Quiz.time_limit` measured by the server. The
+answers are autosaved to the attempt without touching the database, so that a client which crashed
+can resume where it stopped, until the attempt is submitted or its deadline passes. Submitting the
+attempt, or the `flush_expired_attempts` sweep once the deadline has passed, writes it as a
+`Result` with its submitted answers in one transaction.
+
+Every key is prefixed with `ATTEMPT_KEY_PREFIX`. The attempt is kept until it is flushed, the id of
+the open attempt of a user expires `ATTEMPT_GRACE` seconds after the deadline:
+
+    <prefix>:<id>                     Hash of the attempt: its `user`, `quiz`, `started_at` and
+                                      `deadline`, and an `answer:<question id>` field for every
+                                      question of the quiz, empty until the question is answered.
+                                      Attempts at adaptive quizzes only have the fields of the
+                                      questions asked so far, and the `current` question.
+    <prefix>:user:<user>:quiz:<quiz>  Id of the open attempt of a user at a quiz.
+    <prefix>:deadlines                Sorted set of the open attempts by deadline. Removing an
+                                      attempt from it claims its flush.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import redis
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+
+from quizzes.models import Answer, Question, Quiz
+from quizzes.monitoring import autosaved_message, monitor_channel, publish_started, publish_submitted
+from quizzes.results import save_result
+
+logger = logging.getLogger(__name__)
+
+ANSWER_FIELD_PREFIX = 'answer:'
+
+# Saves answers if the attempt belongs to the user, is not over and the questions are part of it,
+# and publishes the autosave to the monitor channel of its quiz.
+# KEYS: the attempt. ARGV: the user id, the current time, the prefix of the monitor channels, the
+# autosave event, then pairs of answer fields and answers.
+SAVE_ANSWERS_SCRIPT = """
+local attempt = redis.call('HMGET', KEYS[1], 'user', 'deadline', 'quiz')
+if attempt[1] ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[2]) > tonumber(attempt[2]) then
+    return -1
+end
+for i = 5, #ARGV, 2 do
+    if redis.call('HEXISTS', KEYS[1], ARGV[i]) == 0 then
+        return -2
+    end
+end
+for i = 5, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('PUBLISH', ARGV[3] .. attempt[3], ARGV[4])
+return 1
+"""
+
+# Asks the next question of an adaptive attempt if it belongs to the user, is not over and its
+# current question is still the one the next question was chosen after.
+# KEYS: the attempt. ARGV: the user id, the current time, the current question or an empty string,
+# then the next question and its answer field.
+ADMINISTER_QUESTION_SCRIPT = """
+local attempt = redis.call('HMGET', KEYS[1], 'user', 'deadline', 'current')
+if attempt[1] ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[2]) > tonumber(attempt[2]) then
+    return -1
+end
+if (attempt[3] or '') ~= ARGV[3] then
+    return -2
+end
+redis.call('HSET', KEYS[1], 'current', ARGV[4])
+redis.call('HSETNX', KEYS[1], ARGV[5], '')
+return 1
+"""
+
+
+class AttemptOver(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The time limit of the attempt is over.'
+    default_code = 'attempt_over'
+
+
+@lru_cache(maxsize=None)
+def get_redis():
+    return redis.Redis.from_url(settings.ATTEMPT_REDIS_URL, decode_responses=True)
+
+
+@lru_cache(maxsize=None)
+def get_save_answers_script():
+    # Runs with EVALSHA, the script is only sent again after a restart of Redis.
+    return get_redis().register_script(SAVE_ANSWERS_SCRIPT)
+
+
+@lru_cache(maxsize=None)
+def get_administer_question_script():
+    return get_redis().register_script(ADMINISTER_QUESTION_SCRIPT)
+
+
+def attempt_key(attempt_id):
+    return f'{settings.ATTEMPT_KEY_PREFIX}:{attempt_id}'
+
+
+def user_attempt_key(user_id, quiz_id):
+    return f'{settings.ATTEMPT_KEY_PREFIX}:user:{user_id}:quiz:{quiz_id}'
+
+
+def deadlines_key():
+    return f'{settings.ATTEMPT_KEY_PREFIX}:deadlines'
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(float(value), tz=timezone.utc)
+
+
+class Attempt:
+    """
+    An open attempt, as stored in Redis. `answers` are the saved answers by question id, None for
+    the questions which have not been answered. `current_question_id` is the question asked last in
+    an adaptive attempt.
+    """
+
+    def __init__(self, attempt_id, fields):
+        self.id = attempt_id
+        self.user_id = int(fields['user'])
+        self.quiz_id = int(fields['quiz'])
+        self.started_at = _timestamp(fields['started_at'])
+        self.deadline = _timestamp(fields['deadline'])
+        self.current_question_id = int(fields['current']) if fields.get('current') else None
+        self.answers = {
+            int(name[len(ANSWER_FIELD_PREFIX):]): json.loads(value) if value else None
+            for name, value in fields.items() if name.startswith(ANSWER_FIELD_PREFIX)
+        }
+
+    @property
+    def time_taken(self):
+        """
+        Time from the start of the attempt to now, or to its deadline once it is over.
+        """
+        return min(_timestamp(time.time()), self.deadline) - self.started_at
+
+    def to_representation(self):
+        remaining = (self.deadline - _timestamp(time.time())).total_seconds()
+        return {
+            'id': self.id,
+            'quiz': self.quiz_id,
+            'started_at': self.started_at.isoformat().replace('+00:00', 'Z'),
+            'deadline': self.deadline.isoformat().replace('+00:00', 'Z'),
+            'remaining_seconds': max(int(remaining), 0),
+            'answers': [
+                {'question': question_id, **answer}
+                for question_id, answer in self.answers.items() if answer
+            ],
+        }
+
+
+def start_attempt(user, quiz):
+    """
+    Open an attempt of `user` at `quiz`. Returns the attempt and whether it was created, the open
+    attempt is returned instead if the user has one at the quiz.
+    """
+    client = get_redis()
+    # The questions of adaptive attempts are added as they are asked, see `administer_question()`.
+    question_ids = [] if quiz.adaptive_length else list(quiz.questions.values_list('id', flat=True))
+    while True:
+        attempt_id = uuid.uuid4().hex
+        started_at = time.time()
+        deadline = started_at + quiz.time_limit.total_seconds()
+        ttl = int(quiz.time_limit.total_seconds()) + settings.ATTEMPT_GRACE
+
+        if client.set(user_attempt_key(user.pk, quiz.pk), attempt_id, nx=True, ex=ttl):
+            fields = {
+                'user': user.pk, 'quiz': quiz.pk, 'started_at': repr(started_at), 'deadline': repr(deadline),
+                **{f'{ANSWER_FIELD_PREFIX}{question_id}': '' for question_id in question_ids},
+            }
+            with client.pipeline() as pipeline:
+                # No expiry, the answers would be lost if the sweep fell behind. Flushing deletes it.
+                pipeline.hset(attempt_key(attempt_id), mapping=fields)
+                pipeline.zadd(deadlines_key(), {attempt_id: deadline})
+                pipeline.execute()
+            attempt = Attempt(attempt_id, {key: str(value) for key, value in fields.items()})
+            publish_started(client, attempt)
+            return attempt, True
+
+        open_attempt_id = client.get(user_attempt_key(user.pk, quiz.pk))
+        attempt = get_attempt(open_attempt_id, user) if open_attempt_id else None
+        if attempt is not None:
+            return attempt, False
+        # The open attempt has just been submitted or has expired.
+        client.delete(user_attempt_key(user.pk, quiz.pk))
+
+
+def get_attempt(attempt_id, user=None):
+    """
+    The open attempt `attempt_id`, of `user` if given, or None.
+    """
+    fields = get_redis().hgetall(attempt_key(attempt_id))
+    if not fields or (user is not None and fields['user'] != str(user.pk)):
+        return None
+    return Attempt(attempt_id, fields)
+
+
+def save_answers(attempt_id, user, answers):
+    """
+    Autosave the `answers` of `user` to the attempt, dicts with the `question` and its
+    `selected_answers` or `open_ended_answer`. Answers replace the saved answers to their questions.
+    """
+    # The quiz of the attempt is only known to the script, which appends it to the channel prefix.
+    args = [user.pk, repr(time.time()), monitor_channel(''),
+            autosaved_message(user.pk, attempt_id, [answer['question'] for answer in answers])]
+    for answer in answers:
+        value = {key: answer[key] for key in ('selected_answers', 'open_ended_answer') if key in answer}
+        args += [f'{ANSWER_FIELD_PREFIX}{answer["question"]}', json.dumps(value, separators=(',', ':'))]
+
+    saved = get_save_answers_script()(keys=[attempt_key(attempt_id)], args=args)
+    if saved == 0:
+        raise NotFound('Attempt not found')
+    if saved == -1:
+        raise AttemptOver()
+    if saved == -2:
+        raise ValidationError({'answers': ['Every question must be a question of the quiz.']})
+
+
+def administer_question(attempt, question_id):
+    """
+    Make `question_id` the current question of the adaptive attempt, which it can be answered to.
+    Returns False if the current question of the attempt has changed since it was read.
+    """
+    args = [attempt.user_id, repr(time.time()), attempt.current_question_id or '',
+            question_id, f'{ANSWER_FIELD_PREFIX}{question_id}']
+    administered = get_administer_question_script()(keys=[attempt_key(attempt.id)], args=args)
+    if administered == 0:
+        raise NotFound('Attempt not found')
+    if administered == -1:
+        raise AttemptOver()
+    return administered == 1
+
+
+def submission_answers(attempt):
+    """
+    The saved answers of the attempt as `save_result()` takes them. Every choice question of the
+    attempt is part of them, with no selected answers if it has not been answered, so that it counts
+    towards the max score. Unanswered open-ended questions, answers of the wrong kind for their
+    question and answers which are not choices of their question are left out.
+    """
+    answers_by_question = {question_id: answer or {} for question_id, answer in attempt.answers.items()}
+    questions = Question.objects.in_bulk(answers_by_question)
+    choices = Answer.objects.filter(question_id__in=questions).in_bulk(
+        {answer_id for answer in answers_by_question.values() for answer_id in answer.get('selected_answers', ())}
+    )
+
+    answers = []
+    for question_id, answer in answers_by_question.items():
+        question = questions.get(question_id)
+        if question is None:
+            continue
+        if question.answer_type == Question.AnswerType.OPEN_ENDED:
+            if answer.get('open_ended_answer'):
+                answers.append({'question': question, 'answer_type': question.answer_type,
+                                'open_ended_answer': answer['open_ended_answer']})
+            continue
+        selected = [
+            choices[answer_id] for answer_id in dict.fromkeys(answer.get('selected_answers', ()))
+            if answer_id in choices and choices[answer_id].question_id == question_id
+        ]
+        answers.append({'question': question, 'answer_type': question.answer_type, 'selected_answers': selected})
+    return answers
+
+
+def flush_attempt(attempt_id, feedback='', expired=False):
+    """
+    Write the attempt to the database as a `Result` and close it. Returns the result and the score,
+    or None if the attempt has already been flushed or has expired. `expired` is whether it is
+    flushed by the sweep after its deadline.
+    """
+    client = get_redis()
+    deadline = client.zscore(deadlines_key(), attempt_id)
+    if not client.zrem(deadlines_key(), attempt_id):
+        return None
+    attempt = get_attempt(attempt_id)
+    if attempt is None:
+        # The attempt is only deleted once flushed, its answers are lost.
+        logger.error('Attempt %s was not found when flushing it, its answers are lost', attempt_id)
+        return None
+
+    try:
+        user = get_user_model().objects.get(pk=attempt.user_id)
+        quiz = Quiz.objects.get(pk=attempt.quiz_id)
+        result, score = save_result(user, quiz, submission_answers(attempt), attempt.time_taken, feedback)
+    except (get_user_model().DoesNotExist, Quiz.DoesNotExist):
+        client.delete(attempt_key(attempt_id), user_attempt_key(attempt.user_id, attempt.quiz_id))
+        return None
+    except Exception:
+        # Leave the attempt to the next sweep.
+        client.zadd(deadlines_key(), {attempt_id: deadline})
+        raise
+
+    client.delete(attempt_key(attempt_id), user_attempt_key(attempt.user_id, attempt.quiz_id))
+    publish_submitted(client, result, score, attempt, expired)
+    return result, score
+
+
+@shared_task(serializer='json', name="flush_expired_attempts")
+def flush_expired_attempts():
+    """
+    Flush the attempts whose deadline has passed without them being submitted. Returns how many
+    were flushed, attempts which fail are left to the next run.
+    """
+    flushed = 0
+    while True:
+        attempt_ids = get_redis().zrangebyscore(deadlines_key(), '-inf', time.time(), start=0,
+                                                num=settings.ATTEMPT_SWEEP_BATCH_SIZE)
+        batch_flushed = 0
+        for attempt_id in attempt_ids:
+            try:
+                if flush_attempt(attempt_id, expired=True) is not None:
+                    batch_flushed += 1
+            except Exception:
+                logger.exception('Could not flush attempt %s', attempt_id)
+        flushed += batch_flushed
+        if len(attempt_ids) < settings.ATTEMPT_SWEEP_BATCH_SIZE or not batch_flushed:
+            return flushed
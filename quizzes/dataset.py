@@ -0,0 +1,266 @@
+"""
+Synthetic dataset for load tests, see the `generate_dataset` command and `benchmarks/scenarios.py`.
+
+The bulk of the rows is written with `COPY`, the ids of the rows other rows refer to are taken from
+their sequences upfront. Rows are recognisable by `DATASET_EMAIL_DOMAIN`, `DATASET_CATEGORY_PREFIX`
+and `DATASET_LINK_PREFIX`, and generated from a seed, so that the same options always give the same
+dataset.
+"""
+import csv
+import io
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from quizzes.models import Answer, Category, OpenEndedAnswer, Question, QuestionScore, Quiz, Result, \
+    SubmittedAnswer
+from quizzes.partitioning import create_partitions
+from users.models import CustomUser, Profile
+
+DATASET_EMAIL_DOMAIN = 'dataset.qweasy.local'
+DATASET_CATEGORY_PREFIX = 'Dataset '
+DATASET_LINK_PREFIX = 'dataset-'
+DATASET_PASSWORD = 'dataset-password'
+
+COPY_CHUNK_SIZE = 50000
+
+WORDS = (
+    'which', 'function', 'returns', 'value', 'list', 'index', 'query', 'model', 'request', 'cache', 'thread',
+    'process', 'memory', 'network', 'class', 'object', 'string', 'number', 'loop', 'error', 'server', 'client',
+    'database', 'table', 'column', 'transaction', 'lock', 'field', 'view', 'template', 'signal', 'task',
+)
+
+# Share of the questions by answer type: one answer, multiple answers and open-ended.
+ANSWER_TYPE_WEIGHTS = (6, 3, 1)
+
+
+def dataset_email(role, index):
+    return f'{role}-{index}@{DATASET_EMAIL_DOMAIN}'
+
+
+def reserve_ids(cursor, model, count):
+    """
+    Take `count` ids from the sequence of `model`, for rows which are copied with their id.
+    """
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+        [model._meta.db_table, count],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _copy_value(value):
+    if value is None:
+        return r'\N'
+    if isinstance(value, timedelta):
+        return f'{value.total_seconds()} seconds'
+    return value
+
+
+def copy_rows(cursor, model, columns, rows):
+    """
+    Write the rows of `columns` to the table of `model` with `COPY`, in chunks. Returns the row count.
+    """
+    statement = (f'COPY "{model._meta.db_table}" ({", ".join(columns)}) '
+                 f"FROM STDIN WITH (FORMAT csv, NULL '\\N')")
+    count = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(value) for value in row])
+        count += 1
+        if count % COPY_CHUNK_SIZE == 0:
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+    if buffer.tell():
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+    return count
+
+
+class DatasetGenerator:
+    """
+    Generate users, categories, questions with their answers, quizzes and results.
+
+    `detailed_results` of the results also get their submitted answers, with the open-ended answers
+    waiting for a review.
+    """
+
+    def __init__(self, users=1000, senseis=50, categories=20, questions=10000, quizzes=1000,
+                 questions_per_quiz=20, results=100000, detailed_results=1000, months=12, seed=0):
+        self.users = users
+        self.senseis = senseis
+        self.categories = categories
+        self.questions = questions
+        self.quizzes = quizzes
+        self.questions_per_quiz = min(questions_per_quiz, questions)
+        self.results = results
+        self.detailed_results = min(detailed_results, results)
+        self.months = months
+        self.random = random.Random(seed)
+        self.now = timezone.now()
+
+    def sentence(self, words):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words)).capitalize()
+
+    def generate(self, progress=lambda stage, count: None):
+        """
+        Write the dataset and return the number of rows written by table.
+        """
+        counts = {}
+        with transaction.atomic(), connection.cursor() as cursor:
+            create_partitions(cursor, self.now - timedelta(days=31 * self.months), 1)
+            for stage in (self.create_users, self.create_categories, self.create_questions, self.create_quizzes,
+                          self.create_results):
+                for table, count in stage(cursor).items():
+                    counts[table] = count
+                    progress(table, count)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return counts
+
+    def create_users(self, cursor):
+        self.sensei_ids = reserve_ids(cursor, CustomUser, self.senseis)
+        self.user_ids = reserve_ids(cursor, CustomUser, self.users)
+        # Every user has the same password, hashing it once keeps the generation fast.
+        password = make_password(DATASET_PASSWORD)
+        users = [(user_id, 'sensei', dataset_email('sensei', index)) for index, user_id in enumerate(self.sensei_ids)]
+        users += [(user_id, 'noob', dataset_email('noob', index)) for index, user_id in enumerate(self.user_ids)]
+
+        copied = copy_rows(cursor, CustomUser, (
+            'id', 'password', 'is_superuser', 'first_name', 'last_name', 'is_staff', 'is_active', 'date_joined',
+            'email', 'role', 'status', 'total_tests_taken', 'total_time_spent', 'overall_percentage',
+        ), (
+            (user_id, password, False, '', '', False, True, self.now, email, role, 'accepted', 0, timedelta(), 100)
+            for user_id, role, email in users
+        ))
+        copy_rows(cursor, Profile, (
+            'user_id', 'first_name', 'last_name', 'avatar', 'avatar_renditions', 'bio', 'gender',
+        ), (
+            (user_id, '', '', '', '{}', '', 'other') for user_id, _, _ in users
+        ))
+        return {CustomUser._meta.db_table: copied, Profile._meta.db_table: copied}
+
+    def create_categories(self, cursor):
+        self.category_ids = reserve_ids(cursor, Category, self.categories)
+        copied = copy_rows(cursor, Category, ('id', 'name'), (
+            (category_id, f'{DATASET_CATEGORY_PREFIX}{index}') for index, category_id in enumerate(self.category_ids)
+        ))
+        return {Category._meta.db_table: copied}
+
+    def create_questions(self, cursor):
+        self.question_ids = reserve_ids(cursor, Question, self.questions)
+        self.answer_types = {}
+
+        def questions():
+            for question_id in self.question_ids:
+                answer_type = self.random.choices(Question.AnswerType.values, ANSWER_TYPE_WEIGHTS)[0]
+                self.answer_types[question_id] = answer_type
+                yield (question_id, self.random.choice(self.category_ids), f'{self.sentence(8)}?', '{}', answer_type,
+                       self.random.choice(Question.DifficultyLevel.values), self.now, self.now)
+
+        copied = copy_rows(cursor, Question, (
+            'id', 'category_id', 'text', 'image_renditions', 'answer_type', 'difficulty', 'date_created',
+            'date_updated',
+        ), questions())
+
+        def answers():
+            for question_id, answer_type in self.answer_types.items():
+                if answer_type == Question.AnswerType.OPEN_ENDED:
+                    continue
+                correct = {0} if answer_type == Question.AnswerType.ONE_ANSWER else {0, 1}
+                for index in range(4):
+                    yield question_id, self.sentence(3), '{}', index in correct
+
+        answer_count = copy_rows(cursor, Answer, ('question_id', 'text', 'image_renditions', 'is_correct'), answers())
+        return {Question._meta.db_table: copied, Answer._meta.db_table: answer_count}
+
+    def create_quizzes(self, cursor):
+        self.quiz_ids = reserve_ids(cursor, Quiz, self.quizzes)
+        self.quiz_questions = {
+            quiz_id: self.random.sample(self.question_ids, self.questions_per_quiz) for quiz_id in self.quiz_ids
+        }
+        copied = copy_rows(cursor, Quiz, (
+            'id', 'title', 'category_id', 'time_limit', 'unique_link', 'date_created', 'date_updated',
+        ), (
+            (quiz_id, self.sentence(3), self.random.choice(self.category_ids), timedelta(minutes=30),
+             f'{DATASET_LINK_PREFIX}{index}', self.now, self.now)
+            for index, quiz_id in enumerate(self.quiz_ids)
+        ))
+        through = Quiz.questions.through
+        links = copy_rows(cursor, through, ('quiz_id', 'question_id'), (
+            (quiz_id, question_id) for quiz_id, question_ids in self.quiz_questions.items()
+            for question_id in question_ids
+        ))
+        copy_rows(cursor, QuestionScore, ('quiz_id', 'question_id', 'score'), (
+            (quiz_id, question_id, self.random.randint(1, 10)) for quiz_id, question_ids in self.quiz_questions.items()
+            for question_id in question_ids
+        ))
+        return {Quiz._meta.db_table: copied, through._meta.db_table: links, QuestionScore._meta.db_table: links}
+
+    def submission_time(self):
+        return self.now - timedelta(seconds=self.random.uniform(0, self.months * 30 * 24 * 60 * 60))
+
+    def create_results(self, cursor):
+        def results():
+            for _ in range(self.results - self.detailed_results):
+                yield (self.random.choice(self.user_ids), self.random.choice(self.quiz_ids),
+                       self.random.uniform(0, 100), timedelta(minutes=self.random.randint(1, 30)), '',
+                       self.submission_time())
+
+        copied = copy_rows(cursor, Result, (
+            'user_id', 'quiz_id', 'score', 'time_taken', 'feedback', 'submission_time',
+        ), results()) if self.user_ids and self.quiz_ids else 0
+        counts = {Result._meta.db_table: copied + self.create_detailed_results()}
+
+        # Keep the statistics of the users in line with their results.
+        cursor.execute(
+            f'UPDATE "{CustomUser._meta.db_table}" AS u SET total_tests_taken = r.count, total_time_spent = r.time '
+            f'FROM (SELECT user_id, count(*) AS count, sum(time_taken) AS time FROM "{Result._meta.db_table}" '
+            f'WHERE user_id = ANY(%s) GROUP BY user_id) AS r WHERE u.id = r.user_id',
+            [self.user_ids],
+        )
+        counts[SubmittedAnswer._meta.db_table] = self.submitted_answer_count
+        counts[OpenEndedAnswer._meta.db_table] = self.open_ended_answer_count
+        return counts
+
+    def create_detailed_results(self):
+        self.submitted_answer_count = self.open_ended_answer_count = 0
+        if not self.user_ids or not self.quiz_ids:
+            return 0
+        results = Result.objects.bulk_create(
+            Result(user_id=self.random.choice(self.user_ids), quiz_id=self.random.choice(self.quiz_ids),
+                   score=self.random.uniform(0, 100), time_taken=timedelta(minutes=self.random.randint(1, 30)),
+                   submission_time=self.submission_time())
+            for _ in range(self.detailed_results)
+        )
+
+        question_ids = {question_id for result in results for question_id in self.quiz_questions[result.quiz_id]}
+        answer_ids = {}
+        for question_id, answer_id in Answer.objects.filter(question_id__in=question_ids).values_list('question_id',
+                                                                                                     'id'):
+            answer_ids.setdefault(question_id, []).append(answer_id)
+
+        submitted_answers = []
+        for result in results:
+            for question_id in self.quiz_questions[result.quiz_id]:
+                selected = [self.random.choice(answer_ids[question_id])] if question_id in answer_ids else []
+                submitted_answers.append(SubmittedAnswer(quiz_result=result, question_id=question_id,
+                                                         selected_answer_ids=selected,
+                                                         submission_time=result.submission_time))
+        SubmittedAnswer.objects.bulk_create(submitted_answers, batch_size=5000)
+        open_ended_answers = OpenEndedAnswer.objects.bulk_create((
+            OpenEndedAnswer(submitted_answer=submitted_answer, answer_text=self.sentence(12),
+                            submission_time=submitted_answer.submission_time)
+            for submitted_answer in submitted_answers
+            if self.answer_types[submitted_answer.question_id] == Question.AnswerType.OPEN_ENDED
+        ), batch_size=5000)
+
+        self.submitted_answer_count = len(submitted_answers)
+        self.open_ended_answer_count = len(open_ended_answers)
+        return len(results)
@@ -0,0 +1,95 @@
+"""
+The grading queue of the ungraded open-ended answers.
+
+Graders claim batches of the oldest ungraded answers, optionally of a quiz or a question, for
+`GRADING_LEASE_SECONDS`. The batch is selected with `FOR UPDATE SKIP LOCKED`, so that graders
+claiming at the same time get different answers without waiting for each other, and the answers
+they lease are left out of the batches of the other graders until they are graded or their lease
+expires. Claiming again renews the leases of the grader, an answer can only be graded by the
+grader holding its lease, see `OpenEndedReview`.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from quizzes.models import OpenEndedAnswer, QuestionScore
+
+
+class AnswerLeased(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The answer is being graded by another grader.'
+    default_code = 'answer_leased'
+
+
+def is_leased_to_other(open_ended_answer, grader, now=None):
+    now = now or timezone.now()
+    return (open_ended_answer.lease_expires is not None and open_ended_answer.lease_expires > now
+            and open_ended_answer.grader_id != grader.pk)
+
+
+def available_answers(grader, quiz_id=None, question_id=None, now=None):
+    """
+    The ungraded answers `grader` may claim: those without a lease, with an expired lease or leased
+    to the grader, of `quiz_id` and `question_id` if given, oldest first.
+    """
+    now = now or timezone.now()
+    answers = OpenEndedAnswer.objects.filter(
+        Q(lease_expires__isnull=True) | Q(lease_expires__lte=now) | Q(grader=grader),
+        score__isnull=True,
+    )
+    if question_id is not None:
+        # Matching the submission time of the submitted answer prunes its partitions.
+        answers = answers.filter(submitted_answer__question_id=question_id,
+                                 submitted_answer__submission_time=F('submission_time'))
+    if quiz_id is not None:
+        answers = answers.filter(submitted_answer__quiz_result__quiz_id=quiz_id,
+                                 submitted_answer__quiz_result__submission_time=F('submission_time'))
+    return answers.order_by('submission_time', 'id')
+
+
+def claim_answers(grader, size, quiz_id=None, question_id=None):
+    """
+    Lease up to `size` available answers to `grader` and return them with the question they answer
+    and its score in the quiz, see `GradingQueueValuesSerializer`.
+    """
+    now = timezone.now()
+    lease_expires = now + timedelta(seconds=settings.GRADING_LEASE_SECONDS)
+    with transaction.atomic():
+        claimed = list(
+            available_answers(grader, quiz_id, question_id, now).select_for_update(
+                skip_locked=True, of=('self',)
+            ).values_list('id', 'submission_time')[:size]
+        )
+        # The submission times prune the partitions, an empty batch runs no query.
+        answers = OpenEndedAnswer.objects.filter(
+            id__in=[answer_id for answer_id, _ in claimed],
+            submission_time__in={submission_time for _, submission_time in claimed},
+        )
+        if claimed:
+            answers.update(grader=grader, lease_expires=lease_expires)
+
+    return answers.annotate(
+        question_id=F('submitted_answer__question_id'),
+        question_text=F('submitted_answer__question__text'),
+        quiz_id=F('submitted_answer__quiz_result__quiz_id'),
+        result_id=F('submitted_answer__quiz_result_id'),
+        max_score=Subquery(QuestionScore.objects.filter(
+            quiz_id=OuterRef('submitted_answer__quiz_result__quiz_id'),
+            question_id=OuterRef('submitted_answer__question_id'),
+        ).values('score')[:1]),
+    ).order_by('submission_time', 'id')
+
+
+def release_answers(grader, answer_ids):
+    """
+    Give the ungraded answers of `answer_ids` leased to `grader` back to the queue. Returns how
+    many were released.
+    """
+    return OpenEndedAnswer.objects.filter(
+        id__in=answer_ids, grader=grader, score__isnull=True, lease_expires__isnull=False,
+    ).update(grader=None, lease_expires=None)
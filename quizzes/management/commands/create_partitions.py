@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from quizzes.partitioning import create_partitions
+
+
+class Command(BaseCommand):
+    help = "Create the monthly partitions of the submission tables ahead of time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help="Number of months after the current one to create partitions for.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            created = create_partitions(cursor, timezone.now(), options['months_ahead'])
+
+        for name in created:
+            self.stdout.write(f"Created partition {name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partition(s) created."))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizzes.dataset import DATASET_PASSWORD, DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with a synthetic dataset for load tests, e.g. `--questions 1000000 --quizzes 10000 "
+            "--results 5000000` for a production sized one. Run it against a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Noob users taking the quizzes.")
+        parser.add_argument('--senseis', type=int, default=50, help="Sensei users.")
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--questions', type=int, default=10000)
+        parser.add_argument('--quizzes', type=int, default=1000)
+        parser.add_argument('--questions-per-quiz', type=int, default=20)
+        parser.add_argument('--results', type=int, default=100000)
+        parser.add_argument('--detailed-results', type=int, default=1000,
+                            help="Results which also get their submitted answers, with open-ended answers to review.")
+        parser.add_argument('--months', type=int, default=12,
+                            help="Results are submitted over this many months up to now.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        generator = DatasetGenerator(
+            users=options['users'], senseis=options['senseis'], categories=options['categories'],
+            questions=options['questions'], quizzes=options['quizzes'],
+            questions_per_quiz=options['questions_per_quiz'], results=options['results'],
+            detailed_results=options['detailed_results'], months=options['months'], seed=options['seed'],
+        )
+        started = time.perf_counter()
+        generator.generate(progress=lambda table, count: self.stdout.write(f"{table}: {count} rows"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dataset generated in {time.perf_counter() - started:.1f}s. "
+            f"All users have the password '{DATASET_PASSWORD}'."
+        ))
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from quizzes.partitioning import table_size
+
+PACK_BATCH_SQL = '''
+    UPDATE quizzes_submittedanswer submitted
+    SET selected_answer_ids = COALESCE((
+        SELECT array_agg(selected.answer_id ORDER BY selected.id)
+        FROM quizzes_submittedanswer_selected_answers selected
+        WHERE selected.submittedanswer_id = submitted.id
+          AND selected.submission_time = submitted.submission_time
+    ), '{}')
+    FROM (
+        SELECT id, submission_time FROM quizzes_submittedanswer
+        WHERE selected_answer_ids IS NULL
+        LIMIT %s
+    ) batch
+    WHERE submitted.id = batch.id AND submitted.submission_time = batch.submission_time
+'''
+
+DELETE_PACKED_SQL = '''
+    DELETE FROM quizzes_submittedanswer_selected_answers selected
+    USING quizzes_submittedanswer submitted
+    WHERE selected.submittedanswer_id = submitted.id
+      AND selected.submission_time = submitted.submission_time
+      AND submitted.selected_answer_ids IS NOT NULL
+'''
+
+
+class Command(BaseCommand):
+    help = ("Copy the selected answers of legacy submitted answers from the through table into the packed "
+            "`selected_answer_ids` column.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--delete-legacy', action='store_true',
+                            help="Delete the through table rows of answers that have been packed.")
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            before = self.sizes(cursor)
+
+            packed = 0
+            while True:
+                with transaction.atomic():
+                    cursor.execute(PACK_BATCH_SQL, [options['batch_size']])
+                    updated = cursor.rowcount
+                if not updated:
+                    break
+                packed += updated
+                self.stdout.write(f"Packed {packed} submitted answers")
+
+            if options['delete_legacy']:
+                with transaction.atomic():
+                    cursor.execute(DELETE_PACKED_SQL)
+                    self.stdout.write(f"Deleted {cursor.rowcount} through table rows")
+
+            after = self.sizes(cursor)
+
+        for table in before:
+            self.stdout.write(f"{table}: {before[table]} -> {after[table]} bytes")
+        self.stdout.write(self.style.SUCCESS(f"{packed} submitted answers packed."))
+
+    @staticmethod
+    def sizes(cursor):
+        return {
+            table: table_size(cursor, table)
+            for table in ('quizzes_submittedanswer', 'quizzes_submittedanswer_selected_answers')
+        }
@@ -0,0 +1,68 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from quizzes.models import Answer, Question
+from users.models import Profile
+from utils.images import generate_image_renditions
+
+IMAGE_FIELDS = (
+    (Profile, 'avatar'),
+    (Question, 'image'),
+    (Answer, 'image'),
+)
+
+
+def is_referenced(source, name):
+    """
+    Whether an image still refers to the file `name` of the `source` storage. Images named `name`
+    refer to the file of their field's storage once it holds one, like `Command.handle()` reads them.
+    """
+    for model, field_name in IMAGE_FIELDS:
+        storage = model._meta.get_field(field_name).storage
+        if source is not storage and storage.exists(name):
+            continue
+        if model.objects.filter(**{field_name: name}).exists():
+            return True
+    return False
+
+
+class Command(BaseCommand):
+    help = ("Move images uploaded before content hash names were introduced to their content hash name in "
+            "the storage of their field, and queue their renditions.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-originals', action='store_true',
+                            help="Delete the files from their previous location once no image refers to them.")
+
+    def handle(self, *args, **options):
+        moved = 0
+        originals = set()
+        for model, field_name in IMAGE_FIELDS:
+            storage = model._meta.get_field(field_name).storage
+            instances = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for instance in instances.only('pk', field_name).iterator():
+                name = getattr(instance, field_name).name
+                # Question and answer images used to be stored in the default storage.
+                source = storage if storage.exists(name) else default_storage
+                if not source.exists(name):
+                    self.stderr.write(f"{model._meta.label} {instance.pk}: {name} does not exist")
+                    continue
+
+                with source.open(name, 'rb') as file:
+                    new_name = storage.save(name, file)
+                if new_name == name and source is storage:
+                    continue
+
+                model.objects.filter(pk=instance.pk).update(**{field_name: new_name})
+                generate_image_renditions.delay(model._meta.label, instance.pk, field_name, new_name)
+                if options['delete_originals']:
+                    originals.add((source, name))
+                moved += 1
+
+        # Several images may have been copied from the same file, which is only deleted once all of
+        # them have been moved.
+        for source, name in originals:
+            if not is_referenced(source, name):
+                source.delete(name)
+
+        self.stdout.write(self.style.SUCCESS(f"{moved} images moved."))
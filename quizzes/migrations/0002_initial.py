@@ -0,0 +1,76 @@
+# Generated by Django 4.2.4 on 2026-10-19 04:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quizzes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quizzes.category'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='questions',
+            field=models.ManyToManyField(related_name='quiz', to='quizzes.question'),
+        ),
+        migrations.AddField(
+            model_name='questionscore',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quizzes.question'),
+        ),
+        migrations.AddField(
+            model_name='questionscore',
+            name='quiz',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quizzes.quiz'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='category',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.DO_NOTHING, to='quizzes.category'),
+        ),
+        migrations.AddField(
+            model_name='openendedanswer',
+            name='submitted_answer',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='open_ended_answer', to='quizzes.submittedanswer'),
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quizzes.question'),
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='question',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='quizzes.question'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='result',
+            unique_together={('user', 'submission_time', 'quiz')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='favorite',
+            unique_together={('user', 'question')},
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from quizzes.partitioning import convert_to_partitioned
+
+
+def partition_submissions(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        convert_to_partitioned(cursor)
+
+
+class Migration(migrations.Migration):
+    """
+    Rebuild the submission tables as monthly range partitioned tables.
+
+    The existing rows are copied into the new tables inside the migration transaction, which
+    rewrites the tables once; run it in a maintenance window on large databases.
+    """
+
+    dependencies = [
+        ('quizzes', '0002_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(partition_submissions),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='openendedanswer',
+                    name='submission_time',
+                    field=models.DateTimeField(),
+                ),
+                migrations.AddField(
+                    model_name='submittedanswer',
+                    name='submission_time',
+                    field=models.DateTimeField(),
+                ),
+                migrations.AlterField(
+                    model_name='openendedanswer',
+                    name='submitted_answer',
+                    field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='open_ended_answer', to='quizzes.submittedanswer'),
+                ),
+                migrations.AlterField(
+                    model_name='submittedanswer',
+                    name='quiz_result',
+                    field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='quizzes.result'),
+                ),
+                migrations.CreateModel(
+                    name='SelectedAnswer',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('submission_time', models.DateTimeField()),
+                        ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quizzes.answer')),
+                        ('submitted_answer', models.ForeignKey(db_column='submittedanswer_id', db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='quizzes.submittedanswer')),
+                    ],
+                    options={
+                        'db_table': 'quizzes_submittedanswer_selected_answers',
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='submittedanswer',
+                    name='selected_answers',
+                    field=models.ManyToManyField(blank=True, related_name='selected_answers', through='quizzes.SelectedAnswer', to='quizzes.answer'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.4 on 2026-10-19 05:02
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_partition_submissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submittedanswer',
+            name='selected_answer_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, null=True, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='submittedanswer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['selected_answer_ids'], name='submittedanswer_selected_gin'),
+        ),
+    ]
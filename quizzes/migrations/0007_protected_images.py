@@ -0,0 +1,24 @@
+# Generated by Django 4.2.4 on 2026-10-19 05:22
+
+from django.db import migrations, models
+import utils.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='answer',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=utils.storage.protected_storage, upload_to='answer_images/'),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=utils.storage.protected_storage, upload_to='question_images/'),
+        ),
+    ]
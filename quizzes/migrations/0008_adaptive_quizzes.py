@@ -0,0 +1,29 @@
+# Generated by Django 4.2.4 on 2026-10-19 06:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0007_protected_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemParameters',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='item_parameters', serialize=False, to='quizzes.question')),
+                ('discrimination', models.FloatField()),
+                ('difficulty', models.FloatField()),
+                ('responses', models.PositiveIntegerField()),
+                ('date_calibrated', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='adaptive_length',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
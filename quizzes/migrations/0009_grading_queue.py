@@ -0,0 +1,30 @@
+# Generated by Django 4.2.4 on 2026-10-19 06:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quizzes', '0008_adaptive_quizzes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openendedanswer',
+            name='grader',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='openendedanswer',
+            name='lease_expires',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='openendedanswer',
+            index=models.Index(condition=models.Q(('score__isnull', True)), fields=['submission_time', 'id'], name='openendedanswer_ungraded_idx'),
+        ),
+    ]
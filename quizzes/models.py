@@ -1,8 +1,13 @@
 import shortuuid
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import prefetch_related_objects
 from django.utils.translation import gettext_lazy as _
 
 from users.models import CustomUser
+from utils.models import LoadedValuesMixin
+from utils.storage import protected_storage
 
 
 class Category(models.Model):
@@ -16,7 +21,7 @@ class Category(models.Model):
         return self.name
 
 
-class Question(models.Model):
+class Question(LoadedValuesMixin, models.Model):
     class AnswerType(models.IntegerChoices):
         ONE_ANSWER = 0, 'One Answer'
         MULTIPLE_ANSWERS = 1, 'Multiple Answers'
@@ -29,7 +34,8 @@ class Question(models.Model):
 
     category = models.ForeignKey(Category, default=1, on_delete=models.DO_NOTHING)
     text = models.TextField(max_length=200)
-    image = models.ImageField(upload_to='question_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='question_images/', storage=protected_storage, blank=True, null=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     answer_type = models.IntegerField(choices=AnswerType.choices, default=AnswerType.ONE_ANSWER)
     difficulty = models.IntegerField(choices=DifficultyLevel.choices, default=DifficultyLevel.EASY)
     date_created = models.DateTimeField(auto_now_add=True)
@@ -42,7 +48,8 @@ class Question(models.Model):
 class Answer(models.Model):
     question = models.ForeignKey(Question, null=True, blank=True, on_delete=models.CASCADE, related_name='answers')
     text = models.CharField(max_length=200, blank=True, null=True)
-    image = models.ImageField(upload_to='answer_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='answer_images/', storage=protected_storage, blank=True, null=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     is_correct = models.BooleanField(default=False)
 
     def __str__(self):
@@ -64,6 +71,9 @@ class Quiz(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     time_limit = models.DurationField()
     unique_link = models.CharField(max_length=50, blank=True)
+    # Adaptive quizzes ask every taker this many of their questions, chosen by `quizzes.adaptive`
+    # from the answers so far. The other quizzes ask all their questions.
+    adaptive_length = models.PositiveIntegerField(null=True, blank=True)
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
 
@@ -81,6 +91,43 @@ class Quiz(models.Model):
         return self.title
 
 
+class ItemParameters(models.Model):
+    """
+        Parameters of a question in the two-parameter logistic model of `quizzes.adaptive`,
+        calibrated from the submitted answers to the question.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='item_parameters')
+    discrimination = models.FloatField()
+    difficulty = models.FloatField()
+    responses = models.PositiveIntegerField()
+    date_calibrated = models.DateTimeField()
+
+    def __str__(self):
+        return f"Question: {self.question_id} - a={self.discrimination:.2f} b={self.difficulty:.2f}"
+
+
+class QuizEmailDelivery(models.Model):
+    """
+        Model for tracking the delivery of a quiz link email to a single recipient.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='email_deliveries')
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Quiz: {self.quiz.title} - Email: {self.email} - Status: {self.status}"
+
+
 class QuestionScore(models.Model):
     """
         Model for storing scores of each question for specific quiz.
@@ -96,6 +143,8 @@ class QuestionScore(models.Model):
 class Result(models.Model):
     """
         Model for storing submitted results along with score, time taken and feedback.
+
+        The table is partitioned by month of `submission_time`, see `quizzes.partitioning`.
     """
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     quiz = models.ForeignKey(Quiz, on_delete=models.PROTECT)
@@ -114,19 +163,85 @@ class Result(models.Model):
 class SubmittedAnswer(models.Model):
     """
         Model for storing each questions answer for submitted quiz result.
+
+        `submission_time` is copied from the result and is the partition key of the table.
+
+        Selected answers are stored packed in `selected_answer_ids`. Rows submitted before the
+        packed layout have it set to NULL and keep their selections in the `selected_answers`
+        through table until `pack_selected_answers` is run.
     """
-    quiz_result = models.ForeignKey(Result, on_delete=models.CASCADE, related_name='answers')
+    quiz_result = models.ForeignKey(Result, on_delete=models.CASCADE, related_name='answers', db_constraint=False)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
-    selected_answers = models.ManyToManyField(Answer, related_name='selected_answers', blank=True)
+    selected_answers = models.ManyToManyField(Answer, through='SelectedAnswer', related_name='selected_answers',
+                                              blank=True)
+    selected_answer_ids = ArrayField(models.BigIntegerField(), null=True, blank=True)
+    submission_time = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['selected_answer_ids'], name='submittedanswer_selected_gin'),
+        ]
+
+    def get_selected_answers(self):
+        if self.selected_answer_ids is None:
+            return self.selected_answers.all()
+        if not hasattr(self, '_packed_selected_answers'):
+            self.load_selected_answers([self])
+        return self._packed_selected_answers
+
+    @staticmethod
+    def load_selected_answers(submitted_answers):
+        """
+            Resolve the selected answers of many submitted answers with one query per layout.
+        """
+        packed = [answer for answer in submitted_answers if answer.selected_answer_ids is not None]
+        legacy = [answer for answer in submitted_answers if answer.selected_answer_ids is None]
+
+        answer_ids = {answer_id for answer in packed for answer_id in answer.selected_answer_ids}
+        answers = Answer.objects.in_bulk(answer_ids) if answer_ids else {}
+        for submitted_answer in packed:
+            submitted_answer._packed_selected_answers = [
+                answers[answer_id] for answer_id in submitted_answer.selected_answer_ids if answer_id in answers
+            ]
+        prefetch_related_objects(legacy, 'selected_answers')
+
+
+class SelectedAnswer(models.Model):
+    """
+        Through model of `SubmittedAnswer.selected_answers`, partitioned like the submitted answers.
+        Only holds selections submitted before `SubmittedAnswer.selected_answer_ids` was introduced.
+    """
+    submitted_answer = models.ForeignKey(SubmittedAnswer, on_delete=models.CASCADE, db_column='submittedanswer_id',
+                                         db_constraint=False)
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
+    submission_time = models.DateTimeField()
+
+    class Meta:
+        db_table = 'quizzes_submittedanswer_selected_answers'
 
 
 class OpenEndedAnswer(models.Model):
     """
         Model for storing open-ended answers and their scores for quiz.
+
+        Ungraded answers are claimed by graders from the grading queue, `quizzes.grading`, for
+        `GRADING_LEASE_SECONDS`: `grader` is the sensei who claimed or graded the answer and
+        `lease_expires` the end of the lease, cleared once the answer is graded.
     """
-    submitted_answer = models.OneToOneField(SubmittedAnswer, on_delete=models.CASCADE, related_name='open_ended_answer')
+    submitted_answer = models.OneToOneField(SubmittedAnswer, on_delete=models.CASCADE, related_name='open_ended_answer',
+                                            db_constraint=False)
     answer_text = models.TextField(blank=True, null=True)
     score = models.PositiveIntegerField(null=True)
+    submission_time = models.DateTimeField()
+    grader = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    lease_expires = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The grading queue, oldest first. Graded answers, most of the table, are left out.
+            models.Index(fields=['submission_time', 'id'], condition=models.Q(score__isnull=True),
+                         name='openendedanswer_ungraded_idx'),
+        ]
 
     def __str__(self):
         return self.answer_text
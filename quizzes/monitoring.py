@@ -0,0 +1,175 @@
+"""
+Live monitoring of the attempts at a quiz.
+
+Starting, autosaving and submitting attempts, and submitting results, publish server-sent events
+to a Redis channel per quiz, which `QuizMonitorView` streams to the senseis watching the quiz. The
+running counts and scores of every quiz are kept next to the channel and sent with the events:
+
+    <prefix>:monitor:<quiz>  Channel of the events of the quiz, formatted as server-sent events.
+    <prefix>:stats:<quiz>    Hash of the `started` attempts, the attempts `in_progress`, the
+                             `submitted` results and the sums of their `score` and `max_score`.
+
+`<prefix>` is `ATTEMPT_KEY_PREFIX`. Publishing never fails the request it is part of, events are
+lost while Redis is unavailable.
+
+Streams end after `MONITOR_STREAM_LIFETIME` seconds and ask the client to reconnect, as the ASGI
+handler does not notice clients which have disconnected. Browsers' `EventSource` cannot send an
+Authorization header, it authenticates with a short-lived `monitor_token()` in the query string.
+"""
+import asyncio
+import json
+import logging
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+MONITOR_TOKEN_SALT = 'quizzes.monitoring'
+
+
+def monitor_channel(quiz_id):
+    return f'{settings.ATTEMPT_KEY_PREFIX}:monitor:{quiz_id}'
+
+
+def stats_key(quiz_id):
+    return f'{settings.ATTEMPT_KEY_PREFIX}:stats:{quiz_id}'
+
+
+def sse_message(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+def monitor_token(user_id, quiz_id):
+    """
+    Token opening the event stream of the quiz as the user for `MONITOR_TOKEN_MAX_AGE` seconds.
+    """
+    return signing.dumps([user_id, quiz_id], salt=MONITOR_TOKEN_SALT)
+
+
+class MonitorTokenAuthentication(BaseAuthentication):
+    """
+    Authentication with the `token` query parameter, a `monitor_token()`. The authenticated user is
+    loaded, so that the token does not outlive a deactivation, and `request.auth` is the quiz the
+    token opens.
+    """
+
+    def authenticate(self, request):
+        token = request.query_params.get('token')
+        if not token:
+            return None
+        try:
+            user_id, quiz_id = signing.loads(token, salt=MONITOR_TOKEN_SALT, max_age=settings.MONITOR_TOKEN_MAX_AGE)
+        except signing.BadSignature:
+            raise AuthenticationFailed('The token is invalid or has expired.')
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        return user, quiz_id
+
+
+def stats_representation(fields):
+    """
+    The running aggregates of a quiz from its stats hash.
+    """
+    submitted = int(fields.get('submitted', 0))
+    score = float(fields.get('score', 0))
+    max_score = float(fields.get('max_score', 0))
+    return {
+        'started': int(fields.get('started', 0)),
+        'in_progress': max(int(fields.get('in_progress', 0)), 0),
+        'submitted': submitted,
+        'average_score': round(score / submitted, 2) if submitted else None,
+        'average_percentage': round(score / max_score * 100, 2) if max_score else None,
+    }
+
+
+def _update_stats(client, quiz_id, increments):
+    """
+    Add `increments` to the stats of the quiz and return them.
+    """
+    with client.pipeline() as pipeline:
+        for field, amount in increments.items():
+            if isinstance(amount, float):
+                pipeline.hincrbyfloat(stats_key(quiz_id), field, amount)
+            else:
+                pipeline.hincrby(stats_key(quiz_id), field, amount)
+        pipeline.expire(stats_key(quiz_id), settings.MONITOR_STATS_TTL)
+        pipeline.hgetall(stats_key(quiz_id))
+        return stats_representation(pipeline.execute()[-1])
+
+
+def publish_started(client, attempt):
+    try:
+        stats = _update_stats(client, attempt.quiz_id, {'started': 1, 'in_progress': 1})
+        client.publish(monitor_channel(attempt.quiz_id), sse_message('started', {
+            'attempt': attempt.id,
+            'user': attempt.user_id,
+            'deadline': attempt.deadline.isoformat().replace('+00:00', 'Z'),
+            'stats': stats,
+        }))
+    except redis.RedisError:
+        logger.warning('Could not publish the start of attempt %s', attempt.id, exc_info=True)
+
+
+def autosaved_message(user_id, attempt_id, question_ids):
+    return sse_message('autosaved', {'attempt': attempt_id, 'user': user_id, 'questions': question_ids})
+
+
+def publish_submitted(client, result, score, attempt=None, expired=False):
+    """
+    Publish a submitted result, of `attempt` if it was submitted as an attempt, which `expired` if
+    it was recorded by the sweep after its deadline.
+    """
+    increments = {'submitted': 1, 'score': float(score['total_score']), 'max_score': float(score['total_max_score'])}
+    if attempt is not None:
+        increments['in_progress'] = -1
+    try:
+        stats = _update_stats(client, result.quiz_id, increments)
+        client.publish(monitor_channel(result.quiz_id), sse_message('submitted', {
+            'attempt': attempt.id if attempt is not None else None,
+            'user': result.user_id,
+            'result': result.id,
+            'score': score['total_score'],
+            'max_score': score['total_max_score'],
+            'time_taken': result.time_taken.total_seconds(),
+            'expired': expired,
+            'stats': stats,
+        }))
+    except redis.RedisError:
+        logger.warning('Could not publish result %s', result.id, exc_info=True)
+
+
+async def monitor_events(quiz_id):
+    """
+    Server-sent events of the quiz: its current stats, then every published event, with a comment
+    every `MONITOR_HEARTBEAT_INTERVAL` seconds so that proxies keep the connection open, for
+    `MONITOR_STREAM_LIFETIME` seconds. The client reconnects `MONITOR_RECONNECT_DELAY` seconds after
+    the stream ends, and gets the current stats again.
+    """
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + settings.MONITOR_STREAM_LIFETIME
+    client = redis.asyncio.Redis.from_url(settings.ATTEMPT_REDIS_URL)
+    pubsub = client.pubsub()
+    try:
+        # Subscribe before reading the stats, so that no event is missed in between.
+        await pubsub.subscribe(monitor_channel(quiz_id))
+        stats = await client.hgetall(stats_key(quiz_id))
+        yield f'retry: {int(settings.MONITOR_RECONNECT_DELAY * 1000)}\n' + sse_message(
+            'stats', stats_representation({key.decode(): value for key, value in stats.items()})
+        )
+
+        while (remaining := ends_at - loop.time()) > 0:
+            message = await pubsub.get_message(timeout=min(settings.MONITOR_HEARTBEAT_INTERVAL, remaining))
+            if message is None:
+                yield ': heartbeat\n\n'
+            elif message['type'] == 'message':
+                yield message['data']
+    finally:
+        await pubsub.close()
+        await client.close()
@@ -0,0 +1,197 @@
+"""
+Monthly range partitioning of the submission tables.
+
+`Result`, `SubmittedAnswer`, `OpenEndedAnswer` and the `selected_answers` through table are
+partitioned by `submission_time`, one partition per calendar month (UTC) plus a default partition
+that catches rows for months which have not been created yet.
+
+Postgres requires the partition key to be part of every primary key and unique constraint, so the
+primary keys are `(id, submission_time)` and the foreign keys between the partitioned tables are
+not enforced by the database (the models declare them with `db_constraint=False`).
+"""
+from datetime import datetime, timezone
+
+PARTITION_KEY = 'submission_time'
+
+# table name, parent (column, table) the submission time is copied from, unique constraints,
+# plain indexes and foreign keys to non-partitioned tables.
+PARTITIONED_TABLES = (
+    {
+        'table': 'quizzes_result',
+        'parent': None,
+        'unique': [('user_id', 'submission_time', 'quiz_id')],
+        'indexes': [('quiz_id',)],
+        'foreign_keys': [('user_id', 'users_customuser'), ('quiz_id', 'quizzes_quiz')],
+    },
+    {
+        'table': 'quizzes_submittedanswer',
+        'parent': ('quiz_result_id', 'quizzes_result'),
+        'unique': [],
+        'indexes': [('quiz_result_id', 'submission_time'), ('question_id',)],
+        'foreign_keys': [('question_id', 'quizzes_question')],
+    },
+    {
+        'table': 'quizzes_openendedanswer',
+        'parent': ('submitted_answer_id', 'quizzes_submittedanswer'),
+        'unique': [('submitted_answer_id', 'submission_time')],
+        'indexes': [],
+        'foreign_keys': [],
+    },
+    {
+        'table': 'quizzes_submittedanswer_selected_answers',
+        'parent': ('submittedanswer_id', 'quizzes_submittedanswer'),
+        'unique': [('submittedanswer_id', 'answer_id', 'submission_time')],
+        'indexes': [('answer_id',)],
+        'foreign_keys': [('answer_id', 'quizzes_answer')],
+    },
+)
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(value, months):
+    month_index = value.month - 1 + months
+    return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1, day=1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def months_until(start, months_ahead):
+    """
+    Month starts from the month of `start` up to `months_ahead` months after the current month.
+    """
+    month = month_start(start)
+    last = add_months(month_start(datetime.now(timezone.utc)), months_ahead)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def _table_exists(cursor, name):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+    return cursor.fetchone()[0]
+
+
+def create_month_partition(cursor, table, month):
+    """
+    Create the partition of `table` holding rows submitted in `month`.
+
+    Rows that already landed in the default partition for that month are moved into the new
+    partition. Returns False when the partition already exists.
+    """
+    month = month_start(month)
+    name = partition_name(table, month)
+    if _table_exists(cursor, name):
+        return False
+
+    lower, upper = month, add_months(month, 1)
+    default = default_partition_name(table)
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s)',
+        [lower, upper],
+    )
+    has_stray_rows = cursor.fetchone()[0]
+
+    if has_stray_rows:
+        cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{default}"')
+    cursor.execute(
+        f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+        [lower, upper],
+    )
+    if has_stray_rows:
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM "{default}" WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s '
+            f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved',
+            [lower, upper],
+        )
+        cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{default}" DEFAULT')
+    return True
+
+
+def create_partitions(cursor, start, months_ahead):
+    """
+    Create monthly partitions for every partitioned table from the month of `start` up to
+    `months_ahead` months after the current month. Returns the names of the created partitions.
+    """
+    created = []
+    for month in months_until(start, months_ahead):
+        for spec in PARTITIONED_TABLES:
+            if create_month_partition(cursor, spec['table'], month):
+                created.append(partition_name(spec['table'], month))
+    return created
+
+
+def _convert_table(cursor, spec, months):
+    table = spec['table']
+    legacy = f'{table}_legacy'
+    sequence = f'{table}_id_seq'
+
+    cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+    if spec['parent'] is None:
+        columns = f'LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS'
+    else:
+        columns = (f'LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS, '
+                   f'{PARTITION_KEY} timestamp with time zone NOT NULL')
+    cursor.execute(f'CREATE TABLE "{table}" ({columns}) PARTITION BY RANGE ({PARTITION_KEY})')
+    cursor.execute(f'CREATE TABLE "{default_partition_name(table)}" PARTITION OF "{table}" DEFAULT')
+    for month in months:
+        create_month_partition(cursor, table, month)
+
+    if spec['parent'] is None:
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+    else:
+        column, parent = spec['parent']
+        cursor.execute(
+            f'INSERT INTO "{table}" SELECT child.*, parent.{PARTITION_KEY} '
+            f'FROM "{legacy}" child JOIN "{parent}" parent ON parent.id = child.{column}'
+        )
+    cursor.execute(f'DROP TABLE "{legacy}" CASCADE')
+
+    # Identity columns are not supported on partitioned tables, use an owned sequence instead.
+    cursor.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{table}".id')
+    cursor.execute(f'SELECT setval(\'"{sequence}"\', COALESCE(MAX(id), 0) + 1, false) FROM "{table}"')
+    cursor.execute(f'ALTER TABLE "{table}" ALTER COLUMN id SET DEFAULT nextval(\'"{sequence}"\')')
+
+    cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY (id, {PARTITION_KEY})')
+    for columns in spec['unique']:
+        name = f'{table}_{"_".join(columns)}_uniq'[:63]
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" UNIQUE ({", ".join(columns)})')
+    for columns in spec['indexes']:
+        name = f'{table}_{"_".join(columns)}_idx'[:63]
+        cursor.execute(f'CREATE INDEX "{name}" ON "{table}" ({", ".join(columns)})')
+    for column, target in spec['foreign_keys']:
+        name = f'{table}_{column}_fk'[:63]
+        cursor.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" FOREIGN KEY ({column}) '
+            f'REFERENCES "{target}" (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+def convert_to_partitioned(cursor, months_ahead=3):
+    """
+    Rebuild the submission tables as partitioned tables, copying the existing rows over.
+
+    Monthly partitions are created for the whole span of the existing data before it is copied,
+    so nothing has to be moved out of the default partitions afterwards.
+    """
+    cursor.execute(f'SELECT MIN({PARTITION_KEY}) FROM quizzes_result')
+    months = list(months_until(cursor.fetchone()[0] or datetime.now(timezone.utc), months_ahead))
+
+    for spec in PARTITIONED_TABLES:
+        _convert_table(cursor, spec, months)
+
+
+def table_size(cursor, table):
+    """
+    Total on-disk size in bytes of `table` including its indexes, summed over all partitions.
+    """
+    cursor.execute('SELECT COALESCE(SUM(pg_total_relation_size(relid)), 0) FROM pg_partition_tree(%s)', [table])
+    return int(cursor.fetchone()[0])
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.utils import timezone
+
+from quizzes.models import OpenEndedAnswer, Result, SubmittedAnswer
+from utils.score import calculate_score
+
+
+def save_result(user, quiz, answers, time_taken, feedback):
+    """
+    Score the answers of a user to a quiz and store them as a `Result` with its submitted answers,
+    in one transaction. Returns the result and the score.
+
+    `answers` are dicts with the `question`, its `answer_type`, the `selected_answers` and the
+    `open_ended_answer`, as validated by `ResultSubmitSerializer`.
+
+    Notes:
+        - For multiple-choice questions (answer type 1), selected answer choices are stored packed
+          on the submitted answers, so every answered question is written as a single row.
+        - Every row of the submission carries the same `submission_time`, which is the partition key
+          of the submission tables.
+    """
+    score = calculate_score(quiz, answers)
+
+    submission_time = timezone.now()
+
+    with transaction.atomic():
+        result = Result.objects.create(
+            user=user,
+            quiz=quiz,
+            score=score.get('total_score'),
+            time_taken=time_taken,
+            feedback=feedback,
+            submission_time=submission_time
+        )
+
+        user_answer_objects = []
+        open_ended_answers = []
+
+        for answer_data in answers:
+            question = answer_data['question']
+            open_ended_answer = answer_data.get('open_ended_answer')
+
+            selected_answer_ids = []
+            if answer_data['answer_type'] != 2:
+                selected_answer_ids = [answer.id for answer in answer_data.get('selected_answers', [])]
+
+            user_answer = SubmittedAnswer(
+                question=question,
+                quiz_result=result,
+                selected_answer_ids=selected_answer_ids,
+                submission_time=submission_time
+            )
+            user_answer_objects.append(user_answer)
+
+            if question.answer_type == 2:
+                open_ended = OpenEndedAnswer(
+                    answer_text=open_ended_answer,
+                    submitted_answer=user_answer,
+                    submission_time=submission_time
+                )
+                open_ended_answers.append(open_ended)
+
+        SubmittedAnswer.objects.bulk_create(user_answer_objects)
+        OpenEndedAnswer.objects.bulk_create(open_ended_answers)
+
+        if score.get('total_max_score') > 0:
+            percentage = score.get('total_score') / score.get('total_max_score') * 100
+            user.overall_percentage = (float(user.overall_percentage) * user.total_tests_taken +
+                                       percentage) / (user.total_tests_taken + 1)
+
+        user.total_time_spent += time_taken
+        user.total_tests_taken += 1
+
+        # weight = 1 / user.total_tests_taken
+        # user.overall_percentage = (1 - weight) * float(user.overall_percentage) + (
+        #         weight * percentage)
+        user.save()
+
+    return result, score
@@ -1,8 +1,16 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.db import transaction
+from django.db.models import F, Prefetch
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 
 from quizzes.models import Question, Answer, Quiz, QuestionScore, Result, SubmittedAnswer, OpenEndedAnswer, Category
 from users.models import CustomUser
+from utils.images import ImageRenditionField, RenditionURLs
+from utils.relations import BulkListSerializer, BulkPrimaryKeyRelatedField
+from utils.serializers import ValuesListSerializer, datetime_representation, duration_representation
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -12,6 +20,8 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 class AnswerSerializer(serializers.ModelSerializer):
+    image = ImageRenditionField('small', required=False, allow_null=True)
+
     class Meta:
         model = Answer
         fields = ('id', 'text', 'image', 'is_correct')
@@ -25,6 +35,8 @@ class AnswerSerializer(serializers.ModelSerializer):
 
 
 class QuestionSerializer(serializers.ModelSerializer):
+    image = ImageRenditionField('medium', required=False, allow_null=True)
+
     class Meta:
         model = Question
         fields = ('id', 'category', 'text', 'image', 'answer_type', 'difficulty', 'answers')
@@ -38,9 +50,7 @@ class QuestionSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         answers_data = validated_data.pop('answers')
         question = Question.objects.create(**validated_data)
-
-        for answer_data in answers_data:
-            Answer.objects.create(question=question, **answer_data)
+        Answer.objects.bulk_create(Answer(question=question, **answer_data) for answer_data in answers_data)
 
         return question
 
@@ -53,25 +63,44 @@ class QuestionSerializer(serializers.ModelSerializer):
         answers_data = validated_data.get('answers')
         if answers_data:
             instance.answers.all().delete()
-            for answer_data in answers_data:
-                Answer.objects.create(question=instance, **answer_data)
+            Answer.objects.bulk_create(Answer(question=instance, **answer_data) for answer_data in answers_data)
 
         instance.save()
         return instance
 
 
 class QuestionScoreSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
     class Meta:
         model = QuestionScore
         fields = ('question', 'score')
+        list_serializer_class = BulkListSerializer
+
+
+def validate_adaptive_questions(category_id, adaptive_length, questions):
+    """
+    Adaptive quizzes ask their questions from the item bank of their category, which only holds the
+    questions of the category.
+    """
+    if adaptive_length and any(question.category_id != category_id for question in questions):
+        raise serializers.ValidationError(
+            {'questions': ['The questions of an adaptive quiz must be of the category of the quiz.']}
+        )
 
 
 class QuizCreateSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
     scores = QuestionScoreSerializer(many=True, write_only=True)
 
     class Meta:
         model = Quiz
-        fields = ('id', 'title', 'category', 'questions', 'time_limit', 'scores')
+        fields = ('id', 'title', 'category', 'questions', 'time_limit', 'adaptive_length', 'scores')
+        extra_kwargs = {'adaptive_length': {'min_value': 1}}
+
+    def validate(self, attrs):
+        validate_adaptive_questions(attrs['category'].id, attrs.get('adaptive_length'), attrs.get('questions', []))
+        return attrs
 
     def create(self, validated_data):
         scores_data = validated_data.pop('scores')
@@ -99,28 +128,40 @@ class QuizDetailSerializer(serializers.ModelSerializer):
     questions = QuestionSerializer(many=True)
     scores = QuestionScoreSerializer(many=True, write_only=True)
 
+    # Relations to prefetch on the serialized quizzes, it takes one query each whatever their size.
+    # Questions and answers are ordered, so that the representation does not depend on the query plan.
+    prefetch = (
+        Prefetch('questions', queryset=Question.objects.order_by('id')),
+        Prefetch('questions__answers', queryset=Answer.objects.order_by('id')),
+        'questionscore_set',
+    )
+
     class Meta:
         model = Quiz
-        fields = ('id', 'title', 'category', 'questions', 'time_limit', 'scores')
+        fields = ('id', 'title', 'category', 'questions', 'time_limit', 'adaptive_length', 'scores')
+        extra_kwargs = {'adaptive_length': {'min_value': 1}}
+
+    def validate(self, attrs):
+        if self.instance is not None:
+            category_id = attrs['category'].id if 'category' in attrs else self.instance.category_id
+            validate_adaptive_questions(category_id, attrs.get('adaptive_length', self.instance.adaptive_length),
+                                        self.instance.questions.all())
+        return attrs
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
 
-        question_ids = [question_data['id'] for question_data in representation['questions']]
-        scores = QuestionScore.objects.filter(quiz=instance, question_id__in=question_ids)
-        score_data = QuestionScoreSerializer(scores, many=True).data
+        scores = {score.question_id: score.score for score in instance.questionscore_set.all()}
 
         for question_data in representation['questions']:
-            question_id = question_data['id']
-            related_score = [score for score in score_data if score['question'] == question_id][0].get('score')
-            question_data['score'] = related_score
+            question_data['score'] = scores.get(question_data['id'])
 
         return representation
 
 
 class ResultSingleSerializer(serializers.Serializer):
-    question = serializers.PrimaryKeyRelatedField(queryset=Question.objects.all())
-    selected_answers = serializers.PrimaryKeyRelatedField(queryset=Answer.objects.all(), many=True, required=False)
+    question = BulkPrimaryKeyRelatedField(queryset=Question.objects.all())
+    selected_answers = BulkPrimaryKeyRelatedField(queryset=Answer.objects.all(), many=True, required=False)
     open_ended_answer = serializers.CharField(allow_blank=True, required=False)
     answer_type = serializers.IntegerField(required=True)
 
@@ -128,11 +169,15 @@ class ResultSingleSerializer(serializers.Serializer):
 class ResultSubmitSerializer(serializers.Serializer):
     user = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all())
     quiz = serializers.PrimaryKeyRelatedField(queryset=Quiz.objects.all())
-    answers = serializers.ListSerializer(child=ResultSingleSerializer())
+    answers = BulkListSerializer(child=ResultSingleSerializer())
     time_taken = serializers.DurationField(required=True)
     feedback = serializers.CharField()
 
     def validate(self, data):
+        # The time taken is reported by the client, timed attempts are measured by the server instead.
+        if data['time_taken'] > data['quiz'].time_limit:
+            raise serializers.ValidationError({'time_taken': ['The time taken is over the time limit of the quiz.']})
+
         for answer_data in data['answers']:
             answer_type = answer_data['answer_type']
 
@@ -145,6 +190,51 @@ class ResultSubmitSerializer(serializers.Serializer):
         return data
 
 
+class MonitorTokenSerializer(serializers.Serializer):
+    token = serializers.CharField()
+    expires_in = serializers.IntegerField()
+
+
+class AttemptAnswerSerializer(serializers.Serializer):
+    question = serializers.IntegerField()
+    selected_answers = serializers.ListField(child=serializers.IntegerField(), max_length=100, required=False)
+    open_ended_answer = serializers.CharField(allow_blank=True, max_length=10000, required=False)
+
+
+class AttemptAnswersSerializer(serializers.Serializer):
+    answers = AttemptAnswerSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class AttemptSubmitSerializer(serializers.Serializer):
+    feedback = serializers.CharField(allow_blank=True, required=False, default='')
+
+
+class AttemptSerializer(serializers.Serializer):
+    """
+    Schema of `quizzes.attempts.Attempt.to_representation()`.
+    """
+    id = serializers.CharField()
+    quiz = serializers.IntegerField()
+    started_at = serializers.DateTimeField()
+    deadline = serializers.DateTimeField()
+    remaining_seconds = serializers.IntegerField()
+    answers = AttemptAnswerSerializer(many=True)
+
+
+class AttemptSubmitResultSerializer(serializers.Serializer):
+    message = serializers.CharField()
+    result = serializers.IntegerField()
+    score = serializers.IntegerField()
+    max_score = serializers.IntegerField()
+
+
+class AttemptNextQuestionSerializer(serializers.Serializer):
+    question = QuestionSerializer(allow_null=True)
+    ability = serializers.FloatField()
+    standard_error = serializers.FloatField()
+    remaining = serializers.IntegerField()
+
+
 class QuizEmailSendSerializer(serializers.Serializer):
     quiz_id = serializers.IntegerField()
     recipient_user_ids = serializers.ListField(child=serializers.IntegerField())
@@ -172,16 +262,13 @@ class OpenEndedAnswerSerializer(serializers.ModelSerializer):
 
 
 class SubmittedAnswerSerializer(serializers.ModelSerializer):
-    selected_answers = AnswerSerializer(many=True)
+    selected_answers = AnswerSerializer(many=True, source='get_selected_answers')
     open_ended_answer = OpenEndedAnswerSerializer()
 
     class Meta:
         model = SubmittedAnswer
         fields = ('question', 'selected_answers', 'open_ended_answer')
 
-    def get_selected_answers(self, obj):
-        return obj.selected_answers.all()
-
 
 class UserResultDetailSerializer(serializers.ModelSerializer):
     answers = SubmittedAnswerSerializer(many=True)
@@ -198,13 +285,177 @@ class OpenEndedReviewSerializer(serializers.Serializer):
     def validate(self, data):
 
         open_ended = OpenEndedAnswer.objects.filter(id=data.get('open_ended_answer_id')).first()
-        if open_ended.score:
+        if open_ended is None:
+            raise NotFound('Open-ended answer not found')
+        if open_ended.score is not None:
             raise serializers.ValidationError("Question is already reviewed.")
         quiz = open_ended.submitted_answer.quiz_result.quiz
-        max_score = QuestionScore.objects.filter(
-            question__submittedanswer__open_ended_answer=data.get('open_ended_answer_id'), quiz=quiz).first().score
+        question_score = QuestionScore.objects.filter(
+            question__submittedanswer__open_ended_answer=data.get('open_ended_answer_id'), quiz=quiz).first()
+        if question_score is None:
+            raise NotFound('Question score not found')
+        max_score = question_score.score
 
         if not (0 <= data.get('score') <= max_score):
             raise serializers.ValidationError(f"Score must be between 0 and {max_score}.")
 
         return data
+
+
+class GradingClaimSerializer(serializers.Serializer):
+    quiz = serializers.IntegerField(required=False)
+    question = serializers.IntegerField(required=False)
+    size = serializers.IntegerField(min_value=1, max_value=settings.GRADING_CLAIM_MAX_SIZE, default=10)
+
+
+class GradingReleaseSerializer(serializers.Serializer):
+    answers = serializers.ListField(child=serializers.IntegerField(), allow_empty=False,
+                                    max_length=settings.GRADING_CLAIM_MAX_SIZE)
+
+
+class GradingQuestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    text = serializers.CharField()
+    max_score = serializers.IntegerField()
+
+
+class GradingAnswerSerializer(serializers.Serializer):
+    """
+    Schema of the claimed answers represented by `GradingQueueValuesSerializer`.
+    """
+    id = serializers.IntegerField()
+    answer_text = serializers.CharField(allow_null=True)
+    submission_time = serializers.DateTimeField()
+    lease_expires = serializers.DateTimeField()
+    quiz = serializers.IntegerField()
+    result = serializers.IntegerField()
+    question = GradingQuestionSerializer()
+
+
+class GradingClaimResultSerializer(serializers.Serializer):
+    answers = GradingAnswerSerializer(many=True)
+
+
+class GradingReleaseResultSerializer(serializers.Serializer):
+    released = serializers.IntegerField()
+
+
+class QuestionValuesSerializer(ValuesListSerializer):
+    """
+    Read-only `QuestionSerializer(many=True)` for long lists of questions.
+    """
+
+    values = ('id', 'category_id', 'text', 'image', 'image_renditions', 'answer_type', 'difficulty')
+    answer_values = ('id', 'question_id', 'text', 'image', 'image_renditions', 'is_correct')
+
+    def load_related(self, rows):
+        request = self.context.get('request')
+        self.question_image = RenditionURLs(Question, 'image', 'medium', request)
+        self.answer_image = RenditionURLs(Answer, 'image', 'small', request)
+        # Like `AnswerSerializer`, which hides the correct answers from GET requests, unless
+        # `hide_correct` says otherwise.
+        with_correct = not self.context.get('hide_correct', request is not None and request.method == 'GET')
+
+        self.answers = defaultdict(list)
+        if not rows:
+            return
+        answers = Answer.objects.filter(
+            question_id__in=[row['id'] for row in rows]
+        ).order_by('id').values(*self.answer_values)
+        for answer in answers:
+            representation = {
+                'id': answer['id'],
+                'text': answer['text'],
+                'image': self.answer_image(answer['image'], answer['image_renditions']),
+            }
+            if with_correct:
+                representation['is_correct'] = answer['is_correct']
+            self.answers[answer['question_id']].append(representation)
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'category': row['category_id'],
+            'text': row['text'],
+            'image': self.question_image(row['image'], row['image_renditions']),
+            'answer_type': row['answer_type'],
+            'difficulty': row['difficulty'],
+            'answers': self.answers[row['id']],
+        }
+
+
+class QuizValuesSerializer(ValuesListSerializer):
+    """
+    Read-only `QuizDetailSerializer(many=True)` for long lists of quizzes.
+    """
+
+    values = ('id', 'title', 'category_id', 'time_limit', 'adaptive_length')
+
+    def load_related(self, rows):
+        quiz_ids = [row['id'] for row in rows]
+        self.questions = defaultdict(list)
+        if not quiz_ids:
+            return
+
+        question_rows = list(
+            Question.objects.filter(quiz__in=quiz_ids).order_by('id').values(
+                *QuestionValuesSerializer.values, quiz_id=F('quiz')
+            )
+        )
+        questions = QuestionValuesSerializer(context=self.context).represent(question_rows)
+        scores = defaultdict(dict)
+        for quiz_id, question_id, score in QuestionScore.objects.filter(quiz_id__in=quiz_ids).values_list(
+                'quiz_id', 'question_id', 'score'):
+            scores[quiz_id][question_id] = score
+
+        for question_row, question in zip(question_rows, questions):
+            quiz_id = question_row['quiz_id']
+            self.questions[quiz_id].append({**question, 'score': scores[quiz_id].get(question['id'])})
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'category': row['category_id'],
+            'questions': self.questions[row['id']],
+            'time_limit': duration_representation(row['time_limit']),
+            'adaptive_length': row['adaptive_length'],
+        }
+
+
+class UserResultValuesSerializer(ValuesListSerializer):
+    """
+    Read-only `UserResultListSerializer(many=True)` for long lists of results.
+    """
+
+    values = ('id', 'quiz_id', 'quiz__title', 'score', 'submission_time')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'quiz_id': row['quiz_id'],
+            'quiz_name': row['quiz__title'],
+            'score': row['score'],
+            'submission_time': datetime_representation(row['submission_time']),
+        }
+
+
+class GradingQueueValuesSerializer(ValuesListSerializer):
+    """
+    Read-only representation of claimed open-ended answers, from `quizzes.grading.claim_answers()`,
+    with the question they answer and its score in the quiz.
+    """
+
+    values = ('id', 'answer_text', 'submission_time', 'lease_expires', 'quiz_id', 'result_id', 'question_id',
+              'question_text', 'max_score')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'answer_text': row['answer_text'],
+            'submission_time': datetime_representation(row['submission_time']),
+            'lease_expires': datetime_representation(row['lease_expires']),
+            'quiz': row['quiz_id'],
+            'result': row['result_id'],
+            'question': {'id': row['question_id'], 'text': row['question_text'], 'max_score': row['max_score']},
+        }
@@ -0,0 +1,39 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from utils.cache import register_cache_tags, tagged_cache
+from utils.images import register_renditions
+from .models import Answer, Category, Question, QuestionScore, Quiz
+
+register_renditions(Question, 'image')
+register_renditions(Answer, 'image')
+
+
+def question_cache_tags(question):
+    tags = ['question', f'question:{question.pk}', f'item-bank:{question.category_id}']
+    # A question moved to another category leaves the item bank of its previous one.
+    previous_category_id = question.get_loaded_value('category_id', question.category_id)
+    if previous_category_id != question.category_id:
+        tags.append(f'item-bank:{previous_category_id}')
+    return tags
+
+
+register_cache_tags(Category, lambda category: ['category'])
+register_cache_tags(Question, question_cache_tags)
+register_cache_tags(Answer, lambda answer: [f'question:{answer.question_id}'])
+register_cache_tags(Quiz, lambda quiz: ['quiz', f'quiz:{quiz.pk}'])
+register_cache_tags(QuestionScore, lambda score: [f'quiz:{score.quiz_id}'])
+
+
+@receiver(m2m_changed, sender=Quiz.questions.through)
+def invalidate_quiz_questions(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            tagged_cache.invalidate(f'quiz:{instance.pk}')
+    elif action == 'pre_clear':
+        # The quizzes of a question are only known before they are cleared.
+        instance._cleared_quiz_ids = list(instance.quiz.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        tagged_cache.invalidate(*(f'quiz:{pk}' for pk in instance.__dict__.pop('_cleared_quiz_ids', ())))
+    elif action.startswith('post_'):
+        tagged_cache.invalidate(*(f'quiz:{pk}' for pk in pk_set))
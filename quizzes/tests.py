@@ -1,19 +1,90 @@
-from datetime import timedelta
+import asyncio
+import gzip
+import io
+import json
+import os
+import shutil
+import smtplib
+import tempfile
+import time as time_module
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core import mail, signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
 from django.utils import timezone
-from rest_framework import status
-from rest_framework.exceptions import ErrorDetail
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework import serializers, status
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.reverse import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
+import numpy as np
+import yaml
 
-from quizzes.models import Quiz, Category, Question, Result, Favorite, Answer, QuestionScore
+from core.celery import app
+from quizzes import urls as quizzes_urls
+from quizzes.models import Quiz, Category, Question, Result, Favorite, Answer, QuestionScore, SubmittedAnswer, \
+    SelectedAnswer, QuizEmailDelivery, OpenEndedAnswer, ItemParameters
+from quizzes.adaptive import ItemBank, calibrate, calibrate_item_parameters, get_item_bank
+from quizzes.attempts import attempt_key, flush_attempt, flush_expired_attempts, get_redis, save_answers, \
+    start_attempt, user_attempt_key
+from quizzes.monitoring import monitor_channel, monitor_events, monitor_token
+from quizzes.partitioning import add_months, month_start, partition_name
+from quizzes.results import save_result
+from quizzes.serializers import QuestionSerializer, QuestionValuesSerializer, QuizDetailSerializer, \
+    QuizValuesSerializer, UserResultListSerializer, UserResultValuesSerializer
+from quizzes.views import QuestionSelectView, UserResultListView
+from users import urls as users_urls
+from utils import images
+from utils.cache import tagged_cache
+from utils.instrumentation import TASKS, render_metrics, request_metrics
+from utils.mail import get_reserve_send_slot_script, reserve_send_slot, send_quiz_link_chunk, \
+    send_quiz_link_to_students
+from utils.parsers import ORJSONParser
+from utils.relations import BulkListSerializer, BulkPrimaryKeyRelatedField
+from utils.renderers import ORJSONRenderer
+from utils.schema import build_schema, generate_schema, schema_store
+from utils.testing import QueryBudget, QueryBudgetTestMixin
+from utils.token import create_custom_token
 
 User = get_user_model()
 
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'tokens': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tokens'},
+}
 
+TEST_ATTEMPT_KEY_PREFIX = 'test-attempt'
+
+
+def clear_attempts():
+    client = get_redis()
+    for key in client.scan_iter(f'{TEST_ATTEMPT_KEY_PREFIX}:*'):
+        client.delete(key)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ATTEMPT_KEY_PREFIX=TEST_ATTEMPT_KEY_PREFIX)
 class BaseAPITestCase(APITestCase):
     def setUp(self):
+        cache.clear()
+        tagged_cache.clear_local()
+        clear_attempts()
+        self.addCleanup(clear_attempts)
         self.category = Category.objects.create(name='Test Category')
         self.user = User.objects.create_user(email='test@user.com', password='testpassword', role='sensei',
                                              status='accepted')
@@ -157,7 +228,7 @@ class QuestionCreateViewTestCase(BaseAPITestCase):
         url = reverse('question-create')
 
         data = {
-            "category": 1,
+            "category": self.category.id,
             "text": "What is your favorite color?",
             "answer_type": 2,
             "difficulty": 1,
@@ -220,3 +291,1471 @@ class ResultSubmitViewTestCase(BaseAPITestCase):
         response = self.client.post(reverse('quiz-submit'), data, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_submit_user_answers(self):
+        data = {
+            "user": self.user.id,
+            "quiz": self.quiz.id,
+            "answers": [
+                {"question": self.question.id, "selected_answers": [self.answer1.id], "answer_type": 0},
+            ],
+            "time_taken": 5,
+            "feedback": "string",
+        }
+
+        response = self.client.post(reverse('quiz-submit'), data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['score'], 10)
+        result = Result.objects.exclude(pk=self.result.pk).get()
+        submitted_answer = SubmittedAnswer.objects.get(quiz_result=result)
+        self.assertEqual(submitted_answer.submission_time, result.submission_time)
+        self.assertEqual(submitted_answer.selected_answer_ids, [self.answer1.id])
+        self.assertEqual(submitted_answer.get_selected_answers(), [self.answer1])
+
+    def test_time_taken_over_the_time_limit(self):
+        response = self.client.post(reverse('quiz-submit'), {
+            'user': self.user.id, 'quiz': self.quiz.id, 'time_taken': 6, 'feedback': 'Fine',
+            'answers': [{'question': self.question.id, 'answer_type': 0, 'selected_answers': [self.answer1.id]}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('time_taken', response.data)
+
+    def test_open_ended_answers_have_no_selected_answers(self):
+        question = Question.objects.create(text='Why?', category=self.category, answer_type=2)
+        QuestionScore.objects.create(question=question, quiz=self.quiz, score=5)
+
+        result, _ = save_result(self.user, self.quiz, [
+            {'question': question, 'answer_type': 2, 'open_ended_answer': 'Because', 'selected_answers': [self.answer1]}
+        ], timedelta(seconds=30), 'Fine')
+
+        self.assertEqual(result.answers.get().selected_answer_ids, [])
+
+
+class AttemptTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.open_question = Question.objects.create(text='Open Question', category=self.category, answer_type=2)
+        self.quiz.questions.add(self.open_question)
+        QuestionScore.objects.create(question=self.open_question, quiz=self.quiz, score=5)
+        self.quiz.time_limit = timedelta(minutes=10)
+        self.quiz.save()
+
+    def start(self):
+        return self.client.post(reverse('attempt-start', args=[self.quiz.unique_link]))
+
+    def save(self, attempt_id, answers):
+        return self.client.patch(reverse('attempt-detail', args=[attempt_id]), {'answers': answers}, format='json')
+
+    def test_start_and_resume(self):
+        response = self.start()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        started_at = datetime.fromisoformat(response.data['started_at'].replace('Z', '+00:00'))
+        deadline = datetime.fromisoformat(response.data['deadline'].replace('Z', '+00:00'))
+        self.assertEqual(deadline - started_at, timedelta(minutes=10))
+        self.assertEqual(response.data['answers'], [])
+
+        resumed = self.start()
+        self.assertEqual(resumed.status_code, status.HTTP_200_OK)
+        self.assertEqual(resumed.data['id'], response.data['id'])
+        self.assertEqual(self.client.get(reverse('attempt-detail', args=[response.data['id']])).data['id'],
+                         response.data['id'])
+        self.assertEqual(self.client.post(reverse('attempt-start', args=['missing'])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_autosave(self):
+        attempt_id = self.start().data['id']
+
+        with self.assertNumQueries(0):
+            response = self.save(attempt_id, [{'question': self.question.id, 'selected_answers': [self.answer1.id]}])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.save(attempt_id, [{'question': self.open_question.id, 'open_ended_answer': 'First'}])
+        self.save(attempt_id, [{'question': self.open_question.id, 'open_ended_answer': 'Second'}])
+
+        response = self.client.get(reverse('attempt-detail', args=[attempt_id]))
+        self.assertCountEqual(response.data['answers'], [
+            {'question': self.question.id, 'selected_answers': [self.answer1.id]},
+            {'question': self.open_question.id, 'open_ended_answer': 'Second'},
+        ])
+        self.assertEqual(get_redis().ttl(f'{TEST_ATTEMPT_KEY_PREFIX}:{attempt_id}'), -1)
+        self.assertEqual(get_redis().ttl(user_attempt_key(self.user.id, self.quiz.id)), 600 + 300)
+
+    def test_autosave_rejected(self):
+        attempt_id = self.start().data['id']
+        other_question = Question.objects.create(text='Other Question', category=self.category)
+
+        response = self.save(attempt_id, [{'question': other_question.id, 'selected_answers': [1]}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.save('missing', [{'question': self.question.id}]).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.save(attempt_id, []).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(User.objects.create_user(email='other@user.com', password='testpassword'))
+        self.assertEqual(self.save(attempt_id, [{'question': self.question.id}]).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('attempt-detail', args=[attempt_id])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_autosave_after_deadline(self):
+        attempt_id = self.start().data['id']
+
+        with mock.patch('quizzes.attempts.time.time', return_value=time_module.time() + 601):
+            response = self.save(attempt_id, [{'question': self.question.id, 'selected_answers': [self.answer1.id]}])
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_submit(self):
+        attempt_id = self.start().data['id']
+        answer2 = Answer.objects.create(text='Test Answer 2', question=self.question)
+        other_answer = Answer.objects.create(text='Other', question=self.open_question)
+        self.save(attempt_id, [
+            {'question': self.question.id, 'selected_answers': [self.answer1.id, other_answer.id, 0]},
+            {'question': self.open_question.id, 'open_ended_answer': 'Because', 'selected_answers': [answer2.id]},
+        ])
+
+        response = self.client.post(reverse('attempt-submit', args=[attempt_id]), {'feedback': 'Fine'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['score'], response.data['max_score']), (10, 10))
+        result = Result.objects.get(pk=response.data['result'])
+        self.assertEqual((result.user, result.quiz, result.feedback), (self.user, self.quiz, 'Fine'))
+        self.assertLess(result.time_taken, timedelta(minutes=1))
+        answers = {answer.question_id: answer for answer in result.answers.select_related('open_ended_answer')}
+        self.assertEqual(answers[self.question.id].selected_answer_ids, [self.answer1.id])
+        self.assertEqual(answers[self.open_question.id].open_ended_answer.answer_text, 'Because')
+        self.assertEqual(get_redis().exists(attempt_key(attempt_id), user_attempt_key(self.user.id, self.quiz.id)), 0)
+
+        self.assertEqual(self.client.post(reverse('attempt-submit', args=[attempt_id])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.start().status_code, status.HTTP_201_CREATED)
+
+    def test_unanswered_questions_count_towards_the_max_score(self):
+        other_question = Question.objects.create(text='Other Question', category=self.category)
+        Answer.objects.create(text='Other Answer', question=other_question, is_correct=True)
+        self.quiz.questions.add(other_question)
+        QuestionScore.objects.create(question=other_question, quiz=self.quiz, score=10)
+        attempt_id = self.start().data['id']
+        self.save(attempt_id, [{'question': self.question.id, 'selected_answers': [self.answer1.id]}])
+
+        response = self.client.post(reverse('attempt-submit', args=[attempt_id]), {'feedback': 'Fine'}, format='json')
+
+        self.assertEqual((response.data['score'], response.data['max_score']), (10, 20))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.overall_percentage, 50)
+        self.assertEqual(Result.objects.get(pk=response.data['result']).answers.get(question=other_question)
+                         .selected_answer_ids, [])
+
+    def test_attempts_outlive_a_late_sweep(self):
+        attempt, _ = start_attempt(self.user, self.quiz)
+        self.save(attempt.id, [{'question': self.question.id, 'selected_answers': [self.answer1.id]}])
+
+        with mock.patch('quizzes.attempts.time.time', return_value=time_module.time() + 600 + 300 + 60):
+            self.assertEqual(flush_expired_attempts(), 1)
+
+        self.assertEqual(Result.objects.get(user=self.user, feedback='').score, 10)
+
+    def test_lost_attempts_are_logged(self):
+        attempt, _ = start_attempt(self.user, self.quiz)
+        get_redis().delete(attempt_key(attempt.id))
+
+        with self.assertLogs('quizzes.attempts', 'ERROR'):
+            self.assertIsNone(flush_attempt(attempt.id))
+
+    def test_expired_attempts_are_recorded_by_the_sweep(self):
+        expired, _ = start_attempt(self.user, self.quiz)
+        other_user = User.objects.create_user(email='other@user.com', password='testpassword')
+        self.quiz.time_limit = timedelta(hours=1)
+        open_attempt, _ = start_attempt(other_user, self.quiz)
+        self.save(expired.id, [{'question': self.question.id, 'selected_answers': [self.answer1.id]}])
+
+        with mock.patch('quizzes.attempts.time.time', return_value=time_module.time() + 601):
+            self.assertEqual(flush_expired_attempts(), 1)
+            self.assertEqual(flush_expired_attempts(), 0)
+
+        result = Result.objects.get(user=self.user, quiz=self.quiz, feedback='')
+        self.assertEqual(result.score, 10)
+        self.assertAlmostEqual(result.time_taken, timedelta(minutes=10), delta=timedelta(milliseconds=1))
+        self.assertEqual(result.answers.get().selected_answer_ids, [self.answer1.id])
+        self.assertFalse(Result.objects.filter(user=other_user).exists())
+        self.client.force_authenticate(other_user)
+        self.assertEqual(self.client.get(reverse('attempt-detail', args=[open_attempt.id])).status_code,
+                         status.HTTP_200_OK)
+
+
+class AdaptiveTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz.adaptive_length = 2
+        self.quiz.time_limit = timedelta(minutes=10)
+        self.quiz.save()
+        self.questions = [self.question]
+        for difficulty in Question.DifficultyLevel:
+            question = Question.objects.create(text=f'Question {difficulty}', category=self.category,
+                                               difficulty=difficulty)
+            Answer.objects.create(text='Right', question=question, is_correct=True)
+            Answer.objects.create(text='Wrong', question=question)
+            self.questions.append(question)
+        open_question = Question.objects.create(text='Open Question', category=self.category, answer_type=2)
+        self.quiz.questions.add(*self.questions[1:], open_question)
+        for question in [*self.questions[1:], open_question]:
+            QuestionScore.objects.create(question=question, quiz=self.quiz, score=10)
+
+    def next_question(self, attempt_id):
+        return self.client.post(reverse('attempt-next', args=[attempt_id]))
+
+    def answer(self, attempt_id, question, correct):
+        answer = question.answers.get(is_correct=correct)
+        return self.client.patch(reverse('attempt-detail', args=[attempt_id]), {
+            'answers': [{'question': question.id, 'selected_answers': [answer.id]}],
+        }, format='json')
+
+    def test_calibrate(self):
+        rng = np.random.default_rng(0)
+        discrimination = rng.uniform(0.7, 2, 20)
+        difficulty = rng.uniform(-2, 2, 20)
+        theta = rng.normal(size=2000)
+        persons, items = (grid.ravel() for grid in np.meshgrid(np.arange(2000), np.arange(20), indexing='ij'))
+        logits = discrimination[items] * (theta[persons] - difficulty[items])
+        correct = rng.random(len(persons)) < 1 / (1 + np.exp(-logits))
+
+        estimated_discrimination, estimated_difficulty = calibrate(persons, items, correct, np.zeros(20))
+
+        self.assertGreater(np.corrcoef(difficulty, estimated_difficulty)[0, 1], 0.98)
+        self.assertGreater(np.corrcoef(discrimination, estimated_discrimination)[0, 1], 0.8)
+        self.assertLess(np.abs(estimated_difficulty - difficulty).mean(), 0.25)
+
+    def test_ability_and_selection(self):
+        bank = ItemBank(range(9), np.ones(9), np.linspace(-2, 2, 9), {})
+
+        theta, standard_error = bank.estimate_ability(np.array([3, 4, 5]), np.array([True, True, True]))
+        self.assertGreater(theta, 0.5)
+        self.assertLess(standard_error, 1)
+        prior_theta, prior_standard_error = bank.estimate_ability(np.array([], dtype=np.int64),
+                                                                  np.array([], dtype=bool))
+        self.assertAlmostEqual(prior_theta, 0)
+        self.assertAlmostEqual(prior_standard_error, 1, places=2)
+        self.assertLess(bank.estimate_ability(np.array([3]), np.array([False]))[0], 0)
+
+        available = np.array([0, 1, 2, 6, 7, 8])
+        self.assertEqual(bank.most_informative(theta, available), 6)
+        self.assertEqual(bank.most_informative(-1.4, available), 1)
+
+    def test_calibrate_item_parameters(self):
+        easy, medium, hard = self.questions[1:]
+        for index in range(40):
+            result = Result.objects.create(user=self.user, quiz=self.quiz, time_taken=timedelta(minutes=1),
+                                           submission_time=timezone.now())
+            # The medium question turns out to be the hardest.
+            for question, correct in ((easy, index % 10 != 0), (medium, index % 10 == 0), (hard, index % 2 == 0)):
+                SubmittedAnswer.objects.create(
+                    quiz_result=result, question=question, submission_time=result.submission_time,
+                    selected_answer_ids=[question.answers.get(is_correct=correct).id],
+                )
+
+        self.assertEqual(calibrate_item_parameters(), 3)
+
+        parameters = ItemParameters.objects.in_bulk([easy.id, medium.id, hard.id])
+        self.assertEqual(parameters[easy.id].responses, 40)
+        self.assertLess(parameters[easy.id].difficulty, parameters[hard.id].difficulty)
+        self.assertLess(parameters[hard.id].difficulty, parameters[medium.id].difficulty)
+        bank = get_item_bank(self.category.id)
+        self.assertEqual(bank.difficulty[bank.index[medium.id]], parameters[medium.id].difficulty)
+        self.assertEqual(bank.difficulty[bank.index[self.question.id]], -1)
+
+    def test_moved_question_leaves_the_item_bank(self):
+        other_category = Category.objects.create(name='Other Category')
+        self.assertIn(self.question.id, get_item_bank(self.category.id).index)
+        self.assertNotIn(self.question.id, get_item_bank(other_category.id).index)
+
+        question = Question.objects.get(pk=self.question.id)
+        question.category = other_category
+        question.save()
+
+        self.assertNotIn(self.question.id, get_item_bank(self.category.id).index)
+        self.assertIn(self.question.id, get_item_bank(other_category.id).index)
+
+    def test_adaptive_quiz_questions_must_be_of_its_category(self):
+        other_category = Category.objects.create(name='Other Category')
+        other_question = Question.objects.create(text='Other', category=other_category)
+
+        response = self.client.post(reverse('quiz-create'), {
+            'title': 'Adaptive', 'category': self.category.id, 'time_limit': '00:10:00', 'adaptive_length': 2,
+            'questions': [self.question.id, other_question.id],
+            'scores': [{'question': self.question.id, 'score': 5}, {'question': other_question.id, 'score': 5}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['questions'],
+                         ['The questions of an adaptive quiz must be of the category of the quiz.'])
+
+        response = self.client.patch(reverse('quiz-update-delete', args=[self.quiz.id]),
+                                     {'category': other_category.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_adaptive_attempt(self):
+        attempt_id = self.client.post(reverse('attempt-start', args=[self.quiz.unique_link])).data['id']
+        self.assertEqual(self.client.get(reverse('attempt-detail', args=[attempt_id])).data['answers'], [])
+
+        response = self.next_question(attempt_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = response.data['question']
+        # The easy questions are the most informative about an average taker.
+        self.assertIn(first['id'], (self.question.id, self.questions[2].id))
+        self.assertNotIn('is_correct', first['answers'][0])
+        self.assertEqual((response.data['ability'], response.data['remaining']), (0, 2))
+        self.assertEqual(self.next_question(attempt_id).data['question']['id'], first['id'])
+        unasked = next(question for question in self.questions if question.id != first['id'])
+        self.assertEqual(self.answer(attempt_id, unasked, True).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.answer(attempt_id, Question.objects.get(pk=first['id']), True)
+        response = self.next_question(attempt_id)
+        second = Question.objects.get(pk=response.data['question']['id'])
+        self.assertNotEqual(second.id, first['id'])
+        self.assertGreater(response.data['ability'], 0)
+        self.assertEqual(response.data['remaining'], 1)
+
+        self.answer(attempt_id, second, False)
+        response = self.next_question(attempt_id)
+        self.assertEqual((response.data['question'], response.data['remaining']), (None, 0))
+
+        response = self.client.post(reverse('attempt-submit', args=[attempt_id]), {'feedback': 'Fine'}, format='json')
+        self.assertEqual((response.data['score'], response.data['max_score']), (10, 20))
+
+    def test_fixed_quiz(self):
+        self.quiz.adaptive_length = None
+        self.quiz.save()
+        attempt_id = self.client.post(reverse('attempt-start', args=[self.quiz.unique_link])).data['id']
+
+        self.assertEqual(self.next_question(attempt_id).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.next_question('missing').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MonitorTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz.time_limit = timedelta(minutes=10)
+        self.quiz.save()
+        self.pubsub = get_redis().pubsub()
+        self.pubsub.subscribe(monitor_channel(self.quiz.id))
+        self.addCleanup(self.pubsub.close)
+
+    def events(self):
+        events = []
+        while (message := self.pubsub.get_message(timeout=0.1)) is not None:
+            if message['type'] != 'message':
+                continue
+            event, data = message['data'].split('\n', 1)
+            events.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+        return events
+
+    def test_attempt_events(self):
+        attempt_id = self.client.post(reverse('attempt-start', args=[self.quiz.unique_link])).data['id']
+        self.client.patch(reverse('attempt-detail', args=[attempt_id]), {
+            'answers': [{'question': self.question.id, 'selected_answers': [self.answer1.id]}],
+        }, format='json')
+        self.client.post(reverse('attempt-submit', args=[attempt_id]), format='json')
+
+        (started, started_data), (autosaved, autosaved_data), (submitted, submitted_data) = self.events()
+        self.assertEqual((started, autosaved, submitted), ('started', 'autosaved', 'submitted'))
+        self.assertEqual((started_data['attempt'], started_data['user']), (attempt_id, self.user.id))
+        self.assertEqual(started_data['stats']['in_progress'], 1)
+        self.assertEqual(autosaved_data, {'attempt': attempt_id, 'user': self.user.id, 'questions': [self.question.id]})
+        self.assertEqual((submitted_data['attempt'], submitted_data['score'], submitted_data['expired']),
+                         (attempt_id, 10, False))
+        self.assertEqual(submitted_data['stats'], {
+            'started': 1, 'in_progress': 0, 'submitted': 1, 'average_score': 10.0, 'average_percentage': 100.0,
+        })
+
+    def test_submitted_result_events(self):
+        self.client.post(reverse('quiz-submit'), {
+            'user': self.user.id, 'quiz': self.quiz.id, 'time_taken': '00:05:00', 'feedback': 'Fine',
+            'answers': [{'question': self.question.id, 'answer_type': 0, 'selected_answers': [self.answer1.id]}],
+        }, format='json')
+
+        [(event, data)] = self.events()
+        self.assertEqual((event, data['attempt'], data['score'], data['max_score'], data['time_taken']),
+                         ('submitted', None, 10, 10, 300.0))
+        self.assertEqual(data['stats'], {
+            'started': 0, 'in_progress': 0, 'submitted': 1, 'average_score': 10.0, 'average_percentage': 100.0,
+        })
+
+    def test_expired_attempt_events(self):
+        attempt, _ = start_attempt(self.user, self.quiz)
+
+        with mock.patch('quizzes.attempts.time.time', return_value=time_module.time() + 601):
+            flush_expired_attempts()
+
+        (started, _), (submitted, data) = self.events()
+        self.assertEqual((started, submitted, data['attempt'], data['expired']),
+                         ('started', 'submitted', attempt.id, True))
+
+    @override_settings(MONITOR_HEARTBEAT_INTERVAL=0.05)
+    def test_monitor_events(self):
+        start_attempt(self.user, self.quiz)
+
+        async def stream():
+            events = monitor_events(self.quiz.id)
+            try:
+                stats = await anext(events)
+                await asyncio.to_thread(get_redis().publish, monitor_channel(self.quiz.id), 'event: test\n\n')
+                return [stats, await anext(events), await anext(events)]
+            finally:
+                await events.aclose()
+
+        stats, event, heartbeat = asyncio.run(stream())
+        self.assertEqual(stats, 'retry: 1000\nevent: stats\ndata: {"started":1,"in_progress":1,"submitted":0,'
+                                '"average_score":null,"average_percentage":null}\n\n')
+        self.assertEqual(event, b'event: test\n\n')
+        self.assertEqual(heartbeat, ': heartbeat\n\n')
+
+    @override_settings(MONITOR_HEARTBEAT_INTERVAL=0.05, MONITOR_STREAM_LIFETIME=0.12)
+    def test_monitor_events_end_after_their_lifetime(self):
+        async def stream():
+            return [event async for event in monitor_events(self.quiz.id)]
+
+        stats, *heartbeats = asyncio.run(stream())
+        self.assertTrue(stats.startswith('retry: 1000\nevent: stats\n'))
+        self.assertEqual(heartbeats, [': heartbeat\n\n'] * 3)
+
+    def test_monitor_token(self):
+        response = self.client.post(reverse('quiz-monitor-token', args=[self.quiz.unique_link]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(signing.loads(response.data['token'], salt='quizzes.monitoring'), [self.user.id, self.quiz.id])
+        self.assertEqual(response.data['expires_in'], 60)
+        self.assertEqual(self.client.post(reverse('quiz-monitor-token', args=['missing'])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    async def test_monitor_view_with_token(self):
+        url = reverse('quiz-monitor', args=[self.quiz.unique_link])
+        other_quiz = await Quiz.objects.acreate(title='Other', category=self.category, time_limit=timedelta(minutes=1),
+                                                unique_link='other-link')
+
+        token = monitor_token(self.user.id, self.quiz.id)
+
+        response = await self.async_client.get(url, {'token': token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        events = aiter(response.streaming_content)
+        self.assertIn(b'event: stats\n', await anext(events))
+        await events.aclose()
+
+        response = await self.async_client.get(reverse('quiz-monitor', args=[other_quiz.unique_link]), {'token': token})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual((await self.async_client.get(url, {'token': token + 'x'})).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        with override_settings(MONITOR_TOKEN_MAX_AGE=-1):
+            self.assertEqual((await self.async_client.get(url, {'token': token})).status_code,
+                             status.HTTP_401_UNAUTHORIZED)
+
+    async def test_monitor_view(self):
+        url = reverse('quiz-monitor', args=[self.quiz.unique_link])
+        noob = await User.objects.acreate(email='noob@user.com', role='noob')
+        token = await asyncio.to_thread(lambda: str(create_custom_token(self.user).access_token))
+        noob_token = await asyncio.to_thread(lambda: str(create_custom_token(noob).access_token))
+
+        self.assertEqual((await self.async_client.get(url)).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get(url, headers={'Authorization': f'Bearer {noob_token}'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = await self.async_client.get(reverse('quiz-monitor', args=['missing']),
+                                               headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.async_client.get(url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response['Content-Type'], response['X-Accel-Buffering']), ('text/event-stream', 'no'))
+        events = aiter(response.streaming_content)
+        self.assertTrue((await anext(events)).startswith(b'retry: 1000\nevent: stats\n'))
+        await events.aclose()
+
+
+class UserResultListViewTestCase(BaseAPITestCase):
+    def test_filter_results_by_submission_period(self):
+        Result.objects.create(user=self.user, quiz=self.quiz, time_taken=timedelta(seconds=5),
+                              submission_time=timezone.now() - timedelta(days=400))
+        url = reverse('user-results', args=[self.user.id])
+
+        response = self.client.get(url)
+        self.assertEqual(len(response.data), 2)
+
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = self.client.get(url, {'since': since})
+        self.assertEqual([result['id'] for result in response.data], [self.result.id])
+
+    def test_filter_results_invalid_date(self):
+        response = self.client.get(reverse('user-results', args=[self.user.id]), {'until': 'yesterday'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('user-results', args=[self.user.id]), {'since': '2024-02-30'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkListSerializerTestCase(BaseAPITestCase):
+    def test_fields_with_another_source(self):
+        class ItemSerializer(serializers.Serializer):
+            item = BulkPrimaryKeyRelatedField(source='question', queryset=Question.objects.all())
+
+        serializer = BulkListSerializer(child=ItemSerializer(), data=[{'item': self.question.id}] * 3)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data, [{'question': self.question}] * 3)
+
+
+class AsyncReadViewTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # The async views authenticate the request themselves, `force_authenticate` does not apply.
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {create_custom_token(self.user).access_token}')
+
+    def assertSameResponse(self, sync_url, async_url, params=None):
+        sync_response = self.client.get(sync_url, params)
+        async_response = self.client.get(async_url, params)
+
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.json(), sync_response.json())
+        return async_response
+
+    def test_quiz_detail(self):
+        response = self.assertSameResponse(reverse('quiz-detail', args=[self.quiz.unique_link]),
+                                           reverse('quiz-detail-async', args=[self.quiz.unique_link]))
+
+        self.assertEqual(response.json()['questions'][0]['score'], 10)
+        self.assertEqual(response.json()['questions'][0]['answers'][0]['text'], 'Test Answer 1')
+
+    def test_quiz_detail_not_found(self):
+        response = self.client.get(reverse('quiz-detail-async', args=['non-existent-link']))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), {'detail': 'Quiz not found'})
+
+    def test_select_questions(self):
+        Favorite.objects.create(user=self.user, question=self.question)
+        Question.objects.create(text='Other Question', category=self.category, difficulty=2)
+
+        for params in ({'quantity': 5}, {'difficulty': 2}, {'favorited_only': 'true'}):
+            self.assertSameResponse(reverse('question-select'), reverse('question-select-async'), params)
+
+    def test_user_results(self):
+        Result.objects.create(user=self.user, quiz=self.quiz, time_taken=timedelta(seconds=5),
+                              submission_time=timezone.now() - timedelta(days=400))
+        sync_url = reverse('user-results', args=[self.user.id])
+        async_url = reverse('user-results-async', args=[self.user.id])
+
+        response = self.assertSameResponse(sync_url, async_url)
+        self.assertEqual(len(response.json()), 2)
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        self.assertSameResponse(sync_url, async_url, {'since': since})
+        self.assertSameResponse(sync_url, async_url, {'until': 'yesterday'})
+
+    def test_unauthenticated(self):
+        self.client.credentials()
+        response = self.client.get(reverse('quiz-detail-async', args=[self.quiz.unique_link]))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+    def test_not_sensei(self):
+        noob = User.objects.create_user(email='noob@user.com', password='testpassword')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {create_custom_token(noob).access_token}')
+        response = self.client.get(reverse('question-select-async'))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PartitioningTestCase(BaseAPITestCase):
+    def partition_of(self, model, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT tableoid::regclass::text FROM {model._meta.db_table} WHERE id = %s', [pk])
+            return cursor.fetchone()[0]
+
+    def test_results_are_stored_in_monthly_partitions(self):
+        month = month_start(self.result.submission_time)
+
+        self.assertEqual(self.partition_of(Result, self.result.pk), partition_name('quizzes_result', month))
+
+    def test_create_partitions_moves_rows_out_of_default_partition(self):
+        submission_time = add_months(month_start(timezone.now()), 12)
+        result = Result.objects.create(user=self.user, quiz=self.quiz, time_taken=timedelta(seconds=5),
+                                       submission_time=submission_time)
+        self.assertEqual(self.partition_of(Result, result.pk), 'quizzes_result_default')
+
+        call_command('create_partitions', months_ahead=12, stdout=StringIO())
+
+        self.assertEqual(self.partition_of(Result, result.pk), partition_name('quizzes_result', submission_time))
+        self.assertEqual(Result.objects.get(pk=result.pk).submission_time, submission_time)
+
+
+class GradingQueueTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.open_question = Question.objects.create(text='Why?', category=self.category, answer_type=2)
+        self.quiz.questions.add(self.open_question)
+        QuestionScore.objects.create(question=self.open_question, quiz=self.quiz, score=5)
+        self.other_grader = User.objects.create_user(email='other@user.com', password='testpassword', role='sensei',
+                                                     status='accepted')
+        self.answers = []
+        for index in range(4):
+            result = Result.objects.create(user=self.user, quiz=self.quiz, time_taken=timedelta(seconds=5),
+                                           submission_time=timezone.now() - timedelta(minutes=4 - index))
+            submitted_answer = SubmittedAnswer.objects.create(quiz_result=result, question=self.open_question,
+                                                              submission_time=result.submission_time)
+            self.answers.append(OpenEndedAnswer.objects.create(submitted_answer=submitted_answer,
+                                                               answer_text=f'Because {index}',
+                                                               submission_time=result.submission_time))
+        self.answers[3].score = 3
+        self.answers[3].save()
+        self.user.total_tests_taken = 4
+        self.user.save()
+
+    def claim(self, grader=None, **data):
+        self.client.force_authenticate(grader or self.user)
+        response = self.client.post(reverse('grading-queue-claim'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [answer['id'] for answer in response.data['answers']], response
+
+    def review(self, grader, answer, score=4):
+        self.client.force_authenticate(grader)
+        return self.client.post(reverse('open-ended-review'), {'open_ended_answer_id': answer.id, 'score': score},
+                                format='json')
+
+    def test_claim(self):
+        claimed, response = self.claim(size=2)
+
+        self.assertEqual(claimed, [self.answers[0].id, self.answers[1].id])
+        answer = response.data['answers'][0]
+        self.assertEqual(answer['answer_text'], 'Because 0')
+        self.assertEqual(answer['question'], {'id': self.open_question.id, 'text': 'Why?', 'max_score': 5})
+        self.assertEqual((answer['quiz'], answer['result']),
+                         (self.quiz.id, self.answers[0].submitted_answer.quiz_result_id))
+        self.answers[0].refresh_from_db()
+        self.assertEqual(self.answers[0].grader, self.user)
+        self.assertGreater(self.answers[0].lease_expires, timezone.now() + timedelta(seconds=590))
+
+        self.assertEqual(self.claim(self.other_grader, size=5)[0], [self.answers[2].id])
+        self.assertEqual(self.claim(size=5)[0], [self.answers[0].id, self.answers[1].id])
+
+    def test_claim_filters(self):
+        self.assertEqual(len(self.claim(question=self.open_question.id)[0]), 3)
+        self.assertEqual(self.claim(question=self.question.id)[0], [])
+        self.assertEqual(self.claim(self.other_grader, quiz=self.quiz.id)[0], [])
+        self.assertEqual(self.claim(self.other_grader, quiz=self.quiz.id + 1)[0], [])
+
+    def test_claim_skips_locked_answers(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.claim(size=1)
+
+        self.assertTrue(any('FOR UPDATE OF "quizzes_openendedanswer" SKIP LOCKED' in query['sql']
+                            for query in queries.captured_queries))
+
+    def test_expired_leases_are_claimed_again(self):
+        self.claim(size=1)
+        OpenEndedAnswer.objects.filter(pk=self.answers[0].pk).update(lease_expires=timezone.now())
+
+        self.assertEqual(self.claim(self.other_grader, size=1)[0], [self.answers[0].id])
+
+    def test_review_needs_the_lease(self):
+        self.claim(size=1)
+
+        self.assertEqual(self.review(self.other_grader, self.answers[0]).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.review(self.user, self.answers[0]).status_code, status.HTTP_200_OK)
+        self.answers[0].refresh_from_db()
+        self.assertEqual((self.answers[0].score, self.answers[0].grader, self.answers[0].lease_expires),
+                         (4, self.user, None))
+        self.assertEqual(self.answers[0].submitted_answer.quiz_result.score, 4)
+        self.assertEqual(self.review(self.other_grader, self.answers[0]).status_code, status.HTTP_400_BAD_REQUEST)
+        # Answers which have not been claimed can be reviewed directly.
+        self.assertEqual(self.review(self.other_grader, self.answers[2]).status_code, status.HTTP_200_OK)
+
+    def test_zero_score_grades_the_answer(self):
+        self.assertEqual(self.review(self.user, self.answers[0], score=0).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.review(self.user, self.answers[0], score=0).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_review_missing_answer(self):
+        missing = OpenEndedAnswer(id=self.answers[0].id + 1000)
+
+        self.assertEqual(self.review(self.user, missing).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_release(self):
+        claimed, _ = self.claim(size=2)
+
+        self.client.force_authenticate(self.other_grader)
+        response = self.client.post(reverse('grading-queue-release'), {'answers': claimed}, format='json')
+        self.assertEqual(response.data['released'], 0)
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('grading-queue-release'), {'answers': claimed[:1]}, format='json')
+        self.assertEqual(response.data['released'], 1)
+
+        self.assertEqual(self.claim(self.other_grader, size=5)[0], [self.answers[0].id, self.answers[2].id])
+
+    def test_not_sensei(self):
+        self.client.force_authenticate(User.objects.create_user(email='noob@user.com', password='testpassword'))
+
+        self.assertEqual(self.client.post(reverse('grading-queue-claim'), {}, format='json').status_code,
+                         status.HTTP_403_FORBIDDEN)
+
+
+class PackedSelectedAnswersTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.answer2 = Answer.objects.create(text='Test Answer 2', question=self.question)
+        self.legacy_answer = SubmittedAnswer.objects.create(quiz_result=self.result, question=self.question,
+                                                           submission_time=self.result.submission_time)
+        for answer in (self.answer1, self.answer2):
+            SelectedAnswer.objects.create(submitted_answer=self.legacy_answer, answer=answer,
+                                          submission_time=self.result.submission_time)
+
+    def test_result_detail_reads_both_layouts(self):
+        SubmittedAnswer.objects.create(quiz_result=self.result, question=self.question,
+                                       selected_answer_ids=[self.answer2.id],
+                                       submission_time=self.result.submission_time)
+
+        response = self.client.get(reverse('user-result-detail', args=[self.result.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selected = [[answer['id'] for answer in answer_data['selected_answers']]
+                    for answer_data in response.data['answers']]
+        self.assertCountEqual(selected, [[self.answer1.id, self.answer2.id], [self.answer2.id]])
+
+    def test_pack_selected_answers(self):
+        call_command('pack_selected_answers', delete_legacy=True, stdout=StringIO())
+
+        self.legacy_answer.refresh_from_db()
+        self.assertEqual(self.legacy_answer.selected_answer_ids, [self.answer1.id, self.answer2.id])
+        self.assertFalse(SelectedAnswer.objects.exists())
+        self.assertTrue(SubmittedAnswer.objects.filter(selected_answer_ids__contains=[self.answer2.id]).exists())
+
+
+@override_settings(QUIZ_EMAIL_CHUNK_SIZE=2, QUIZ_EMAIL_RATE_LIMIT=1000000, QUIZ_EMAIL_RATE_KEY='test-quiz-email-rate')
+class QuizLinkEmailTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipients = ['a@user.com', 'b@user.com', 'c@user.com']
+        app.conf.task_always_eager = True
+        get_reserve_send_slot_script().registered_client.delete('test-quiz-email-rate')
+
+    def tearDown(self):
+        app.conf.task_always_eager = False
+        super().tearDown()
+
+    def test_send_individual_messages_in_chunks(self):
+        send_quiz_link_to_students(self.recipients, self.quiz.unique_link)
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), self.recipients)
+        self.assertTrue(all(len(message.to) == 1 for message in mail.outbox))
+        self.assertEqual(
+            set(QuizEmailDelivery.objects.values_list('status', flat=True)), {QuizEmailDelivery.Status.SENT}
+        )
+
+    def test_refused_recipient_does_not_fail_the_chunk(self):
+        send_messages = locmem.EmailBackend.send_messages
+
+        def refuse_b(backend, messages):
+            if messages[0].to == ['b@user.com']:
+                raise smtplib.SMTPRecipientsRefused({'b@user.com': (550, b'No such user')})
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', refuse_b):
+            send_quiz_link_to_students(self.recipients, self.quiz.unique_link)
+
+        statuses = dict(QuizEmailDelivery.objects.values_list('email', 'status'))
+        self.assertEqual(statuses, {
+            'a@user.com': QuizEmailDelivery.Status.SENT,
+            'b@user.com': QuizEmailDelivery.Status.FAILED,
+            'c@user.com': QuizEmailDelivery.Status.SENT,
+        })
+
+    def test_transient_error_is_retried_for_failed_recipient(self):
+        send_messages = locmem.EmailBackend.send_messages
+        failures = []
+
+        def fail_once(backend, messages):
+            if messages[0].to == ['c@user.com'] and not failures:
+                failures.append(messages[0])
+                raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', fail_once):
+            send_quiz_link_to_students(self.recipients, self.quiz.unique_link)
+
+        delivery = QuizEmailDelivery.objects.get(email='c@user.com')
+        self.assertEqual(delivery.status, QuizEmailDelivery.Status.SENT)
+        self.assertEqual(delivery.attempts, 2)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_connection_is_reopened_after_transient_error(self):
+        send_messages = locmem.EmailBackend.send_messages
+        opened, failures = [], []
+
+        def fail_once(backend, messages):
+            if messages[0].to == ['a@user.com'] and not failures:
+                failures.append(messages[0])
+                raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', fail_once), \
+                mock.patch.object(locmem.EmailBackend, 'open', lambda backend: opened.append(backend)):
+            send_quiz_link_to_students(self.recipients, self.quiz.unique_link)
+
+        # One connection per chunk, one for the retry of a@user.com and one to go on after the error.
+        self.assertEqual(len(opened), 4)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_deliveries_fail_when_retries_are_exhausted(self):
+        def refuse_connection(backend):
+            raise smtplib.SMTPConnectError(421, b'Service not available')
+
+        with mock.patch.object(locmem.EmailBackend, 'open', refuse_connection):
+            send_quiz_link_to_students(self.recipients, self.quiz.unique_link)
+
+        self.assertEqual(
+            set(QuizEmailDelivery.objects.values_list('status', flat=True)), {QuizEmailDelivery.Status.FAILED}
+        )
+        self.assertIn('Service not available', QuizEmailDelivery.objects.first().error)
+        self.assertEqual(set(QuizEmailDelivery.objects.values_list('attempts', flat=True)),
+                         {settings.QUIZ_EMAIL_MAX_RETRIES + 1})
+
+    @override_settings(QUIZ_EMAIL_RATE_LIMIT=2)
+    def test_send_slots_are_shared(self):
+        self.assertEqual(reserve_send_slot(), 0)
+        self.assertAlmostEqual(reserve_send_slot(), 0.5, delta=0.1)
+
+    def test_rest_of_the_chunk_waits_for_a_free_send_slot(self):
+        deliveries = QuizEmailDelivery.objects.bulk_create(
+            QuizEmailDelivery(quiz=self.quiz, email=email) for email in self.recipients
+        )
+
+        with mock.patch('utils.mail.reserve_send_slot', side_effect=[0, 0.25]), \
+                mock.patch.object(send_quiz_link_chunk, 'apply_async') as apply_async:
+            send_quiz_link_chunk([delivery.id for delivery in deliveries])
+
+        self.assertEqual([message.to for message in mail.outbox], [['a@user.com']])
+        apply_async.assert_called_once_with(args=[[deliveries[1].id, deliveries[2].id]], countdown=0.25, retries=0)
+        self.assertEqual(dict(QuizEmailDelivery.objects.values_list('email', 'attempts')),
+                         {'a@user.com': 1, 'b@user.com': 0, 'c@user.com': 0})
+
+    def test_unknown_quiz_link_is_skipped(self):
+        send_quiz_link_to_students(self.recipients, 'unknown-link')
+
+        self.assertFalse(QuizEmailDelivery.objects.exists())
+        self.assertEqual(mail.outbox, [])
+
+
+class ORJSONTestCase(BaseAPITestCase):
+    def test_renders_like_json_renderer(self):
+        data = {
+            'decimal': Decimal('97.50'),
+            'duration': timedelta(minutes=5, microseconds=1500),
+            'datetime': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+            'naive_datetime': datetime(2024, 1, 2, 3, 4, 5),
+            'date': date(2024, 1, 2),
+            'time': time(3, 4, 5, 678901),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'lazy': gettext_lazy('Quiz'),
+            'separators': 'a\u2028b\u2029c',
+            'nested': [{1: 'int key', 'unicode': 'ქართული'}, (1.5, None, True)],
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(data, 'application/json; indent=4'),
+                         JSONRenderer().render(data, 'application/json; indent=4'))
+
+    def test_api_responses_are_unchanged(self):
+        OpenEndedAnswer.objects.create(
+            submitted_answer=SubmittedAnswer.objects.create(quiz_result=self.result, question=self.question,
+                                                            submission_time=self.result.submission_time),
+            answer_text='Answer', submission_time=self.result.submission_time,
+        )
+        for url in (reverse('quiz-detail', args=[self.quiz.unique_link]), reverse('quiz-list'),
+                    reverse('user-result-detail', args=[self.result.id]), reverse('users:user-info')):
+            response = self.client.get(url)
+
+            self.assertEqual(response.content, JSONRenderer().render(response.data), url)
+
+    def test_parse(self):
+        parser = ORJSONParser()
+
+        self.assertEqual(parser.parse(io.BytesIO('{"text": "ქართული", "score": 1.5}'.encode())),
+                         {'text': 'ქართული', 'score': 1.5})
+        self.assertEqual(parser.parse(io.BytesIO('{"text": "é"}'.encode('latin-1')),
+                                      parser_context={'encoding': 'latin-1'}), {'text': 'é'})
+        for content in (b'{"score": NaN}', b'{"score": Infinity}', b'{"score": '):
+            with self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(content))
+
+    def test_invalid_json_request(self):
+        response = self.client.post(reverse('quiz-submit'), b'{"quiz": ', content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.data['detail'].startswith('JSON parse error'))
+
+
+class ValuesSerializerTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        renditions = {'source': 'question_images/photo.jpg', 'small': 'renditions/small.webp',
+                      'medium': 'renditions/medium.webp', 'large': 'renditions/large.webp'}
+        self.other_question = Question.objects.create(
+            text='Other Question', category=self.category, answer_type=1, difficulty=2,
+            image='question_images/photo.jpg', image_renditions=renditions,
+        )
+        Answer.objects.create(question=self.other_question, text=None, image='answer_images/new.jpg')
+        Answer.objects.create(question=self.other_question, text='Other Answer', is_correct=True,
+                              image='question_images/photo.jpg', image_renditions=renditions)
+        other_quiz = Quiz.objects.create(title='Other Quiz', category=self.category,
+                                         time_limit=timedelta(minutes=30, microseconds=5))
+        other_quiz.questions.add(self.question, self.other_question)
+        QuestionScore.objects.create(question=self.other_question, quiz=other_quiz, score=5)
+        Quiz.objects.create(title='Empty Quiz', category=self.category, time_limit=timedelta(days=1))
+        Result.objects.create(user=self.user, quiz=other_quiz, score=2.5, time_taken=timedelta(seconds=5),
+                              submission_time=timezone.now() - timedelta(days=40, microseconds=7))
+
+    @staticmethod
+    def contexts():
+        factory = APIRequestFactory()
+        return ({}, {'request': Request(factory.get('/'))}, {'request': Request(factory.get('/?image_size=large'))},
+                {'request': Request(factory.post('/'))})
+
+    def assertSameRepresentation(self, values_serializer, serializer):
+        self.assertEqual(values_serializer.data, serializer.data)
+        self.assertEqual(ORJSONRenderer().render(values_serializer.data), ORJSONRenderer().render(serializer.data))
+
+    def test_questions(self):
+        questions = QuestionSelectView.select_questions(self.user, {})
+        for context in self.contexts():
+            with self.subTest(context=context):
+                self.assertSameRepresentation(QuestionValuesSerializer(questions, context=context),
+                                              QuestionSerializer(questions, many=True, context=context))
+
+    def test_quizzes(self):
+        quizzes = Quiz.objects.prefetch_related(*QuizDetailSerializer.prefetch)
+        for context in self.contexts():
+            with self.subTest(context=context):
+                self.assertSameRepresentation(QuizValuesSerializer(quizzes, context=context),
+                                              QuizDetailSerializer(quizzes, many=True, context=context))
+
+    def test_user_results(self):
+        results = UserResultListView.filter_results(self.user.id, {})
+        self.assertSameRepresentation(UserResultValuesSerializer(results),
+                                      UserResultListSerializer(results, many=True))
+        with override_settings(TIME_ZONE='Asia/Tbilisi'), timezone.override('Asia/Tbilisi'):
+            self.assertSameRepresentation(UserResultValuesSerializer(results),
+                                          UserResultListSerializer(results, many=True))
+
+    def test_empty_lists(self):
+        self.assertEqual(QuestionValuesSerializer(Question.objects.none()).data, [])
+        self.assertEqual(QuizValuesSerializer(Quiz.objects.none()).data, [])
+
+    def test_views(self):
+        response = self.client.get(reverse('question-select'), {'quantity': 1, 'difficulty': 2})
+        self.assertEqual(response.data, {
+            'questions': QuestionSerializer(Question.objects.filter(difficulty=2), many=True).data,
+        })
+
+        response = self.client.get(reverse('quiz-list'))
+        quizzes = QuizDetailSerializer(Quiz.objects.prefetch_related(*QuizDetailSerializer.prefetch), many=True,
+                                       context={'request': response.wsgi_request})
+        self.assertEqual(response.content, ORJSONRenderer().render(quizzes.data))
+        self.assertNotIn('is_correct', response.data[1]['questions'][1]['answers'][0])
+
+
+class TaskQueueTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.purge_queues()
+
+    def tearDown(self):
+        self.purge_queues()
+        super().tearDown()
+
+    @staticmethod
+    def purge_queues():
+        with app.connection_for_write() as connection:
+            for queue in app.amqp.queues:
+                try:
+                    connection.default_channel.queue_purge(queue)
+                except connection.channel_errors:
+                    pass
+
+    def test_tasks_are_routed_by_kind(self):
+        routes = {name: app.amqp.router.route({}, name)['queue'].name
+                  for name in ('send_mail', 'send_quiz_link_chunk', 'generate_image_renditions', 'unrouted')}
+
+        self.assertEqual(routes, {'send_mail': 'email', 'send_quiz_link_chunk': 'email',
+                                  'generate_image_renditions': 'bulk', 'unrouted': 'default'})
+        self.assertTrue(images.generate_image_renditions.acks_late)
+
+    def test_task_metrics(self):
+        labels = {'task': 'generate_image_renditions', 'queue': 'bulk', 'state': 'SUCCESS'}
+        counter = TASKS.counter_name(labels, 'total')
+        before = request_metrics.get([counter])[counter]
+
+        images.generate_image_renditions.apply(args=('quizzes.Question', self.question.id, 'image', 'replaced.jpg'))
+
+        self.assertEqual(request_metrics.get([counter])[counter], before + 1)
+        self.assertIn('celery_task_duration_seconds_count{task="generate_image_renditions",queue="bulk"}',
+                      render_metrics())
+
+    def test_queue_depth(self):
+        images.generate_image_renditions.delay('quizzes.Question', self.question.id, 'image', 'photo.jpg')
+
+        metrics = render_metrics()
+
+        self.assertIn('celery_queue_depth{queue="bulk"} 1', metrics)
+        self.assertIn('celery_queue_depth{queue="email"} 0', metrics)
+
+
+class ImageRenditionTestCase(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root,
+                                                   PROTECTED_MEDIA_ROOT=f'{self.media_root}/protected')
+        self.settings_override.enable()
+        app.conf.task_always_eager = True
+
+    def tearDown(self):
+        app.conf.task_always_eager = False
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+        super().tearDown()
+
+    @staticmethod
+    def jpeg():
+        output = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera maker'
+        Image.new('RGB', (2000, 1000), 'red').save(output, format='JPEG', exif=exif)
+        return output.getvalue()
+
+    def test_renditions_are_generated_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.question.image.save('photo.jpg', ContentFile(self.jpeg()))
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.image_renditions, {})
+
+        for callback in callbacks:
+            callback()
+
+        self.question.refresh_from_db()
+        renditions = self.question.image_renditions
+        self.assertEqual(renditions['source'], self.question.image.name)
+        with self.question.image.storage.open(renditions['medium']) as file, Image.open(file) as rendition:
+            self.assertEqual(rendition.format, 'WEBP')
+            self.assertEqual(rendition.size, (640, 320))
+            self.assertNotIn('exif', rendition.info)
+
+        response = self.client.get(reverse('question-detail', args=[self.question.id]))
+        self.assertIn('/640-q80.webp?expires=', response.data['image'])
+        self.assertTrue(response.data['answers'][0]['image'] is None)
+
+        response = self.client.get(reverse('question-detail', args=[self.question.id]), {'image_size': 'large'})
+        self.assertIn('/1280-q80.webp?expires=', response.data['image'])
+
+    def test_identical_images_are_processed_once(self):
+        with mock.patch.object(images, 'render_webp', wraps=images.render_webp) as render_webp:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.question.image.save('photo.jpg', ContentFile(self.jpeg()))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.answer1.image.save('copy.jpg', ContentFile(self.jpeg()))
+
+        self.assertEqual(render_webp.call_count, 3)
+        self.question.refresh_from_db()
+        self.answer1.refresh_from_db()
+        self.assertEqual(self.question.image_renditions['hash'], self.answer1.image_renditions['hash'])
+
+    def test_rehash_media_keeps_shared_originals_until_every_image_is_moved(self):
+        # Images uploaded before content hash names kept their upload name.
+        legacy_name = 'question_images/legacy.jpg'
+        os.makedirs(default_storage.path('question_images'))
+        with open(default_storage.path(legacy_name), 'wb') as file:
+            file.write(self.jpeg())
+        Question.objects.filter(pk=self.question.pk).update(image=legacy_name)
+        Answer.objects.filter(pk=self.answer1.pk).update(image=legacy_name)
+
+        call_command('rehash_media', delete_originals=True, stdout=StringIO(), stderr=StringIO())
+
+        self.question.refresh_from_db()
+        self.answer1.refresh_from_db()
+        self.assertRegex(self.question.image.name, r'^question_images/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(self.answer1.image.name, self.question.image.name)
+        self.assertTrue(self.answer1.image.storage.exists(self.answer1.image.name))
+        self.assertFalse(default_storage.exists(legacy_name))
+
+    def test_images_are_stored_under_content_hash_names(self):
+        self.question.image.save('photo.JPG', ContentFile(self.jpeg()))
+        self.answer1.image.save('other-name.jpg', ContentFile(self.jpeg()))
+
+        self.assertRegex(self.question.image.name, r'^question_images/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(self.answer1.image.name.split('/')[1], self.question.image.name.split('/')[1])
+        self.assertFalse(default_storage.exists(self.question.image.name))
+        self.assertTrue(self.question.image.url.startswith('/protected-media/question_images/'))
+
+    def test_protected_media_is_sent_by_nginx(self):
+        self.question.image.save('photo.jpg', ContentFile(self.jpeg()))
+
+        # Images are fetched by the browser, without the Authorization header.
+        self.client.force_authenticate(None)
+        response = self.client.get(self.question.image.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], f'/_protected-media/{self.question.image.name}')
+        self.assertFalse(response.content)
+
+    def test_protected_media_urls_are_signed(self):
+        self.question.image.save('photo.jpg', ContentFile(self.jpeg()))
+        url = self.question.image.url
+        path = url.split('?')[0]
+
+        self.assertEqual(self.client.get(path).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(url.replace('question_images', 'answer_images')).status_code,
+                         status.HTTP_403_FORBIDDEN)
+        expires = int(url.split('expires=')[1].split('&')[0])
+        self.assertGreaterEqual(expires, time_module.time() + settings.PROTECTED_MEDIA_URL_TTL)
+        with mock.patch('utils.storage.time.time', return_value=expires):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ResponseCacheTestCase(BaseAPITestCase):
+    def test_category_list_is_cached_until_a_category_changes(self):
+        self.client.get(reverse('category-list'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('category-list'))
+        self.assertEqual([category['name'] for category in response.data], ['Test Category'])
+
+        self.client.post(reverse('category-list'), {'name': 'New Category'})
+        response = self.client.get(reverse('category-list'))
+
+        self.assertEqual({category['name'] for category in response.data}, {'Test Category', 'New Category'})
+
+    def test_question_detail_is_invalidated_by_its_answers(self):
+        url = reverse('question-detail', args=[self.question.id])
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        Answer.objects.create(text='Test Answer 2', question=self.question)
+        response = self.client.get(url)
+
+        self.assertEqual(len(response.data['answers']), 2)
+
+    def test_changes_inside_a_transaction_are_invalidated_after_commit(self):
+        url = reverse('question-detail', args=[self.question.id])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.question.text = 'Changed'
+            self.question.save()
+        self.client.get(url)
+        for callback in callbacks:
+            callback()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['text'], 'Changed')
+
+    def test_metrics(self):
+        self.user.is_staff = True
+        self.user.save()
+        before = self.client.get(reverse('cache-metrics')).data['category-list']
+        for _ in range(3):
+            self.client.get(reverse('category-list'))
+
+        after = self.client.get(reverse('cache-metrics')).data['category-list']
+
+        self.assertEqual(after['miss'] - before['miss'], 1)
+        self.assertEqual(after['local_hit'] - before['local_hit'], 2)
+
+
+class DatabaseMetricsTestCase(BaseAPITestCase):
+    def test_database_metrics(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.client.get(reverse('database-metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['settings']['conn_health_checks'])
+        self.assertGreater(response.data['server']['max_connections'], 0)
+        self.assertGreaterEqual(response.data['server']['connections']['active'], 1)
+        self.assertGreaterEqual(response.data['processes']['requests'], 1)
+
+
+@override_settings(METRICS_TOKEN='scraper')
+class RequestInstrumentationTestCase(BaseAPITestCase):
+    def metrics(self):
+        return self.client.get(reverse('prometheus-metrics'), HTTP_AUTHORIZATION='Bearer scraper')
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('quiz-detail', args=[self.quiz.unique_link]))
+
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="\d+ queries", serializer;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_prometheus_metrics(self):
+        self.client.get(reverse('quiz-detail', args=[self.quiz.unique_link]))
+        self.client.get('/no-such-page/')
+
+        response = self.metrics()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', metrics)
+        self.assertIn('http_request_duration_seconds_bucket{view="quiz-detail",method="GET",status="200",le="+Inf"}',
+                      metrics)
+        self.assertIn('http_request_duration_seconds_count{view="unresolved",method="GET",status="404"}', metrics)
+        self.assertIn('http_request_db_queries_bucket{view="quiz-detail",le="100.0"}', metrics)
+        self.assertIn('http_response_size_bytes_sum{view="quiz-detail"}', metrics)
+
+    @override_settings(REPEATED_QUERY_THRESHOLD=1)
+    def test_repeated_queries_are_logged(self):
+        # The views do not repeat queries anymore, see the query budgets, every query counts as repeated here.
+        with self.assertLogs('utils.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('quiz-list'))
+
+        self.assertIn('Likely N+1 queries in GET /quiz/ (quiz-list)', logs.output[0])
+        self.assertIn('http_request_repeated_queries_total{view="quiz-list"}',
+                      self.metrics().content.decode())
+
+    def test_metrics_need_the_token(self):
+        self.assertEqual(self.client.get(reverse('prometheus-metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(reverse('prometheus-metrics'), HTTP_AUTHORIZATION='Bearer other').status_code,
+                         status.HTTP_403_FORBIDDEN)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(reverse('prometheus-metrics'), HTTP_AUTHORIZATION='Bearer ').status_code,
+                             status.HTTP_403_FORBIDDEN)
+
+    def test_views_are_labelled_by_url_name(self):
+        for urlconf in (quizzes_urls, users_urls):
+            for pattern in urlconf.urlpatterns:
+                self.assertTrue(pattern.name, f'{pattern.pattern} has no URL name to label its metrics with')
+
+
+class SchemaViewTestCase(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.schema_root = tempfile.mkdtemp()
+        cls.version = build_schema(cls.schema_root)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.schema_root)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.settings_override = override_settings(OPENAPI_SCHEMA_ROOT=self.schema_root, OPENAPI_SCHEMA_PREBUILT=True)
+        self.settings_override.enable()
+        schema_store.clear()
+
+    def tearDown(self):
+        schema_store.clear()
+        self.settings_override.disable()
+
+    def test_prebuilt_schema_is_served_without_introspection(self):
+        with mock.patch('utils.schema.generate_schema', side_effect=AssertionError('introspected')):
+            response = self.client.get(reverse('schema'))
+            json_response = self.client.get(reverse('schema'), {'format': 'json'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.oai.openapi')
+        self.assertIn(b'/quiz/submit:', response.content)
+        self.assertEqual(json_response['Content-Type'], 'application/vnd.oai.openapi+json')
+        self.assertEqual(json.loads(json_response.content)['paths'].keys(),
+                         yaml.safe_load(response.content)['paths'].keys())
+
+    def test_gzip_and_etag(self):
+        response = self.client.get(reverse('schema'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], f'"{self.version}-yaml-gzip"')
+        self.assertIn(b'/quiz/submit:', gzip.decompress(response.content))
+
+        response = self.client.get(reverse('schema'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_missing_schema(self):
+        with override_settings(OPENAPI_SCHEMA_ROOT=f'{self.schema_root}/missing'):
+            response = self.client.get(reverse('schema'))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    @override_settings(OPENAPI_SCHEMA_PREBUILT=False)
+    def test_schema_is_generated_once_when_not_prebuilt(self):
+        with mock.patch('utils.schema.generate_schema', wraps=generate_schema) as generate:
+            self.client.get(reverse('schema'))
+            response = self.client.get(reverse('schema'))
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(response['ETag'], f'"{self.version}-yaml"')
+
+    def test_operations_declare_bearer_auth(self):
+        schema = json.loads(self.client.get(reverse('schema'), {'format': 'json'}).content)
+
+        self.assertEqual(schema['components']['securitySchemes']['jwtAuth']['scheme'], 'bearer')
+        self.assertIn({'jwtAuth': []}, schema['paths']['/quiz/submit']['post']['security'])
+
+    def test_operation_ids_are_unique(self):
+        schema = json.loads(self.client.get(reverse('schema'), {'format': 'json'}).content)
+
+        operation_ids = [operation['operationId'] for path in schema['paths'].values() for operation in path.values()]
+        self.assertEqual(len(operation_ids), len(set(operation_ids)))
+        self.assertEqual(schema['paths']['/users/admin/status-change/']['post']['operationId'],
+                         'users_admin_bulk_status_change_create')
+
+    def test_responses_of_api_views_are_documented(self):
+        paths = json.loads(self.client.get(reverse('schema'), {'format': 'json'}).content)['paths']
+
+        for path, method, status_code, component in [
+            ('/quiz/{quiz_unique_link}/attempt/', 'post', '201', 'Attempt'),
+            ('/quiz/attempt/{attempt_id}/', 'get', '200', 'Attempt'),
+            ('/quiz/attempt/{attempt_id}/submit', 'post', '200', 'AttemptSubmitResult'),
+            ('/quiz/{quiz_unique_link}/monitor/token', 'post', '200', 'MonitorToken'),
+            ('/quiz/attempt/{attempt_id}/next', 'post', '200', 'AttemptNextQuestion'),
+            ('/quiz/grading-queue/claim', 'post', '200', 'GradingClaimResult'),
+            ('/quiz/grading-queue/release', 'post', '200', 'GradingReleaseResult'),
+        ]:
+            response = paths[path][method]['responses'][status_code]
+            self.assertEqual(response['content']['application/json']['schema']['$ref'],
+                             f'#/components/schemas/{component}')
+
+
+class GenerateDatasetTestCase(APITestCase):
+    def test_generate_dataset(self):
+        call_command('generate_dataset', users=10, senseis=2, categories=3, questions=30, quizzes=4,
+                     questions_per_quiz=5, results=50, detailed_results=5, stdout=StringIO())
+
+        self.assertEqual(User.objects.filter(email__endswith='@dataset.qweasy.local').count(), 12)
+        self.assertEqual(Question.objects.count(), 30)
+        self.assertEqual(Quiz.objects.count(), 4)
+        self.assertEqual(QuestionScore.objects.count(), 20)
+        self.assertEqual(Result.objects.count(), 50)
+        self.assertEqual(SubmittedAnswer.objects.count(), 25)
+        noob = User.objects.filter(role='noob').order_by('-total_tests_taken').first()
+        self.assertEqual(noob.total_tests_taken, Result.objects.filter(user=noob).count())
+        self.assertEqual(noob.profile.gender, 'other')
+
+        quiz = Quiz.objects.get(unique_link='dataset-0')
+        self.client.force_authenticate(User.objects.filter(role='sensei').first())
+        response = self.client.get(reverse('quiz-detail', args=[quiz.unique_link]))
+        self.assertEqual(len(response.data['questions']), 5)
+
+
+class QuizzesQueryBudgetTestCase(QueryBudgetTestMixin, BaseAPITestCase):
+    urlconf = quizzes_urls
+    query_budgets = (
+        QueryBudget('category-list', 1),
+        QueryBudget('category-detail', 1, args=lambda test: [test.category.id]),
+        QueryBudget('question-create', 4, method='post', data=lambda test: {
+            'category': test.category.id, 'text': 'New question', 'answer_type': 0, 'difficulty': 0,
+            'answers': [{'text': f'Answer {index}', 'is_correct': index == 0} for index in range(test.size)],
+        }),
+        QueryBudget('question-select', 2, params=lambda test: {'category': test.category.id}),
+        QueryBudget('question-select-async', 2, params=lambda test: {'category': test.category.id}),
+        QueryBudget('question-detail', 2, args=lambda test: [test.question.id]),
+        QueryBudget('question-favorite', 5, method='post', args=lambda test: [test.question.id]),
+        QueryBudget('quiz-create', 11, method='post', data=lambda test: {
+            'title': 'New quiz', 'category': test.category.id, 'time_limit': '00:10:00',
+            'questions': [question.id for question in test.questions],
+            'scores': [{'question': question.id, 'score': 5} for question in test.questions],
+        }),
+        QueryBudget('quiz-detail', 4, args=lambda test: [test.quiz.unique_link]),
+        QueryBudget('quiz-detail-async', 4, args=lambda test: [test.quiz.unique_link]),
+        QueryBudget('quiz-update-delete', 9, method='patch', args=lambda test: [test.quiz.id],
+                    data=lambda test: {'title': 'Updated quiz'}),
+        QueryBudget('quiz-list', 4),
+        QueryBudget('send-quiz-email', 2, method='post', data=lambda test: {
+            'quiz_id': test.quiz.id, 'recipient_user_ids': [noob.id for noob in test.noobs],
+        }),
+        QueryBudget('quiz-submit', 12, method='post', data=lambda test: {
+            'user': test.user.id, 'quiz': test.quiz.id, 'time_taken': '00:00:05', 'feedback': 'Feedback',
+            'answers': [
+                {'question': question.id, 'answer_type': 2, 'open_ended_answer': 'Answer'}
+                if question.answer_type == 2 else
+                {'question': question.id, 'answer_type': 0, 'selected_answers': [question.answer_ids[0]]}
+                for question in test.questions
+            ],
+        }),
+        QueryBudget('open-ended-review', 19, method='post',
+                    data=lambda test: {'open_ended_answer_id': test.open_ended_answer.id, 'score': 5}),
+        QueryBudget('grading-queue-claim', 5, method='post', data=lambda test: {'size': test.size}),
+        QueryBudget('grading-queue-release', 1, method='post',
+                    data=lambda test: {'answers': [test.open_ended_answer.id]}),
+        QueryBudget('attempt-start', 2, method='post', args=lambda test: [test.quiz.unique_link]),
+        QueryBudget('attempt-detail', 0, args=lambda test: [test.attempt.id]),
+        QueryBudget('attempt-detail', 0, method='patch', args=lambda test: [test.attempt.id], data=lambda test: {
+            'answers': [{'question': question.id, 'selected_answers': question.answer_ids[:2]}
+                        for question in test.questions],
+        }),
+        QueryBudget('quiz-monitor-token', 1, method='post', args=lambda test: [test.quiz.unique_link]),
+        QueryBudget('attempt-next', 6, method='post', args=lambda test: [test.adaptive_attempt.id]),
+        QueryBudget('attempt-submit', 12, method='post', args=lambda test: [test.attempt.id],
+                    data=lambda test: {'feedback': 'Feedback'}),
+        QueryBudget('user-results', 1, args=lambda test: [test.user.id]),
+        QueryBudget('user-results-async', 1, args=lambda test: [test.user.id]),
+        QueryBudget('user-result-detail', 3, args=lambda test: [test.result.id]),
+    )
+    unbudgeted_urls = {'quiz-monitor': 'An event stream which never ends, its one query is tested in MonitorTestCase.'}
+
+    def create_data(self, size):
+        """
+        `size` questions, categories, quizzes, results and noobs. The questions are those of the quiz,
+        the first result has an answer to each of them.
+        """
+        self.size = size
+        Category.objects.bulk_create(Category(name=f'Category {index}') for index in range(size))
+        questions = Question.objects.bulk_create(
+            Question(text=f'Question {index}', category=self.category) for index in range(size)
+        )
+        Answer.objects.bulk_create(
+            Answer(text=f'Answer {index}', question=question, is_correct=index == 0)
+            for question in questions for index in range(4)
+        )
+        questions.append(Question.objects.create(text='Open question', category=self.category, answer_type=2))
+        self.quiz.questions.add(*questions)
+        QuestionScore.objects.bulk_create(QuestionScore(quiz=self.quiz, question=question, score=10)
+                                          for question in questions)
+
+        quizzes = Quiz.objects.bulk_create(
+            Quiz(title=f'Quiz {index}', category=self.category, time_limit=timedelta(minutes=5))
+            for index in range(size - 1)
+        )
+        for quiz in quizzes:
+            quiz.questions.add(self.question)
+
+        self.questions = list(Question.objects.filter(quiz=self.quiz).prefetch_related('answers'))
+        for question in self.questions:
+            question.answer_ids = [answer.id for answer in question.answers.all()]
+        self.noobs = User.objects.bulk_create(User(email=f'noob{index}@user.com') for index in range(size))
+
+        Result.objects.bulk_create(
+            Result(user=self.user, quiz=self.quiz, time_taken=timedelta(minutes=5), submission_time=timezone.now())
+            for _ in range(size - 1)
+        )
+        submitted_answers = SubmittedAnswer.objects.bulk_create(
+            SubmittedAnswer(quiz_result=self.result, question=question, selected_answer_ids=question.answer_ids[:1],
+                            submission_time=self.result.submission_time)
+            for question in self.questions
+        )
+        self.open_ended_answer = OpenEndedAnswer.objects.create(
+            submitted_answer=submitted_answers[-1], answer_text='Answer', submission_time=self.result.submission_time
+        )
+        User.objects.filter(pk=self.user.pk).update(total_tests_taken=size)
+
+        clear_attempts()
+        self.attempt, _ = start_attempt(self.user, self.quiz)
+        save_answers(self.attempt.id, self.user, [
+            {'question': question.id, 'open_ended_answer': 'Answer'} if question.answer_type == 2 else
+            {'question': question.id, 'selected_answers': question.answer_ids[:1]}
+            for question in self.questions
+        ])
+        adaptive_quiz = Quiz.objects.create(title='Adaptive quiz', category=self.category,
+                                            time_limit=timedelta(minutes=5), adaptive_length=size)
+        adaptive_quiz.questions.add(*questions)
+        self.adaptive_attempt, _ = start_attempt(self.user, adaptive_quiz)
@@ -2,22 +2,36 @@ from django.urls import path
 
 from .views import QuestionSelectView, QuestionCreateView, QuestionFavoriteView, ResultSubmitView, QuestionDetailView, \
     QuizCreateView, QuizDetailView, QuizUpdateDeleteView, QuizListView, SendQuizEmailView, \
-    UserResultListView, UserResultDetailView, OpenEndedReview, CategoryListCreateView, CategoryDetailView
+    UserResultListView, UserResultDetailView, OpenEndedReview, CategoryListCreateView, CategoryDetailView, \
+    AsyncQuestionSelectView, AsyncQuizDetailView, AsyncUserResultListView, AttemptStartView, AttemptDetailView, \
+    AttemptSubmitView, QuizMonitorView, QuizMonitorTokenView, AttemptNextQuestionView, GradingQueueClaimView, \
+    GradingQueueReleaseView
 
 urlpatterns = [
     path('categories/', CategoryListCreateView.as_view(), name='category-list'),
     path('categories/<int:pk>/', CategoryDetailView.as_view(), name='category-detail'),
     path('question/create/', QuestionCreateView.as_view(), name='question-create'),
     path('question/', QuestionSelectView.as_view(), name='question-select'),
+    path('question/async/', AsyncQuestionSelectView.as_view(), name='question-select-async'),
     path('question/<int:pk>/', QuestionDetailView.as_view(), name='question-detail'),
     path('question/<int:pk>/favorite/', QuestionFavoriteView.as_view(), name='question-favorite'),
     path('quiz/create/', QuizCreateView.as_view(), name='quiz-create'),
+    path('quiz/attempt/<str:attempt_id>/', AttemptDetailView.as_view(), name='attempt-detail'),
+    path('quiz/attempt/<str:attempt_id>/next', AttemptNextQuestionView.as_view(), name='attempt-next'),
+    path('quiz/attempt/<str:attempt_id>/submit', AttemptSubmitView.as_view(), name='attempt-submit'),
+    path('quiz/<str:quiz_unique_link>/attempt/', AttemptStartView.as_view(), name='attempt-start'),
+    path('quiz/<str:quiz_unique_link>/monitor/', QuizMonitorView.as_view(), name='quiz-monitor'),
+    path('quiz/<str:quiz_unique_link>/monitor/token', QuizMonitorTokenView.as_view(), name='quiz-monitor-token'),
     path('quiz/<str:quiz_unique_link>/', QuizDetailView.as_view(), name='quiz-detail'),
+    path('quiz/<str:quiz_unique_link>/async/', AsyncQuizDetailView.as_view(), name='quiz-detail-async'),
     path('quiz/<int:pk>', QuizUpdateDeleteView.as_view(), name='quiz-update-delete'),
     path('quiz/', QuizListView.as_view(), name='quiz-list'),
     path('quiz/send-email', SendQuizEmailView.as_view(), name='send-quiz-email'),
     path('quiz/submit', ResultSubmitView.as_view(), name='quiz-submit'),
     path('quiz/open-ended-review', OpenEndedReview.as_view(), name='open-ended-review'),
+    path('quiz/grading-queue/claim', GradingQueueClaimView.as_view(), name='grading-queue-claim'),
+    path('quiz/grading-queue/release', GradingQueueReleaseView.as_view(), name='grading-queue-release'),
     path('quiz/user-results/<int:user_id>/', UserResultListView.as_view(), name='user-results'),
+    path('quiz/user-results/<int:user_id>/async/', AsyncUserResultListView.as_view(), name='user-results-async'),
     path('quiz/user-result/<int:id>/', UserResultDetailView.as_view(), name='user-result-detail'),
 ]
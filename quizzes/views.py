@@ -1,22 +1,39 @@
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.conf import settings
 from django.db import transaction
-from django.utils import timezone
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
 from rest_framework import status, generics
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
 from users.models import CustomUser
+from utils.cache import cache_response
 from utils.mail import send_quiz_link_to_students
 from utils.permissions import IsSensei
-from utils.score import calculate_score
-from .models import Question, Favorite, Quiz, Result, SubmittedAnswer, OpenEndedAnswer, QuestionScore, Category
+from utils.views import AsyncJSONView
+from .adaptive import next_question
+from .attempts import flush_attempt, get_attempt, get_redis, save_answers, start_attempt
+from .grading import AnswerLeased, claim_answers, is_leased_to_other, release_answers
+from .models import Answer, Question, Favorite, Quiz, Result, SubmittedAnswer, OpenEndedAnswer, QuestionScore, Category
+from .monitoring import MonitorTokenAuthentication, monitor_events, monitor_token, publish_submitted
+from .results import save_result
 from .serializers import QuestionSerializer, QuizDetailSerializer, \
     ResultSubmitSerializer, QuizEmailSendSerializer, QuizCreateSerializer, \
-    UserResultListSerializer, UserResultDetailSerializer, OpenEndedReviewSerializer, CategorySerializer
+    UserResultListSerializer, UserResultDetailSerializer, OpenEndedReviewSerializer, CategorySerializer, \
+    QuestionValuesSerializer, QuizValuesSerializer, UserResultValuesSerializer, AttemptAnswersSerializer, \
+    AttemptSubmitSerializer, GradingClaimSerializer, GradingQueueValuesSerializer, GradingReleaseSerializer, \
+    AttemptSerializer, AttemptSubmitResultSerializer, MonitorTokenSerializer, AttemptNextQuestionSerializer, \
+    GradingClaimResultSerializer, GradingReleaseResultSerializer
 
 
 class CategoryListCreateView(generics.ListCreateAPIView):
@@ -24,6 +41,10 @@ class CategoryListCreateView(generics.ListCreateAPIView):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated, IsSensei]
 
+    @cache_response('category-list', tags=('category',))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
@@ -91,6 +112,10 @@ class QuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated, IsSensei]
 
+    @cache_response('question-detail', tags=('question:{pk}',))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class QuestionSelectView(APIView):
     """
@@ -131,14 +156,22 @@ class QuestionSelectView(APIView):
         responses={status.HTTP_200_OK: QuestionSerializer(many=True)},
     )
     def get(self, request, *args, **kwargs):
-        category = request.query_params.get('category')
-        difficulty = request.query_params.get('difficulty')
-        answer_type = request.query_params.get('answer_type')
-        quantity = request.query_params.get('quantity')
-        favorites = request.query_params.get('favorited_only') == 'true'  # Convert string to boolean
+        questions = self.select_questions(request.user, request.query_params)
+        question_serializer = QuestionValuesSerializer(questions)
 
-        user = request.user
-        questions = Question.objects.all()
+        return Response({'questions': question_serializer.data})
+
+    @staticmethod
+    def select_questions(user, query_params):
+        category = query_params.get('category')
+        difficulty = query_params.get('difficulty')
+        answer_type = query_params.get('answer_type')
+        quantity = query_params.get('quantity')
+        favorites = query_params.get('favorited_only') == 'true'  # Convert string to boolean
+
+        questions = Question.objects.order_by('id').prefetch_related(
+            Prefetch('answers', queryset=Answer.objects.order_by('id'))
+        )
 
         if favorites:
             favorite_question_ids = Favorite.objects.filter(user=user).values_list('question_id', flat=True)
@@ -155,9 +188,24 @@ class QuestionSelectView(APIView):
             quantity = int(quantity)
             questions = questions[:quantity]
 
+        return questions
+
+
+class AsyncQuestionSelectView(AsyncJSONView):
+    """
+    Async variant of `QuestionSelectView` for the ASGI server.
+    """
+
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = QuestionSelectView.permission_classes
+
+    async def get(self, request, *args, **kwargs):
+        questions = QuestionSelectView.select_questions(request.user, self.drf_request.query_params)
+        # Serializers cannot query the database from the event loop, `select_questions()` prefetches the answers.
+        questions = [question async for question in questions]
         question_serializer = QuestionSerializer(questions, many=True)
 
-        return Response({'questions': question_serializer.data})
+        return self.render({'questions': question_serializer.data})
 
 
 class QuestionFavoriteView(APIView):
@@ -208,13 +256,19 @@ class QuizListView(generics.ListAPIView):
     serializer_class = QuizDetailSerializer
     permission_classes = [IsAuthenticated, IsSensei]
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(QuizValuesSerializer(queryset, context=self.get_serializer_context()).data)
+
 
 class QuizDetailView(APIView):
     serializer_class = QuizDetailSerializer
     permission_classes = [IsAuthenticated, IsSensei]
 
     def get(self, request, quiz_unique_link):
-        quiz = Quiz.objects.filter(unique_link=quiz_unique_link).first()
+        quiz = Quiz.objects.filter(unique_link=quiz_unique_link).prefetch_related(
+            *QuizDetailSerializer.prefetch
+        ).first()
         if not quiz:
             raise NotFound('Quiz not found')
 
@@ -222,12 +276,98 @@ class QuizDetailView(APIView):
         return Response(serializer.data)
 
 
+class AsyncQuizDetailView(AsyncJSONView):
+    """
+    Async variant of `QuizDetailView` for the ASGI server.
+    """
+
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = QuizDetailView.permission_classes
+
+    async def get(self, request, quiz_unique_link):
+        # Serializers cannot query the database from the event loop, so every relation is prefetched.
+        quiz = await Quiz.objects.filter(unique_link=quiz_unique_link).prefetch_related(
+            *QuizDetailSerializer.prefetch
+        ).afirst()
+        if not quiz:
+            raise NotFound('Quiz not found')
+
+        serializer = QuizDetailSerializer(quiz, context={'request': self.drf_request})
+        return self.render(serializer.data)
+
+
+class QuizMonitorTokenView(APIView):
+    """
+    API view issuing a token to open the event stream of a quiz with.
+
+    Returns:
+        Response: The `token` and the seconds it `expires_in`.
+
+    Permissions:
+        - User must be authenticated and have the Sensei role.
+
+    Notes:
+        - Browsers' `EventSource` cannot send the Authorization header, it opens
+          `QuizMonitorView` with the token in the `token` query parameter instead.
+    """
+
+    permission_classes = [IsAuthenticated, IsSensei]
+
+    @extend_schema(request=None, responses={status.HTTP_200_OK: MonitorTokenSerializer})
+    def post(self, request, quiz_unique_link):
+        quiz = Quiz.objects.filter(unique_link=quiz_unique_link).only('id').first()
+        if not quiz:
+            raise NotFound('Quiz not found')
+        return Response({'token': monitor_token(request.user.pk, quiz.id),
+                         'expires_in': settings.MONITOR_TOKEN_MAX_AGE})
+
+
+class QuizMonitorView(AsyncJSONView):
+    """
+    Live events of the attempts at a quiz, as server-sent events, for the ASGI server.
+
+    Permissions:
+        - User must be authenticated and have the Sensei role, with a Bearer token or, from a
+          browser's `EventSource`, the `token` query parameter issued by `QuizMonitorTokenView`.
+
+    Notes:
+        - Sends the current stats of the quiz, then an event whenever an attempt is started,
+          autosaved or submitted, or a result is submitted, see `quizzes.monitoring`.
+        - One open connection per sensei replaces polling the results of the quiz.
+        - The stream ends after `MONITOR_STREAM_LIFETIME` seconds, `EventSource` reconnects by
+          itself. Other clients reconnect as well, with a new token.
+    """
+
+    authentication_classes = (*api_settings.DEFAULT_AUTHENTICATION_CLASSES, MonitorTokenAuthentication)
+    permission_classes = [IsAuthenticated, IsSensei]
+
+    async def get(self, request, quiz_unique_link):
+        quiz = await Quiz.objects.filter(unique_link=quiz_unique_link).only('id').afirst()
+        if not quiz:
+            raise NotFound('Quiz not found')
+        if isinstance(self.drf_request.successful_authenticator, MonitorTokenAuthentication) \
+                and self.drf_request.auth != quiz.id:
+            raise PermissionDenied('The token is for another quiz.')
+
+        response = StreamingHttpResponse(monitor_events(quiz.id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Let nginx send every event as soon as it is published.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class QuizUpdateDeleteView(generics.UpdateAPIView,
                            generics.mixins.DestroyModelMixin):
-    queryset = Quiz.objects.all()
+    queryset = Quiz.objects.prefetch_related(*QuizDetailSerializer.prefetch)
     serializer_class = QuizDetailSerializer
     permission_classes = [IsAuthenticated, IsSensei]
 
+    def perform_update(self, serializer):
+        quiz = serializer.save()
+        # `update()` drops the prefetched relations the update may have changed, the response is
+        # serialized from a reloaded quiz instead of querying the answers question by question.
+        serializer.instance = self.get_queryset().get(pk=quiz.pk)
+
     def delete(self, request, *args, **kwargs):
         return self.destroy(request, *args, **kwargs)
 
@@ -250,10 +390,10 @@ class ResultSubmitView(APIView):
 
     Notes:
         - This view processes the submitted quiz result data, including user's selected answers,
-          time taken, and final score, and creates corresponding records in the database.
-        - A bulk creation of submitted answers is performed within a database transaction.
-        - For multiple-choice questions (answer type 1), selected answer choices are associated with
-          the submitted answers.
+          time taken, and final score, and creates corresponding records in the database with
+          `save_result()`.
+        - The time taken is the one reported by the client and may not exceed the time limit of the
+          quiz, timed attempts are submitted with `AttemptSubmitView` instead.
     """
 
     serializer_class = ResultSubmitSerializer
@@ -270,61 +410,155 @@ class ResultSubmitView(APIView):
         time_taken = serializer.validated_data['time_taken']
         feedback = serializer.validated_data['feedback']
 
-        score = calculate_score(quiz, answers)
+        result, score = save_result(user, quiz, answers, time_taken, feedback)
+        publish_submitted(get_redis(), result, score)
 
-        with transaction.atomic():
-            result = Result.objects.create(
-                user=user,
-                quiz=quiz,
-                score=score.get('total_score'),
-                time_taken=time_taken,
-                feedback=feedback,
-                submission_time=timezone.now()
-            )
+        return Response({
+            'message': 'User answers submitted successfully.',
+            'score': score.get('total_score'),
+            'max_score': score.get('total_max_score'),
+        }, status=status.HTTP_200_OK)
 
-            user_answer_objects = []
-            open_ended_answers = []
 
-            for answer_data in answers:
-                question = answer_data['question']
-                open_ended_answer = answer_data.get('open_ended_answer')
+class AttemptStartView(APIView):
+    """
+    API view starting a timed attempt at a quiz.
 
-                user_answer = SubmittedAnswer(
-                    question=question,
-                    quiz_result=result
-                )
-                user_answer_objects.append(user_answer)
-
-                if question.answer_type == 2:
-                    open_ended = OpenEndedAnswer(
-                        answer_text=open_ended_answer,
-                        submitted_answer=user_answer
-                    )
-                    open_ended_answers.append(open_ended)
-
-            user_answers = SubmittedAnswer.objects.bulk_create(user_answer_objects)
-            OpenEndedAnswer.objects.bulk_create(open_ended_answers)
-
-            for user_answer, answer_data in zip(user_answers, answers):
-                answer_type = answer_data['answer_type']
-                if answer_type != 2 and answer_data['selected_answers']:
-                    user_answer.selected_answers.add(*answer_data['selected_answers'])
-
-            if score.get('total_max_score') > 0:
-                percentage = score.get('total_score') / score.get('total_max_score') * 100
-                user.overall_percentage = (float(user.overall_percentage) * user.total_tests_taken +
-                                           percentage) / (user.total_tests_taken + 1)
-
-            user.total_time_spent += time_taken
-            user.total_tests_taken += 1
-
-            # weight = 1 / user.total_tests_taken
-            # user.overall_percentage = (1 - weight) * float(user.overall_percentage) + (
-            #         weight * percentage)
-            user.save()
+    Args:
+        quiz_unique_link (str): The unique link of the quiz.
+
+    Returns:
+        Response: The attempt with its deadline, 201 if it was started or 200 for the open attempt
+            of the user at the quiz, so that a client can resume it after a crash.
+
+    Raises:
+        NotFound: If the quiz with the given link is not found.
+
+    Permissions:
+        - User must be authenticated.
+
+    Notes:
+        - The deadline of the attempt is `Quiz.time_limit` after it was started, measured by the
+          server. Answers are autosaved with `AttemptDetailView` and the attempt is submitted with
+          `AttemptSubmitView`, or recorded as it is once the deadline has passed.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=None, responses={status.HTTP_201_CREATED: AttemptSerializer,
+                                            status.HTTP_200_OK: AttemptSerializer})
+    def post(self, request, quiz_unique_link):
+        quiz = Quiz.objects.filter(unique_link=quiz_unique_link).first()
+        if not quiz:
+            raise NotFound('Quiz not found')
+
+        attempt, created = start_attempt(request.user, quiz)
+        return Response(attempt.to_representation(), status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
+
+class AttemptDetailView(APIView):
+    """
+    API view of an open attempt of the user: GET returns it with its saved answers, PATCH autosaves
+    answers, replacing the saved answers to their questions.
+
+    Autosaving only writes to Redis, it fails with 409 once the deadline of the attempt has passed.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(responses={status.HTTP_200_OK: AttemptSerializer})
+    def get(self, request, attempt_id):
+        attempt = get_attempt(attempt_id, request.user)
+        if attempt is None:
+            raise NotFound('Attempt not found')
+        return Response(attempt.to_representation())
+
+    @extend_schema(request=AttemptAnswersSerializer, responses={status.HTTP_204_NO_CONTENT: None})
+    def patch(self, request, attempt_id):
+        serializer = AttemptAnswersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        save_answers(attempt_id, request.user, serializer.validated_data['answers'])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AttemptNextQuestionView(APIView):
+    """
+    API view asking the next question of an open attempt at an adaptive quiz.
+
+    Args:
+        attempt_id (str): The id of the attempt.
+
+    Returns:
+        Response: The question to answer next, None once the attempt is complete, the ability
+            estimated from the answers so far and its standard error, and how many questions are
+            left to ask.
+
+    Raises:
+        NotFound: If the user has no open attempt with the given id.
+        ValidationError: If the quiz of the attempt is not adaptive.
+        AttemptOver: If the time limit of the attempt is over.
+
+    Permissions:
+        - User must be authenticated.
+
+    Notes:
+        - The question is chosen by `quizzes.adaptive.next_question()`, the most informative at the
+          ability estimated from the answers autosaved with `AttemptDetailView`. It is asked again
+          until it is answered.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=None, responses={status.HTTP_200_OK: AttemptNextQuestionSerializer})
+    def post(self, request, attempt_id):
+        attempt = get_attempt(attempt_id, request.user)
+        if attempt is None:
+            raise NotFound('Attempt not found')
+        quiz = Quiz.objects.filter(pk=attempt.quiz_id).first()
+        if quiz is None or not quiz.adaptive_length:
+            raise ValidationError('Only attempts at adaptive quizzes are asked their questions one by one.')
+
+        question_id, ability, standard_error = next_question(attempt, quiz)
+        question = None
+        if question_id is not None:
+            [question] = QuestionValuesSerializer(
+                Question.objects.filter(pk=question_id), context={'request': request, 'hide_correct': True}
+            ).data
+        answered = sum(1 for answer in attempt.answers.values() if answer)
+        return Response({
+            'question': question,
+            'ability': round(ability, 3),
+            'standard_error': round(standard_error, 3),
+            'remaining': max(quiz.adaptive_length - answered, 0) if question is not None else 0,
+        })
+
+
+class AttemptSubmitView(APIView):
+    """
+    API view submitting an open attempt of the user.
+
+    The saved answers are scored and recorded like `ResultSubmitView` does, with the time taken
+    measured by the server.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=AttemptSubmitSerializer, responses={status.HTTP_200_OK: AttemptSubmitResultSerializer})
+    def post(self, request, attempt_id):
+        serializer = AttemptSubmitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        flushed = None
+        if get_attempt(attempt_id, request.user) is not None:
+            flushed = flush_attempt(attempt_id, serializer.validated_data['feedback'])
+        if flushed is None:
+            raise NotFound('Attempt not found')
+
+        result, score = flushed
         return Response({
             'message': 'User answers submitted successfully.',
+            'result': result.id,
             'score': score.get('total_score'),
             'max_score': score.get('total_max_score'),
         }, status=status.HTTP_200_OK)
@@ -372,12 +606,70 @@ class SendQuizEmailView(APIView):
 
 
 class UserResultListView(generics.ListAPIView):
+    """
+    API view listing the results of a user.
+
+    The optional `since` and `until` dates restrict the results to a submission period, which lets
+    the database skip the monthly partitions outside of it.
+    """
+
     serializer_class = UserResultListSerializer
     permission_classes = [IsAuthenticated, IsSensei]
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("since", OpenApiTypes.DATE, OpenApiParameter.QUERY,
+                             description="Only results submitted on or after this date."),
+            OpenApiParameter("until", OpenApiTypes.DATE, OpenApiParameter.QUERY,
+                             description="Only results submitted before this date."),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
-        user_id = self.kwargs['user_id']
-        return Result.objects.filter(user_id=user_id)
+        return self.filter_results(self.kwargs['user_id'], self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(UserResultValuesSerializer(queryset, context=self.get_serializer_context()).data)
+
+    @classmethod
+    def filter_results(cls, user_id, query_params):
+        queryset = Result.objects.filter(user_id=user_id).select_related('quiz').order_by('-submission_time')
+
+        since = query_params.get('since')
+        until = query_params.get('until')
+        if since:
+            queryset = queryset.filter(submission_time__gte=cls._parse_date('since', since))
+        if until:
+            queryset = queryset.filter(submission_time__lt=cls._parse_date('until', until))
+        return queryset
+
+    @staticmethod
+    def _parse_date(name, value):
+        try:
+            date = parse_date(value)
+        except ValueError:
+            # Well formatted but impossible dates, like 2024-02-30.
+            date = None
+        if date is None:
+            raise ValidationError({name: 'Date has wrong format. Use YYYY-MM-DD.'})
+        return datetime.combine(date, time.min, tzinfo=dt_timezone.utc)
+
+
+class AsyncUserResultListView(AsyncJSONView):
+    """
+    Async variant of `UserResultListView` for the ASGI server.
+    """
+
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = UserResultListView.permission_classes
+
+    async def get(self, request, user_id):
+        results = UserResultListView.filter_results(user_id, self.drf_request.query_params)
+        rows = [row async for row in results.values(*UserResultValuesSerializer.values)]
+        return self.render(UserResultValuesSerializer().represent(rows))
 
 
 class UserResultDetailView(generics.RetrieveAPIView):
@@ -386,11 +678,22 @@ class UserResultDetailView(generics.RetrieveAPIView):
     serializer_class = UserResultDetailSerializer
     lookup_field = 'id'
 
+    def get_object(self):
+        result = super().get_object()
+        # Restricting the answers to the result's submission time prunes the answer partitions.
+        answers = SubmittedAnswer.objects.filter(
+            submission_time=result.submission_time
+        ).select_related('open_ended_answer')
+        prefetch_related_objects([result], Prefetch('answers', queryset=answers))
+        SubmittedAnswer.load_selected_answers(result.answers.all())
+        return result
+
 
 class OpenEndedReview(APIView):
     permission_classes = [IsAuthenticated, IsSensei]
 
     @extend_schema(request=OpenEndedReviewSerializer)
+    @method_decorator(transaction.atomic)
     def post(self, request):
         serializer = OpenEndedReviewSerializer(data=request.data)
         if serializer.is_valid():
@@ -398,8 +701,17 @@ class OpenEndedReview(APIView):
             open_ended_answer_id = serializer.validated_data['open_ended_answer_id']
             score = serializer.validated_data['score']
 
-            open_ended_answer = get_object_or_404(OpenEndedAnswer, id=open_ended_answer_id)
-            result = open_ended_answer.submitted_answer.quiz_result
+            # Locking the answer serializes concurrent reviews of it, the later ones find it graded.
+            open_ended_answer = get_object_or_404(
+                OpenEndedAnswer.objects.select_for_update(of=('self',)), id=open_ended_answer_id
+            )
+            if open_ended_answer.score is not None:
+                return Response({"error": {api_settings.NON_FIELD_ERRORS_KEY: ["Question is already reviewed."]}},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if is_leased_to_other(open_ended_answer, request.user):
+                raise AnswerLeased()
+            # Answers of the same result may be graded at the same time, which update its score.
+            result = Result.objects.select_for_update().get(pk=open_ended_answer.submitted_answer.quiz_result_id)
             question = open_ended_answer.submitted_answer.question
             quiz = result.quiz
 
@@ -439,7 +751,7 @@ class OpenEndedReview(APIView):
                 new_percentage = this_questions_percentage
                 old_percentage = 100
 
-            user = result.user
+            user = CustomUser.objects.select_for_update().get(pk=result.user_id)
 
             user.overall_percentage = (float(user.overall_percentage) * user.total_tests_taken -
                                        old_percentage + new_percentage) / user.total_tests_taken
@@ -448,6 +760,8 @@ class OpenEndedReview(APIView):
                 result.score -= open_ended_answer.score
             result.score += score
             open_ended_answer.score = score
+            open_ended_answer.grader = request.user
+            open_ended_answer.lease_expires = None
 
             open_ended_answer.save()
             result.save()
@@ -456,3 +770,53 @@ class OpenEndedReview(APIView):
             return Response({'message': 'Score updated successfully'}, status=status.HTTP_200_OK)
 
         return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class GradingQueueClaimView(APIView):
+    """
+    API view claiming a batch of ungraded open-ended answers to grade.
+
+    Args:
+        request (HttpRequest): The request with the optional `quiz` and `question` the answers must
+            be of, and the `size` of the batch.
+
+    Returns:
+        Response: The oldest ungraded answers which are not leased to another grader, with the
+            question they answer and its max score, leased to the user until `lease_expires`.
+
+    Permissions:
+        - User must be authenticated and have the Sensei role.
+
+    Notes:
+        - Graders claiming at the same time get different answers, see `quizzes.grading`. Claiming
+          again renews the leases of the answers the user has not graded yet.
+        - The answers are graded with `OpenEndedReview`, or given back with
+          `GradingQueueReleaseView`.
+    """
+
+    permission_classes = [IsAuthenticated, IsSensei]
+
+    @extend_schema(request=GradingClaimSerializer, responses={status.HTTP_200_OK: GradingClaimResultSerializer})
+    def post(self, request):
+        serializer = GradingClaimSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        answers = claim_answers(request.user, serializer.validated_data['size'],
+                                serializer.validated_data.get('quiz'), serializer.validated_data.get('question'))
+        return Response({'answers': GradingQueueValuesSerializer(answers).data}, status=status.HTTP_200_OK)
+
+
+class GradingQueueReleaseView(APIView):
+    """
+    API view giving ungraded answers leased to the user back to the grading queue.
+    """
+
+    permission_classes = [IsAuthenticated, IsSensei]
+
+    @extend_schema(request=GradingReleaseSerializer, responses={status.HTTP_200_OK: GradingReleaseResultSerializer})
+    def post(self, request):
+        serializer = GradingReleaseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        released = release_answers(request.user, serializer.validated_data['answers'])
+        return Response({'released': released}, status=status.HTTP_200_OK)
@@ -6,8 +6,14 @@ python manage.py makemigrations
 echo "Running migrations"
 python manage.py migrate
 
+echo "Creating submission partitions"
+python manage.py create_partitions
+
 echo "collecting static files"
 python manage.py collectstatic --no-input
 
+echo "Building the OpenAPI schema"
+python manage.py build_schema
+
 echo "Running server"
 gunicorn core.wsgi:application --bind 0.0.0.0:8000
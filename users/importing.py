@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from .models import Profile
+from .serializers import UserImportSerializer
+
+User = get_user_model()
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+EMAIL_TAKEN_ERROR = 'User with this email address already exists.'
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def guess_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise ImportFormatError(f"Unsupported file type '.{extension}', expected one of {', '.join(IMPORT_FORMATS)}.")
+    return extension
+
+
+def read_rows(file, file_format):
+    """
+    Yield `(line, row)` for every record of a binary CSV or JSON Lines file.
+
+    `row` is None for JSON Lines records which are not a JSON object.
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == 'jsonl':
+        for line, record in enumerate(text, start=1):
+            if not record.strip():
+                continue
+            try:
+                row = json.loads(record)
+            except ValueError:
+                row = None
+            yield line, row if isinstance(row, dict) else None
+    else:
+        raise ImportFormatError(f"Unsupported format '{file_format}', expected one of {', '.join(IMPORT_FORMATS)}.")
+
+
+def _setup_worker():
+    # Worker processes started with the "spawn" method do not inherit the configured apps.
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash the passwords with `make_password` across a pool of worker processes.
+    """
+    workers = workers or settings.USER_IMPORT_WORKERS
+    if workers <= 1 or len(passwords) <= 1:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as executor:
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def import_users(rows, workers=None):
+    """
+    Create the users and their profiles of the `(line, row)` records in bulk.
+
+    Invalid rows, and rows with an email that is already taken, are skipped and reported in `errors`.
+    The `post_save` signals of the users are not sent.
+    """
+    errors = []
+    valid_rows = {}
+    for line, row in rows:
+        if row is None:
+            errors.append({'line': line, 'errors': {'non_field_errors': ['Invalid JSON object.']}})
+            continue
+        serializer = UserImportSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'line': line, 'errors': serializer.errors})
+            continue
+        data = serializer.validated_data
+        data['email'] = User.objects.normalize_email(data['email'])
+        if data['email'] in valid_rows:
+            errors.append({'line': line, 'errors': {'email': ['Duplicate email in the file.']}})
+            continue
+        valid_rows[data['email']] = (line, data)
+
+    existing = User.objects.filter(email__in=list(valid_rows)).values_list('email', flat=True)
+    for email in existing:
+        line, _ = valid_rows.pop(email)
+        errors.append({'line': line, 'errors': {'email': [EMAIL_TAKEN_ERROR]}})
+
+    rows = list(valid_rows.values())
+    encoded_passwords = hash_passwords([data.pop('password') for _, data in rows], workers=workers)
+
+    entries = []
+    for (line, data), encoded_password in zip(rows, encoded_passwords):
+        first_name = data.pop('first_name', '')
+        last_name = data.pop('last_name', '')
+        user = User(password=encoded_password, **data)
+        entries.append((line, user, Profile(user=user, first_name=first_name, last_name=last_name)))
+
+    created = _create_users(entries, errors)
+
+    errors.sort(key=lambda error: error['line'])
+    return {'created': created, 'errors': errors}
+
+
+def _create_users(entries, errors):
+    """
+    Create the users and profiles of the `(line, user, profile)` entries in bulk and return how many
+    were created.
+
+    Emails registered while the passwords were hashed make the insert fail, the rows of those
+    emails are then reported in `errors` and the others inserted again.
+    """
+    while entries:
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user, _ in entries])
+                Profile.objects.bulk_create([profile for _, _, profile in entries])
+            return len(entries)
+        except IntegrityError:
+            taken = set(
+                User.objects.filter(email__in=[user.email for _, user, _ in entries]).values_list('email', flat=True)
+            )
+            if not taken:
+                raise
+        for line, user, _ in entries:
+            if user.email in taken:
+                errors.append({'line': line, 'errors': {'email': [EMAIL_TAKEN_ERROR]}})
+        entries = [entry for entry in entries if entry[1].email not in taken]
+    return 0
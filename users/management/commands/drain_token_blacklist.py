@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from utils.blacklist import CacheBlacklistBackend, get_blacklist_backend
+
+
+class Command(BaseCommand):
+    help = ("Copy the blacklisted refresh tokens that have not expired yet into the cache blacklist backend "
+            "and empty the `token_blacklist` tables.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        backend = get_blacklist_backend()
+        if not isinstance(backend, CacheBlacklistBackend):
+            raise CommandError("TOKEN_BLACKLIST must use the cache backend to drain the database blacklist.")
+
+        batch_size = options['batch_size']
+        blacklisted = (
+            BlacklistedToken.objects
+            .filter(token__expires_at__gt=timezone.now())
+            .values_list('token__jti', 'token__expires_at')
+        )
+        copied = 0
+        for jti, expires_at in blacklisted.iterator(chunk_size=batch_size):
+            backend.blacklist_jti(jti, expires_at)
+            copied += 1
+        self.stdout.write(f"Copied {copied} blacklisted tokens to the cache")
+
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(OutstandingToken.objects.values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+                deleted += len(ids)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} outstanding tokens."))
@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importing import IMPORT_FORMATS, ImportFormatError, guess_format, import_users, read_rows
+
+
+class Command(BaseCommand):
+    help = ("Create users and their profiles in bulk from a CSV or JSON Lines file with email, password and "
+            "optional role, first_name and last_name columns.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help="File format, guessed from the file extension by default.")
+        parser.add_argument('--workers', type=int,
+                            help="Password hashing processes, USER_IMPORT_WORKERS by default.")
+
+    def handle(self, *args, **options):
+        try:
+            file_format = options['format'] or guess_format(options['path'])
+            with open(options['path'], 'rb') as file:
+                report = import_users(read_rows(file, file_format), workers=options['workers'])
+        except (OSError, ImportFormatError, UnicodeDecodeError) as exc:
+            raise CommandError(exc)
+
+        for error in report['errors']:
+            self.stderr.write(f"Line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} users created, {len(report['errors'])} rows skipped."
+        ))
@@ -8,15 +8,27 @@ class CustomUserManager(BaseUserManager):
     for authentication instead of username.
     """
 
-    def create_user(self, email, password, **extra_fields):
+    def build_user(self, email, **extra_fields):
         if not email:
             raise ValueError(_("Users must have an email address"))
         email = self.normalize_email(email)
-        user = self.model(email=email, **extra_fields)
+        return self.model(email=email, **extra_fields)
+
+    def create_user(self, email, password, **extra_fields):
+        user = self.build_user(email, **extra_fields)
         user.set_password(password)
         user.save()
         return user
 
+    def create_user_with_encoded_password(self, email, encoded_password, **extra_fields):
+        """
+        Create a user whose password has already been hashed with `make_password`.
+        """
+        user = self.build_user(email, **extra_fields)
+        user.password = encoded_password
+        user.save()
+        return user
+
     def create_superuser(self, email, password, **extra_fields):
         extra_fields.setdefault("is_staff", True)
         extra_fields.setdefault("is_superuser", True)
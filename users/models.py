@@ -6,10 +6,11 @@ from django.db import models
 from django.template.defaultfilters import slugify
 from django.utils.translation import gettext_lazy as _
 
+from utils.models import DirtyFieldsMixin
 from .managers import CustomUserManager
 
 
-class CustomUser(AbstractUser):
+class CustomUser(DirtyFieldsMixin, AbstractUser):
     ROLE_CHOICES = (
         ("sensei", "Sensei"),
         ("noob", "Noob"),
@@ -34,16 +35,31 @@ class CustomUser(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Serve the filtered, id ordered admin user listing.
+            models.Index(fields=["role", "status", "-id"], name="users_role_status_id_idx"),
+            models.Index(fields=["status", "-id"], name="users_status_id_idx"),
+        ]
+
     def __str__(self):
         return self.email
 
+    def refresh_from_db(self, using=None, fields=None):
+        # Users authenticated from token claims only have a few fields loaded; load all the
+        # missing ones on the first access instead of one query per field.
+        deferred_fields = self.get_deferred_fields()
+        if fields is not None and deferred_fields and set(fields) <= deferred_fields:
+            fields = deferred_fields
+        super().refresh_from_db(using=using, fields=fields)
+
 
 def get_image_filename(instance, filename):
-    slug = slugify(filename)
-    return f"avatars/{slug}"
+    name, extension = os.path.splitext(filename)
+    return f"avatars/{slugify(name)}{extension.lower()}"
 
 
-class Profile(models.Model):
+class Profile(DirtyFieldsMixin, models.Model):
     GENDER_CHOICES = (
         ("male", "Male"),
         ("female", "Female"),
@@ -60,6 +76,7 @@ class Profile(models.Model):
     first_name = models.CharField(_("first name"), max_length=150, blank=True)
     last_name = models.CharField(_("last name"), max_length=150, blank=True)
     avatar = models.ImageField(upload_to=get_image_filename, blank=True)
+    avatar_renditions = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.TextField(blank=True)
     level = models.CharField(_("level"), max_length=10, choices=LEVEL_CHOICES, null=True)
     birth_date = models.DateField(_("birth date"), null=True, blank=True)
@@ -1,6 +1,12 @@
 from django.contrib.auth import authenticate
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
+from utils.images import ImageRenditionField
+from utils.token import USER_CLAIMS, CustomRefreshToken
 from .models import CustomUser, Profile
 
 
@@ -29,6 +35,22 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return CustomUser.objects.create_user(**validated_data)
 
 
+class UserImportSerializer(serializers.Serializer):
+    """
+    Serializer class to validate one row of a bulk user import.
+    """
+
+    email = serializers.EmailField(max_length=254)
+    password = serializers.CharField(max_length=128)
+    role = serializers.ChoiceField(choices=CustomUser.ROLE_CHOICES, default="noob")
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+
+
+class UserImportFileSerializer(serializers.Serializer):
+    file = serializers.FileField()
+
+
 class UserLoginSerializer(serializers.Serializer):
     """
     Serializer class to authenticate users with email and password.
@@ -59,6 +81,8 @@ class ProfileAvatarSerializer(serializers.ModelSerializer):
     Serializer class to serialize the avatar
     """
 
+    avatar = ImageRenditionField('small', required=False)
+
     class Meta:
         model = Profile
         fields = ("avatar",)
@@ -66,3 +90,55 @@ class ProfileAvatarSerializer(serializers.ModelSerializer):
 
 class StatusChangeSerializer(serializers.Serializer):
     accept = serializers.BooleanField()
+
+
+class BulkStatusChangeSerializer(StatusChangeSerializer):
+    user_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False,
+                                     max_length=1000)
+
+
+class BulkStatusChangeResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    outcome = serializers.ChoiceField(choices=['accepted', 'declined', 'not_pending', 'not_found'])
+
+
+class BulkStatusChangeResponseSerializer(serializers.Serializer):
+    results = BulkStatusChangeResultSerializer(many=True)
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Serializer class to rotate refresh tokens using the configured token blacklist backend.
+
+    The user is loaded to reject inactive and deleted users, and the new tokens carry its current
+    claims instead of the claims of the rotated token.
+    """
+
+    token_class = CustomRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user = CustomUser.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).first()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        for claim in USER_CLAIMS:
+            refresh[claim] = getattr(user, claim)
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data["refresh"] = str(refresh)
+
+        return data
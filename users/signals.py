@@ -1,11 +1,15 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from utils.authentication import USER_STATE_FIELDS, revoke_user, set_user_state
+from utils.images import register_renditions
 from .models import Profile
 
 User = get_user_model()
 
+register_renditions(Profile, 'avatar')
+
 
 @receiver(post_save, sender=User)
 def create_or_update_profile(sender, instance, created, **kwargs):
@@ -15,4 +19,19 @@ def create_or_update_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
+    # Only a profile that was loaded through the user and changed since needs saving.
+    related = User.profile.related
+    profile = related.get_cached_value(instance) if related.is_cached(instance) else None
+    if profile is not None and profile.get_dirty_fields():
+        profile.save()
+
+
+@receiver(post_save, sender=User)
+def update_user_state(sender, instance, created, update_fields, **kwargs):
+    if not created and (update_fields is None or not update_fields.isdisjoint(USER_STATE_FIELDS)):
+        set_user_state(instance)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance, **kwargs):
+    revoke_user(instance.pk)
@@ -1,3 +1,505 @@
-from django.test import TestCase
+from datetime import timedelta
+import json
+import tempfile
+import time
+from io import StringIO
+from threading import BoundedSemaphore
+from unittest import mock
 
-# Create your tests here.
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, identify_hasher
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_redis.exceptions import ConnectionInterrupted
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users import urls as users_urls
+from users.importing import hash_passwords
+from users.models import Profile
+from utils.authentication import _local_states
+from utils.blacklist import CacheBlacklistBackend, get_blacklist_backend
+from utils.cache import tagged_cache
+from utils.hashing import hashing_pool
+from utils.testing import QueryBudget, QueryBudgetTestMixin
+from utils.token import CustomRefreshToken, create_custom_token
+
+User = get_user_model()
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'tokens': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tokens'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ClaimsAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='sensei@user.com', password='testpassword', role='sensei',
+                                             status='accepted')
+        self.authenticate(self.user)
+        _local_states.clear()
+        cache.clear()
+        caches['tokens'].clear()
+        tagged_cache.clear_local()
+
+    def authenticate(self, user):
+        token = create_custom_token(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def test_permissions_are_checked_without_loading_the_user(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_other_user_fields_are_loaded_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('users:user-info'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_status_change_overrides_token_claims(self):
+        self.user.status = 'declined'
+        self.user.save()
+
+        response = self.client.get(reverse('category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deactivated_user_is_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(reverse('category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_rejected(self):
+        self.user.delete()
+
+        response = self.client.get(reverse('category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_state_outlives_the_access_tokens(self):
+        self.user.is_active = False
+        self.user.save()
+        _local_states.clear()
+
+        # Tokens refreshed before the change carry its old claims, the state must outlive them.
+        later = time.time() + settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds() + 60
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            response = self.client.get(reverse('category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_users_are_loaded_while_the_state_cache_is_unavailable(self):
+        self.user.is_active = False
+        self.user.save()
+        _local_states.clear()
+
+        with mock.patch.object(caches['tokens'], 'get', side_effect=redis.ConnectionError('Connection refused')):
+            response = self.client.get(reverse('category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_user_is_rejected_while_the_state_cache_is_unavailable(self):
+        self.user.delete()
+        _local_states.clear()
+
+        with mock.patch.object(caches['tokens'], 'get', side_effect=ConnectionInterrupted(connection=None)):
+            response = self.client.get(reverse('category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_claims_user_can_be_saved(self):
+        response = self.client.post(reverse('users:resend-status-change'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.status, 'pending')
+        self.assertEqual(self.user.email, 'sensei@user.com')
+
+
+class AsyncAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='noob@user.com', password='testpassword')
+
+    def test_async_login_success(self):
+        response = self.client.post(reverse('users:login-user-async'),
+                                    {'email': 'noob@user.com', 'password': 'testpassword'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['email'], 'noob@user.com')
+        self.assertIn('access', response.json()['tokens'])
+
+    def test_async_login_incorrect_credentials(self):
+        for email, password in [('noob@user.com', 'wrongpassword'), ('unknown@user.com', 'testpassword')]:
+            response = self.client.post(reverse('users:login-user-async'),
+                                        {'email': email, 'password': password}, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), {'non_field_errors': ['Incorrect Credentials']})
+
+    def test_async_login_upgrades_outdated_hashes(self):
+        self.user.password = PBKDF2PasswordHasher().encode('testpassword', 'outdatedsalt', iterations=1000)
+        self.user.save()
+
+        response = self.client.post(reverse('users:login-user-async'),
+                                    {'email': 'noob@user.com', 'password': 'testpassword'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertFalse(identify_hasher(self.user.password).must_update(self.user.password))
+        self.assertTrue(self.user.check_password('testpassword'))
+
+    def test_async_login_hashes_for_inactive_users(self):
+        self.user.is_active = False
+        self.user.save()
+
+        with mock.patch.object(hashing_pool, 'run', wraps=hashing_pool.run) as run:
+            response = self.client.post(reverse('users:login-user-async'),
+                                        {'email': 'noob@user.com', 'password': 'testpassword'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'non_field_errors': ['Incorrect Credentials']})
+        run.assert_called_once()
+
+    def test_async_registration_success(self):
+        data = {'email': 'new@user.com', 'password': 'testpassword', 'role': 'noob'}
+
+        response = self.client.post(reverse('users:create-user-async'), data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('refresh', response.json()['tokens'])
+        self.assertTrue(User.objects.get(email='new@user.com').check_password('testpassword'))
+
+    def test_async_registration_invalid(self):
+        response = self.client.post(reverse('users:create-user-async'), {'email': 'noob@user.com'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', response.json())
+
+    def test_saturated_hashing_pool_is_rejected(self):
+        with mock.patch.object(hashing_pool, 'slots', BoundedSemaphore(0)):
+            response = self.client.post(reverse('users:login-user-async'),
+                                        {'email': 'noob@user.com', 'password': 'testpassword'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DirtyFieldsTestCase(APITestCase):
+    def setUp(self):
+        User.objects.create_user(email='noob@user.com', password='testpassword')
+        self.user = User.objects.get(email='noob@user.com')
+
+    def test_unchanged_user_is_not_saved(self):
+        with self.assertNumQueries(0):
+            self.user.save()
+
+    def test_only_changed_fields_are_updated(self):
+        self.user.total_tests_taken += 1
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"total_tests_taken"', queries[0]['sql'])
+        self.assertNotIn('"email"', queries[0]['sql'])
+        self.assertEqual(User.objects.get(id=self.user.id).total_tests_taken, 1)
+
+        with self.assertNumQueries(0):
+            self.user.save()
+
+    def test_changed_profile_is_saved_with_the_user(self):
+        self.user.profile.first_name = 'Noob'
+        self.user.total_tests_taken += 1
+
+        with self.assertNumQueries(2):
+            self.user.save()
+
+        self.assertEqual(User.objects.get(id=self.user.id).profile.first_name, 'Noob')
+
+    def test_claims_user_does_not_write_stale_claims(self):
+        User.objects.filter(id=self.user.id).update(status='declined')
+        request_user = User.from_db('default', ['id', 'status'], [self.user.id, 'accepted'])
+
+        request_user.total_tests_taken += 1
+        request_user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.status, 'declined')
+        self.assertEqual(self.user.total_tests_taken, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UserAdministrationTestCase(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@user.com', password='testpassword', role='sensei',
+                                              status='accepted', is_staff=True)
+        self.pending = [
+            User.objects.create_user(email=f'sensei{i}@user.com', password='testpassword', role='sensei')
+            for i in range(3)
+        ]
+        self.noob = User.objects.create_user(email='noob@user.com', password='testpassword', status='accepted')
+        self.client.force_authenticate(self.admin)
+        _local_states.clear()
+
+    def test_user_list_is_cursor_paginated(self):
+        response = self.client.get(reverse('users:user-list'), {'page_size': 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([user['email'] for user in response.data['results']],
+                         ['noob@user.com', 'sensei2@user.com', 'sensei1@user.com'])
+
+        response = self.client.get(response.data['next'])
+
+        self.assertEqual([user['email'] for user in response.data['results']],
+                         ['sensei0@user.com', 'admin@user.com'])
+        self.assertIsNone(response.data['next'])
+
+    def test_user_list_filters(self):
+        response = self.client.get(reverse('users:user-list'), {'role': 'sensei', 'status': 'pending'})
+
+        self.assertEqual({user['id'] for user in response.data['results']}, {user.id for user in self.pending})
+
+        response = self.client.get(reverse('users:user-list'), {'status': 'unknown'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_status_change(self):
+        user_ids = [self.pending[0].id, self.pending[1].id, self.noob.id, self.noob.id + 1000]
+
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('users:bulk-status-change'),
+                                        {'user_ids': user_ids, 'accept': False}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['outcome'] for result in response.data['results']],
+                         ['declined', 'declined', 'not_pending', 'not_found'])
+        self.assertEqual(User.objects.get(id=self.pending[0].id).status, 'declined')
+        self.assertEqual(User.objects.get(id=self.pending[2].id).status, 'pending')
+
+    def test_bulk_status_change_updates_token_state(self):
+        self.pending[0].status = 'accepted'
+        token = create_custom_token(self.pending[0])
+        User.objects.filter(id=self.pending[0].id).update(status='pending')
+        self.client.force_authenticate(None)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {create_custom_token(self.admin).access_token}')
+        self.client.post(reverse('users:bulk-status-change'), {'user_ids': [self.pending[0].id], 'accept': False},
+                         format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        response = self.client.get(reverse('category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class UserImportTestCase(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@user.com', password='testpassword', is_staff=True)
+        self.client.force_authenticate(self.admin)
+
+    def test_import_csv(self):
+        content = (
+            'email,password,role,first_name\n'
+            'first@user.com,password1,sensei,First\n'
+            'not-an-email,password2,noob,\n'
+            'second@user.com,password3,noob,Second\n'
+            'first@user.com,password4,noob,\n'
+            'admin@user.com,password5,noob,\n'
+        )
+        file = SimpleUploadedFile('intake.csv', content.encode())
+
+        response = self.client.post(reverse('users:user-import'), {'file': file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['line'] for error in response.data['errors']], [3, 5, 6])
+        self.assertIn('email', response.data['errors'][0]['errors'])
+        user = User.objects.get(email='first@user.com')
+        self.assertEqual(user.role, 'sensei')
+        self.assertTrue(user.check_password('password1'))
+        self.assertEqual(Profile.objects.get(user=user).first_name, 'First')
+
+    def test_emails_registered_during_the_import_are_reported(self):
+        content = (
+            'email,password,role\n'
+            'first@user.com,password1,noob\n'
+            'second@user.com,password2,noob\n'
+        )
+        file = SimpleUploadedFile('intake.csv', content.encode())
+
+        def register_while_hashing(passwords, workers=None):
+            User.objects.create_user(email='second@user.com', password='testpassword')
+            return hash_passwords(passwords, workers=1)
+
+        with mock.patch('users.importing.hash_passwords', side_effect=register_while_hashing):
+            response = self.client.post(reverse('users:user-import'), {'file': file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'],
+                         [{'line': 3, 'errors': {'email': ['User with this email address already exists.']}}])
+        self.assertTrue(Profile.objects.filter(user__email='first@user.com').exists())
+        self.assertTrue(User.objects.get(email='second@user.com').check_password('testpassword'))
+
+    def test_unsupported_file_type(self):
+        file = SimpleUploadedFile('intake.xlsx', b'email,password\n')
+
+        response = self.client.post(reverse('users:user-import'), {'file': file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_requires_admin(self):
+        self.client.force_authenticate(User.objects.create_user(email='noob@user.com', password='testpassword'))
+        file = SimpleUploadedFile('intake.csv', b'email,password\n')
+
+        response = self.client.post(reverse('users:user-import'), {'file': file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_users_command(self):
+        records = [{'email': f'student{i}@user.com', 'password': f'password{i}'} for i in range(4)]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as file:
+            file.write('\n'.join(json.dumps(record) for record in records) + '\nnot json\n')
+            file.flush()
+            stderr = StringIO()
+            call_command('import_users', file.name, '--workers', '2', stdout=StringIO(), stderr=stderr)
+
+        self.assertIn('Line 5', stderr.getvalue())
+        self.assertEqual(Profile.objects.filter(user__email__startswith='student').count(), 4)
+        self.assertTrue(User.objects.get(email='student3@user.com').check_password('password3'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TokenBlacklistTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='noob@user.com', password='testpassword')
+        self.refresh = str(create_custom_token(self.user))
+
+    def test_rotated_refresh_token_is_blacklisted(self):
+        url = reverse('users:token-refresh')
+
+        response = self.client.post(url, {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['refresh'], self.refresh)
+
+        response = self.client.post(url, {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_concurrent_rotations_of_a_token(self):
+        url = reverse('users:token-refresh')
+
+        self.assertEqual(self.client.post(url, {'refresh': self.refresh}).status_code, status.HTTP_200_OK)
+        # A concurrent rotation which checked the blacklist before the first one blacklisted the token.
+        with mock.patch.object(CacheBlacklistBackend, 'is_blacklisted', return_value=False):
+            response = self.client.post(url, {'refresh': self.refresh})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_reissues_the_current_claims(self):
+        self.user.role = 'sensei'
+        self.user.status = 'declined'
+        self.user.save()
+
+        response = self.client.post(reverse('users:token-refresh'), {'refresh': self.refresh})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for token in (AccessToken(response.data['access']), CustomRefreshToken(response.data['refresh'])):
+            self.assertEqual((token['role'], token['status']), ('sensei', 'declined'))
+
+    def test_refresh_rejects_inactive_and_deleted_users(self):
+        url = reverse('users:token-refresh')
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.post(url, {'refresh': self.refresh}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        refresh = str(create_custom_token(self.user))
+        self.user.delete()
+        self.assertEqual(self.client.post(url, {'refresh': refresh}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_does_not_write_blacklist_tables(self):
+        response = self.client.post(reverse('users:token-refresh'), {'refresh': self.refresh})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+    def test_drain_token_blacklist(self):
+        expires_at = timezone.now() + timedelta(hours=1)
+        outstanding = OutstandingToken.objects.create(user=self.user, jti='drained', token='token',
+                                                      expires_at=expires_at)
+        BlacklistedToken.objects.create(token=outstanding)
+        OutstandingToken.objects.create(user=self.user, jti='unused', token='token', expires_at=expires_at)
+
+        call_command('drain_token_blacklist', stdout=StringIO())
+
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertTrue(get_blacklist_backend().is_blacklisted('drained'))
+        self.assertFalse(get_blacklist_backend().is_blacklisted('unused'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, USER_IMPORT_WORKERS=1,
+                   PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UsersQueryBudgetTestCase(QueryBudgetTestMixin, APITestCase):
+    urlconf = users_urls
+    unbudgeted_urls = {'users:google_login': 'Needs the Google OAuth2 API.'}
+    query_budgets = (
+        QueryBudget('users:create-user', 7, method='post', user=None,
+                    data=lambda test: {'email': 'new@user.com', 'password': 'testpassword', 'role': 'noob'}),
+        QueryBudget('users:login-user', 1, method='post', user=None,
+                    data=lambda test: {'email': test.user.email, 'password': 'testpassword'}),
+        QueryBudget('users:create-user-async', 7, method='post', user=None,
+                    data=lambda test: {'email': 'new@user.com', 'password': 'testpassword', 'role': 'noob'}),
+        QueryBudget('users:login-user-async', 1, method='post', user=None,
+                    data=lambda test: {'email': test.user.email, 'password': 'testpassword'}),
+        QueryBudget('users:token-refresh', 2, method='post', user=None,
+                    data=lambda test: {'refresh': str(create_custom_token(test.user))}),
+        QueryBudget('users:user-info', 1),
+        QueryBudget('users:user-profile', 2, method='patch', data=lambda test: {'bio': 'Bio'}),
+        QueryBudget('users:user-avatar', 1),
+        QueryBudget('users:user-list', 1, user='admin'),
+        QueryBudget('users:user-import', 5, method='post', user='admin', format='multipart', data=lambda test: {
+            'file': SimpleUploadedFile('intake.csv', (
+                'email,password,role\n' + ''.join(f'student{index}@user.com,password,noob\n'
+                                                  for index in range(test.size))
+            ).encode()),
+        }),
+        QueryBudget('users:status-change', 2, method='post', user='admin', args=lambda test: [test.pending[0].id],
+                    data=lambda test: {'accept': True}),
+        QueryBudget('users:bulk-status-change', 1, method='post', user='admin',
+                    data=lambda test: {'user_ids': [user.id for user in test.pending], 'accept': True}),
+        QueryBudget('users:resend-status-change', 1, method='post'),
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='sensei@user.com', password='testpassword', role='sensei',
+                                             status='accepted')
+        self.admin = User.objects.create_user(email='admin@user.com', password='testpassword', role='sensei',
+                                              status='accepted', is_staff=True)
+
+    def create_data(self, size):
+        """
+        `size` pending senseis, and as many users in the imported file.
+        """
+        self.size = size
+        self.pending = User.objects.bulk_create(
+            User(email=f'sensei{index}@user.com', role='sensei') for index in range(size)
+        )
+        Profile.objects.bulk_create(Profile(user=user) for user in self.pending)
@@ -1,19 +1,24 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
 
 from users.views import CustomGoogleLogin, UserLoginAPIView, UserAPIView, UserProfileAPIView, UserAvatarAPIView, \
-    UserRegistrationAPIView, StatusChangeView, ResendStatusChangeView
+    UserRegistrationAPIView, StatusChangeView, ResendStatusChangeView, TokenRefreshAPIView, AsyncUserLoginView, \
+    AsyncUserRegistrationView, UserImportAPIView, UsersListView, BulkStatusChangeView
 
 app_name = "users"
 
 urlpatterns = [
     path("register/", UserRegistrationAPIView.as_view(), name="create-user"),
     path("login/", UserLoginAPIView.as_view(), name="login-user"),
-    path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
+    path("register/async/", AsyncUserRegistrationView.as_view(), name="create-user-async"),
+    path("login/async/", AsyncUserLoginView.as_view(), name="login-user-async"),
+    path("token/refresh/", TokenRefreshAPIView.as_view(), name="token-refresh"),
     path("", UserAPIView.as_view(), name="user-info"),
     path("profile/", UserProfileAPIView.as_view(), name="user-profile"),
     path("profile/avatar/", UserAvatarAPIView.as_view(), name="user-avatar"),
     path('login/google/', CustomGoogleLogin.as_view(), name='google_login'),
+    path('admin/users/', UsersListView.as_view(), name='user-list'),
+    path('admin/import/', UserImportAPIView.as_view(), name='user-import'),
     path('admin/status-change/<int:user_id>/', StatusChangeView.as_view(), name='status-change'),
+    path('admin/status-change/', BulkStatusChangeView.as_view(), name='bulk-status-change'),
     path('resend-status-change/', ResendStatusChangeView.as_view(), name='resend-status-change'),
 ]
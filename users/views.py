@@ -2,24 +2,42 @@ import os
 
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
 from allauth.socialaccount.providers.oauth2.client import OAuth2Client
+from asgiref.sync import sync_to_async
 from dj_rest_auth.registration.views import SocialLoginView
 from django.contrib.auth import get_user_model
-from drf_spectacular.utils import extend_schema, OpenApiExample
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.http import JsonResponse
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
 from rest_framework import status, generics
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import GenericAPIView, RetrieveUpdateAPIView, get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenRefreshView
 
+from utils.authentication import set_user_states
+from utils.hashing import hashing_pool, verify_password
+from utils.pagination import IdCursorPagination
 from utils.permissions import IsSensei
 from utils.token import create_custom_token
+from utils.views import AsyncJSONView
+from .importing import ImportFormatError, guess_format, import_users, read_rows
 from .models import Profile, CustomUser
 from .serializers import CustomUserSerializer, StatusChangeSerializer, UserRegistrationSerializer, UserLoginSerializer, \
-    ProfileSerializer, ProfileAvatarSerializer
+    ProfileSerializer, ProfileAvatarSerializer, CustomTokenRefreshSerializer, UserImportFileSerializer, \
+    BulkStatusChangeSerializer, BulkStatusChangeResponseSerializer
 
 User = get_user_model()
 
+BULK_STATUS_CHANGE_SQL = '''
+    UPDATE users_customuser SET status = %s
+    WHERE id = ANY(%s) AND status = 'pending'
+    RETURNING id, role, status, is_staff, is_active
+'''
+
 
 class UserRegistrationAPIView(GenericAPIView):
     """
@@ -39,6 +57,29 @@ class UserRegistrationAPIView(GenericAPIView):
         return Response(data, status=status.HTTP_201_CREATED)
 
 
+class UserImportAPIView(GenericAPIView):
+    """
+    An endpoint for admins to create users in bulk from a CSV or JSON Lines file.
+
+    Every record needs an email and a password, and may have a role, first_name and last_name.
+    Invalid records are skipped and reported by line number.
+    """
+
+    permission_classes = (IsAdminUser,)
+    serializer_class = UserImportFileSerializer
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        file = serializer.validated_data['file']
+        try:
+            report = import_users(read_rows(file, guess_format(file.name)))
+        except (ImportFormatError, UnicodeDecodeError) as exc:
+            raise ValidationError({"file": [str(exc)]})
+        return Response(report, status=status.HTTP_201_CREATED)
+
+
 class UserLoginAPIView(GenericAPIView):
     """
     An endpoint to authenticate existing users using their email and password.
@@ -58,6 +99,65 @@ class UserLoginAPIView(GenericAPIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
+class TokenRefreshAPIView(TokenRefreshView):
+    """
+    An endpoint to rotate a refresh token, blacklisting the old one.
+    """
+
+    serializer_class = CustomTokenRefreshSerializer
+
+
+class AsyncUserRegistrationView(AsyncJSONView):
+    """
+    Async variant of `UserRegistrationAPIView` for the ASGI server.
+
+    The password is hashed in the bounded hashing pool, so registrations never block the event loop
+    and are rejected with 503 once the pool is saturated.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        serializer = UserRegistrationSerializer(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        validated_data = dict(serializer.validated_data)
+        encoded_password = await hashing_pool.run(make_password, validated_data.pop('password'))
+        user = await sync_to_async(User.objects.create_user_with_encoded_password)(
+            encoded_password=encoded_password, **validated_data
+        )
+        token = await sync_to_async(create_custom_token)(user)
+        data = UserRegistrationSerializer(user).data
+        data["tokens"] = {"refresh": str(token), "access": str(token.access_token)}
+        return JsonResponse(data, status=status.HTTP_201_CREATED)
+
+
+class AsyncUserLoginView(AsyncJSONView):
+    """
+    Async variant of `UserLoginAPIView` for the ASGI server.
+
+    The password is checked in the bounded hashing pool, so logins never block the event loop
+    and are rejected with 503 once the pool is saturated.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        credentials = UserLoginSerializer().to_internal_value(request.data)
+        user = await User.objects.filter(email=credentials['email']).afirst()
+        if user is None:
+            # Hash anyway so that unknown emails take as long as wrong passwords, like `ModelBackend`.
+            await hashing_pool.run(make_password, credentials['password'])
+            raise ValidationError({"non_field_errors": ["Incorrect Credentials"]})
+
+        # Inactive users are only rejected after hashing, so that they take as long as wrong passwords.
+        is_correct, upgraded_password = await hashing_pool.run(verify_password, credentials['password'], user.password)
+        if is_correct and upgraded_password is not None:
+            user.password = upgraded_password
+            await user.asave(update_fields=['password'])
+        if is_correct and user.is_active:
+            token = await sync_to_async(create_custom_token)(user)
+            data = UserLoginSerializer(user).data
+            data["tokens"] = {"refresh": str(token), "access": str(token.access_token)}
+            return JsonResponse(data, status=status.HTTP_200_OK)
+        raise ValidationError({"non_field_errors": ["Incorrect Credentials"]})
+
+
 class UserAPIView(RetrieveUpdateAPIView):
     """
     Get, Update user information
@@ -151,6 +251,53 @@ class StatusChangeView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkStatusChangeView(APIView):
+    """
+    Accept or decline many pending users with a single UPDATE.
+
+    Returns the outcome for every requested id: the new status, `not_pending` or `not_found`.
+    """
+
+    serializer_class = BulkStatusChangeSerializer
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(
+        # The single user route shares the path prefix, spectacular would derive the same operationId.
+        operation_id='users_admin_bulk_status_change_create',
+        request=BulkStatusChangeSerializer,
+        responses={status.HTTP_200_OK: BulkStatusChangeResponseSerializer},
+    )
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = list(dict.fromkeys(serializer.validated_data['user_ids']))
+        new_status = "accepted" if serializer.validated_data['accept'] else "declined"
+
+        with connection.cursor() as cursor:
+            cursor.execute(BULK_STATUS_CHANGE_SQL, [new_status, user_ids])
+            changed_users = [
+                CustomUser(id=user_id, role=role, status=user_status, is_staff=is_staff, is_active=is_active)
+                for user_id, role, user_status, is_staff, is_active in cursor.fetchall()
+            ]
+        # The update bypasses the post_save signals, refresh the cached states of the changed users.
+        set_user_states(changed_users)
+
+        changed_ids = {user.id for user in changed_users}
+        existing_ids = set(
+            CustomUser.objects.filter(id__in=[user_id for user_id in user_ids if user_id not in changed_ids])
+            .values_list('id', flat=True)
+        )
+        results = [
+            {
+                "id": user_id,
+                "outcome": (new_status if user_id in changed_ids
+                            else "not_pending" if user_id in existing_ids else "not_found"),
+            }
+            for user_id in user_ids
+        ]
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 class ResendStatusChangeView(APIView):
     permission_classes = (IsAuthenticated,)
 
@@ -164,6 +311,32 @@ class ResendStatusChangeView(APIView):
 
 
 class UsersListView(generics.ListAPIView):
-    queryset = CustomUser.objects.all()
+    """
+    Cursor paginated list of users, optionally filtered by `role` and `status`.
+    """
+
     serializer_class = CustomUserSerializer
     permission_classes = (IsAdminUser, IsSensei)
+    pagination_class = IdCursorPagination
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("role", str, OpenApiParameter.QUERY,
+                             enum=[choice for choice, _ in CustomUser.ROLE_CHOICES]),
+            OpenApiParameter("status", str, OpenApiParameter.QUERY,
+                             enum=[choice for choice, _ in CustomUser.STATUS_CHOICES]),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = CustomUser.objects.all()
+        for name, choices in (("role", CustomUser.ROLE_CHOICES), ("status", CustomUser.STATUS_CHOICES)):
+            value = self.request.query_params.get(name)
+            if value is None:
+                continue
+            if value not in dict(choices):
+                raise ValidationError({name: f'"{value}" is not a valid choice.'})
+            queryset = queryset.filter(**{name: value})
+        return queryset
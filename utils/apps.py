@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class UtilsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "utils"
+
+    def ready(self):
+        import utils.db
+        import utils.schema
+        from utils.instrumentation import instrument_serializers
+
+        instrument_serializers()
@@ -0,0 +1,105 @@
+import logging
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from django_redis.exceptions import ConnectionInterrupted
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from utils.cache import MISSING, LocalLRUCache
+from utils.token import USER_CLAIMS
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Fields of the user state kept in the cache, overriding the claims of tokens issued before a change.
+USER_STATE_FIELDS = USER_CLAIMS + ('is_active',)
+
+# In-process copy of the cached user states by user id.
+_local_states = LocalLRUCache(settings.AUTH_USER_STATE_LOCAL_SIZE, settings.AUTH_USER_STATE_LOCAL_TTL)
+
+
+def user_state_key(user_id):
+    return f'auth:user-state:{user_id}'
+
+
+def get_user_state(user_id):
+    """
+    Current state of the user, or None if it has not changed since the user's tokens were issued.
+    """
+    state = _local_states.get(user_id, MISSING)
+    if state is not MISSING:
+        return state
+
+    state = caches[settings.AUTH_USER_STATE_CACHE].get(user_state_key(user_id))
+    _local_states.set(user_id, state)
+    return state
+
+
+def set_user_state(user):
+    set_user_states([user])
+
+
+def set_user_states(users):
+    """
+    Store the current state of the users, e.g. after changing them with `QuerySet.update()`,
+    which does not send the signals keeping the states up to date.
+    """
+    states = {
+        user_state_key(user.pk): {field: getattr(user, field) for field in USER_STATE_FIELDS}
+        for user in users
+    }
+    caches[settings.AUTH_USER_STATE_CACHE].set_many(states, timeout=settings.AUTH_USER_STATE_TTL)
+    for user in users:
+        _local_states.pop(user.pk, None)
+
+
+def revoke_user(user_id):
+    caches[settings.AUTH_USER_STATE_CACHE].set(user_state_key(user_id), {'revoked': True}, timeout=settings.AUTH_USER_STATE_TTL)
+    _local_states.pop(user_id, None)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication which builds the user from the signed token claims instead of loading it.
+
+    The returned user is a `CustomUser` instance with only the id and the claimed fields loaded,
+    any other field is loaded from the database on first access. Changes of the claimed fields
+    after the token was issued, and deleted users, are picked up from the user state cache which
+    is kept up to date by the `users` signals. While the cache is unavailable the user is loaded
+    from the database instead.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in USER_CLAIMS):
+            # Tokens issued before the claims were added.
+            return super().get_user(validated_token)
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        values = {claim: validated_token[claim] for claim in USER_CLAIMS}
+        values['is_active'] = True
+
+        try:
+            state = get_user_state(user_id)
+        except (ConnectionInterrupted, redis.RedisError):
+            logger.warning("User state cache unavailable, loading user %s from the database", user_id,
+                           exc_info=True)
+            return super().get_user(validated_token)
+        if state is not None:
+            if state.get('revoked'):
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            values.update(state)
+
+        if not values['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        values[api_settings.USER_ID_FIELD] = user_id
+        # `from_db` expects the values of the loaded fields in model field order.
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+        return User.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
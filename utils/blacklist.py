@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+class BaseBlacklistBackend:
+    """
+    Storage of blacklisted refresh token ids (jti), see `TOKEN_BLACKLIST` in the settings.
+    """
+
+    def register(self, token, user):
+        """
+        Called for every refresh token issued to a user.
+        """
+
+    def blacklist(self, token):
+        """
+        Blacklist the token. Returns False if it was blacklisted already, e.g. by a concurrent
+        rotation of the same token.
+        """
+        raise NotImplementedError
+
+    def is_blacklisted(self, jti):
+        raise NotImplementedError
+
+
+class DatabaseBlacklistBackend(BaseBlacklistBackend):
+    """
+    The `token_blacklist` app tables: an outstanding token row for every issued token and a
+    blacklisted token row for every revoked one.
+    """
+
+    def register(self, token, user):
+        OutstandingToken.objects.create(
+            user=user,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token['exp']),
+        )
+
+    def blacklist(self, token):
+        outstanding, _ = OutstandingToken.objects.get_or_create(
+            jti=token[api_settings.JTI_CLAIM],
+            defaults={'token': str(token), 'expires_at': datetime_from_epoch(token['exp'])},
+        )
+        _, created = BlacklistedToken.objects.get_or_create(token=outstanding)
+        return created
+
+    def is_blacklisted(self, jti):
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+class CacheBlacklistBackend(BaseBlacklistBackend):
+    """
+    Blacklisted token ids stored as cache keys which expire together with the token, so the
+    blacklist never grows past the tokens that are still valid.
+
+    With `fallback_to_database` the `token_blacklist` tables are checked as well, until they have
+    been drained with `drain_token_blacklist`.
+    """
+
+    def __init__(self, cache='default', fallback_to_database=False):
+        self.cache_alias = cache
+        self.fallback_to_database = fallback_to_database
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @staticmethod
+    def key(jti):
+        return f'token-blacklist:{jti}'
+
+    def blacklist_jti(self, jti, expires_at):
+        timeout = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        if timeout <= 0:
+            return True
+        # `add` claims the jti atomically, only one of concurrent rotations of a token succeeds.
+        return self.cache.add(self.key(jti), 1, timeout=int(timeout) + 1)
+
+    def blacklist(self, token):
+        return self.blacklist_jti(token[api_settings.JTI_CLAIM], datetime_from_epoch(token['exp']))
+
+    def is_blacklisted(self, jti):
+        if self.cache.get(self.key(jti)) is not None:
+            return True
+        return self.fallback_to_database and DatabaseBlacklistBackend().is_blacklisted(jti)
+
+
+@lru_cache(maxsize=None)
+def get_blacklist_backend():
+    return import_string(settings.TOKEN_BLACKLIST['BACKEND'])(**settings.TOKEN_BLACKLIST.get('OPTIONS', {}))
@@ -0,0 +1,325 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.response import Response
+
+MISSING = object()
+
+
+class LocalLRUCache:
+    """
+    Small thread-safe in-process cache evicting the least recently used entries.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SharedCounters:
+    """
+    Counters summed over all processes.
+
+    Every process counts locally and adds its counts to the shared cache at most every
+    `API_CACHE_METRICS_FLUSH_INTERVAL` seconds. With `indexed`, the names counted by all processes
+    are recorded as well and returned by `names()`, for counters whose names are not known upfront.
+    """
+
+    def __init__(self, prefix, indexed=False):
+        self.prefix = prefix
+        self.indexed = indexed
+        self._counts = Counter()
+        self._counted_names = set()
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def key(self, name):
+        return f'{self.prefix}:{name}'
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+        if time.monotonic() - self._last_flush >= settings.API_CACHE_METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._last_flush = time.monotonic()
+            if self.indexed:
+                self._counted_names.update(counts)
+                counted_names = set(self._counted_names)
+        cache = caches[settings.API_CACHE_ALIAS]
+        for name, count in counts.items():
+            key = self.key(name)
+            cache.add(key, 0, timeout=None)
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                # The key has been evicted in the meantime.
+                cache.set(key, count, timeout=None)
+        if self.indexed and counts:
+            # Concurrent flushes may drop each other's names, so every process adds all the names
+            # it ever counted again.
+            names = cache.get(self.key('.names'), set())
+            if not counted_names <= names:
+                cache.set(self.key('.names'), names | counted_names, timeout=None)
+
+    def names(self):
+        self.flush()
+        return caches[settings.API_CACHE_ALIAS].get(self.key('.names'), set())
+
+    def get(self, names):
+        self.flush()
+        values = caches[settings.API_CACHE_ALIAS].get_many([self.key(name) for name in names])
+        return {name: values.get(self.key(name), 0) for name in names}
+
+
+class CacheMetrics(SharedCounters):
+    """
+    Hit and miss counters of the cached functions.
+    """
+
+    OUTCOMES = ('local_hit', 'hit', 'miss')
+
+    def __init__(self):
+        super().__init__('cache:metrics')
+        self.names = set()
+
+    def record(self, name, outcome):
+        self.incr(f'{name}:{outcome}')
+
+    def get(self):
+        counts = super().get([f'{name}:{outcome}' for name in self.names for outcome in self.OUTCOMES])
+        metrics = {}
+        for name in self.names:
+            metrics[name] = {outcome: counts[f'{name}:{outcome}'] for outcome in self.OUTCOMES}
+            requests = sum(metrics[name].values())
+            metrics[name]['hit_ratio'] = (
+                round((metrics[name]['local_hit'] + metrics[name]['hit']) / requests, 4) if requests else None
+            )
+        return metrics
+
+
+class TaggedCache:
+    """
+    Two tier cache with tag based invalidation.
+
+    Values are stored in the `API_CACHE_ALIAS` cache and for `API_CACHE_LOCAL_TTL` seconds in an
+    in-process LRU tier. Every tag has a version in the shared cache which is part of the keys of
+    the values cached with it, invalidating a tag bumps its version so that all of them are missed.
+    The versions are also kept in the local tier, so other processes may serve a value for up to
+    `API_CACHE_LOCAL_TTL` seconds after it was invalidated.
+    """
+
+    def __init__(self):
+        self.local = LocalLRUCache(settings.API_CACHE_LOCAL_SIZE, settings.API_CACHE_LOCAL_TTL)
+        self.metrics = CacheMetrics()
+
+    @property
+    def cache(self):
+        return caches[settings.API_CACHE_ALIAS]
+
+    @staticmethod
+    def tag_key(tag):
+        return f'cache:tag:{tag}'
+
+    def get_tag_versions(self, tags):
+        versions = {tag: self.local.get(self.tag_key(tag)) for tag in tags}
+        missing = [self.tag_key(tag) for tag, version in versions.items() if version is None]
+        if missing:
+            stored = self.cache.get_many(missing)
+            for tag in tags:
+                key = self.tag_key(tag)
+                if versions[tag] is not None:
+                    continue
+                version = stored.get(key)
+                if version is None:
+                    # Start from the current time rather than 0, so that a version which has been
+                    # evicted never comes back and validates values cached before its eviction.
+                    version = time.time_ns()
+                    if not self.cache.add(key, version, timeout=None):
+                        version = self.cache.get(key, version)
+                versions[tag] = version
+                self.local.set(key, version)
+        return [versions[tag] for tag in tags]
+
+    def make_key(self, name, tags, vary):
+        versions = self.get_tag_versions(tags)
+        digest = hashlib.sha1(repr((vary, versions)).encode()).hexdigest()
+        return f'cache:value:{name}:{digest}'
+
+    def get_or_set(self, name, tags, vary, compute, timeout=None):
+        """
+        Return the value cached under `name` and `vary` for the current versions of `tags`, or
+        compute and cache it.
+        """
+        key = self.make_key(name, tags, vary)
+
+        value = self.local.get(key, MISSING)
+        if value is not MISSING:
+            self.metrics.record(name, 'local_hit')
+            return value
+
+        value = self.cache.get(key, MISSING)
+        if value is not MISSING:
+            self.metrics.record(name, 'hit')
+        else:
+            self.metrics.record(name, 'miss')
+            value = compute()
+            self.cache.set(key, value, timeout=settings.API_CACHE_TIMEOUT if timeout is None else timeout)
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            key = self.tag_key(tag)
+            self.local.pop(key)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, time.time_ns(), timeout=None)
+
+    def clear_local(self):
+        self.local.clear()
+
+
+tagged_cache = TaggedCache()
+
+
+def _format_tags(tags, *args, **kwargs):
+    if callable(tags):
+        return list(tags(*args, **kwargs))
+    return [tag.format(**kwargs) for tag in tags]
+
+
+def cached(name, tags, timeout=None):
+    """
+    Cache the return value of a function, e.g. a list of model instances, by its arguments.
+
+    `tags` are format strings filled in with the keyword arguments of the call, or a callable
+    returning the tags for the arguments. The arguments must have a stable `repr()`.
+    """
+    def decorator(func):
+        tagged_cache.metrics.names.add(name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return tagged_cache.get_or_set(
+                name, _format_tags(tags, *args, **kwargs), (args, sorted(kwargs.items())),
+                lambda: func(*args, **kwargs), timeout=timeout,
+            )
+        return wrapper
+    return decorator
+
+
+def cache_response(name, tags, timeout=None, vary_on_user=False):
+    """
+    Cache the successful responses of a DRF view handler by their full URL.
+
+    `tags` are format strings filled in with the URL keyword arguments of the view, or a callable
+    taking the view, the request and the URL arguments. Authentication and permissions are
+    checked before the handler runs, so the response is only shared between users allowed to see
+    it; use `vary_on_user` for responses which depend on the user.
+    """
+    def decorator(handler):
+        tagged_cache.metrics.names.add(name)
+
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            vary = (request.build_absolute_uri(), request.user.pk if vary_on_user else None)
+            response = None
+
+            def compute():
+                nonlocal response
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    raise _Uncacheable()
+                return response.data
+
+            try:
+                data = tagged_cache.get_or_set(
+                    name, _format_tags(tags, view, request, *args, **kwargs), vary, compute, timeout=timeout,
+                )
+            except _Uncacheable:
+                return response
+            return response if response is not None else Response(data)
+        return wrapper
+    return decorator
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+_model_tags = {}
+
+
+def register_cache_tags(model, get_tags):
+    """
+    Invalidate the tags returned by `get_tags(instance)` whenever an instance of `model` is saved
+    or deleted.
+
+    Inside a transaction the tags are invalidated right away, for the reads of the transaction
+    itself, and again after the commit, for values cached from concurrent reads of the old rows.
+    """
+    _model_tags[model] = get_tags
+
+    def handler(sender, instance, **kwargs):
+        invalidate_instance(instance)
+
+    uid = f'cache-tags:{model._meta.label}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+def invalidate_instance(instance):
+    """
+    Invalidate the registered tags of an instance, e.g. after changing it with `QuerySet.update()`.
+    """
+    get_tags = _model_tags.get(type(instance))
+    if get_tags is None:
+        return
+    tags = list(get_tags(instance))
+    tagged_cache.invalidate(*tags)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: tagged_cache.invalidate(*tags))
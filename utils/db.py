@@ -0,0 +1,72 @@
+import psycopg2
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from utils.cache import SharedCounters
+
+connection_metrics = SharedCounters('db:metrics')
+
+
+@receiver(request_started)
+def count_request(sender, **kwargs):
+    connection_metrics.incr('requests')
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    connection_metrics.incr(f'{connection.alias}:connections_opened')
+
+
+def get_pgbouncer_pools(database):
+    """
+    `SHOW POOLS` of the PgBouncer admin console for `database`.
+    """
+    with psycopg2.connect(settings.PGBOUNCER_ADMIN_URL) as admin:
+        admin.autocommit = True
+        with admin.cursor() as cursor:
+            cursor.execute('SHOW POOLS')
+            columns = [column.name for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall() if row[0] == database]
+
+
+def get_database_metrics(alias=DEFAULT_DB_ALIAS):
+    """
+    Connection usage of the application processes and of the database server.
+
+    `connections_opened` per request is the share of requests which could not reuse a persistent
+    connection.
+    """
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT coalesce(state, 'background'), count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() GROUP BY 1"
+        )
+        server_connections = dict(cursor.fetchall())
+        cursor.execute('SHOW max_connections')
+        max_connections = int(cursor.fetchone()[0])
+
+    counts = connection_metrics.get(['requests', f'{alias}:connections_opened'])
+    requests, opened = counts['requests'], counts[f'{alias}:connections_opened']
+    metrics = {
+        'settings': {
+            'pooler': settings.DATABASE_POOLER or None,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'conn_health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+        },
+        'processes': {
+            'requests': requests,
+            'connections_opened': opened,
+            'connections_opened_per_request': round(opened / requests, 4) if requests else None,
+        },
+        'server': {
+            'max_connections': max_connections,
+            'connections': server_connections,
+        },
+    }
+    if settings.PGBOUNCER_ADMIN_URL:
+        metrics['pgbouncer'] = get_pgbouncer_pools(connection.settings_dict['NAME'])
+    return metrics
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingPoolSaturated(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many sign-ins in progress, please retry shortly."
+    default_code = "hashing_pool_saturated"
+    wait = 1
+
+
+class HashingPool:
+    """
+    Bounded thread pool running password hashing off the event loop.
+
+    The PBKDF2 hasher releases the GIL while hashing, so threads hash in parallel. At most
+    `workers + queue_size` hashes are admitted at once; further calls fail immediately with
+    `HashingPoolSaturated` instead of queueing without bound.
+    """
+
+    def __init__(self, workers, queue_size):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+
+    async def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HashingPoolSaturated()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.slots.release()
+
+
+def verify_password(password, encoded):
+    """
+    Check `password` against the `encoded` hash, like `AbstractBaseUser.check_password`.
+
+    Returns whether the password is correct and, if its hash uses an outdated hasher or
+    iteration count, the password hashed again with the current one, else None.
+    """
+    upgraded = []
+
+    def setter(raw_password):
+        upgraded.append(make_password(raw_password))
+
+    is_correct = check_password(password, encoded, setter)
+    return is_correct, upgraded[0] if upgraded else None
+
+
+hashing_pool = HashingPool(settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_QUEUE_SIZE)
@@ -0,0 +1,184 @@
+import hashlib
+import io
+
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from utils.cache import invalidate_instance
+
+
+def renditions_field_name(field_name):
+    return f'{field_name}_renditions'
+
+
+def rendition_path(content_hash, max_dimension):
+    # The encoding parameters are part of the name, so that changing them gives new URLs.
+    quality = settings.IMAGE_RENDITION_QUALITY
+    return f'renditions/{content_hash[:2]}/{content_hash}/{max_dimension}-q{quality}.webp'
+
+
+def render_webp(image, max_dimension):
+    """
+    Encode a copy of the image fitting in `max_dimension` pixels as WebP, without any metadata.
+    """
+    rendition = image.copy()
+    rendition.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    output = io.BytesIO()
+    # Pillow only writes EXIF, XMP and ICC data to WebP files when they are passed explicitly.
+    rendition.save(output, format='WEBP', quality=settings.IMAGE_RENDITION_QUALITY, method=4)
+    return output.getvalue()
+
+
+def create_renditions(data, storage):
+    """
+    Store the WebP renditions of the image `data` in `storage` and return their paths by size name.
+
+    Renditions are stored under the SHA-256 of the original, so an image which has been uploaded
+    before is not processed again.
+    """
+    content_hash = hashlib.sha256(data).hexdigest()
+    paths = {
+        size: rendition_path(content_hash, max_dimension)
+        for size, max_dimension in settings.IMAGE_RENDITION_SIZES.items()
+    }
+    if all(storage.exists(path) for path in paths.values()):
+        return {'hash': content_hash, **paths}
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Apply the EXIF orientation before the metadata is dropped.
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        for size, max_dimension in settings.IMAGE_RENDITION_SIZES.items():
+            if not storage.exists(paths[size]):
+                storage.save(paths[size], ContentFile(render_webp(image, max_dimension)))
+    return {'hash': content_hash, **paths}
+
+
+@shared_task(serializer='json', name="generate_image_renditions", acks_late=True)
+def generate_image_renditions(model_label, pk, field_name, source):
+    """
+    Generate the renditions of an uploaded image and record them on the instance.
+
+    Does nothing if the image has been replaced since the task was queued.
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only('pk', field_name).first()
+    if instance is None or getattr(instance, field_name).name != source:
+        return
+
+    field_file = getattr(instance, field_name)
+    with field_file.open('rb'):
+        data = field_file.read()
+    renditions = {'source': source, **create_renditions(data, field_file.storage)}
+
+    # Update only if the image is still the same, without sending the save signals again.
+    updated = model.objects.filter(pk=pk, **{field_name: source}).update(
+        **{renditions_field_name(field_name): renditions}
+    )
+    if updated:
+        invalidate_instance(instance)
+
+
+def queue_renditions(instance, field_name):
+    """
+    Queue the generation of the renditions of the image after the transaction commits, or clear
+    the renditions of a removed image.
+    """
+    source = getattr(instance, field_name).name or ''
+    renditions = getattr(instance, renditions_field_name(field_name))
+    if renditions.get('source', '') == source:
+        return
+
+    if not source:
+        setattr(instance, renditions_field_name(field_name), {})
+        type(instance).objects.filter(pk=instance.pk).update(**{renditions_field_name(field_name): {}})
+        return
+
+    transaction.on_commit(lambda: generate_image_renditions.delay(
+        instance._meta.label, instance.pk, field_name, source
+    ))
+
+
+def register_renditions(model, field_name):
+    """
+    Generate renditions for the image `field_name` of `model` whenever a new image is saved.
+
+    The model needs a `<field_name>_renditions` JSON field.
+    """
+    def handler(sender, instance, **kwargs):
+        queue_renditions(instance, field_name)
+
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=f'renditions:{model._meta.label}.{field_name}')
+
+
+def rendition_url(field_file, size):
+    """
+    URL of the `size` rendition of the image, or of the original while no rendition exists.
+    """
+    renditions = getattr(field_file.instance, renditions_field_name(field_file.field.name), None) or {}
+    return stored_rendition_url(field_file.storage, field_file.name, renditions, size)
+
+
+def stored_rendition_url(storage, name, renditions, size):
+    """
+    URL of the `size` rendition of the image stored as `name` with `renditions`, e.g. as read by
+    `.values()`, or of the original while no rendition exists.
+    """
+    if renditions.get('source') == name and size in renditions:
+        return storage.url(renditions[size])
+    return storage.url(name)
+
+
+def requested_size(request, default):
+    """
+    The rendition size asked for with the `image_size` query parameter, `default` otherwise.
+    """
+    size = request.query_params.get('image_size', default) if hasattr(request, 'query_params') else default
+    return size if size in settings.IMAGE_RENDITION_SIZES else default
+
+
+class ImageRenditionField(serializers.ImageField):
+    """
+    Image field which represents the image by the URL of its `size` rendition.
+
+    Clients can ask for another size with the `image_size` query parameter.
+    """
+
+    def __init__(self, size, **kwargs):
+        self.size = size
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        url = rendition_url(value, requested_size(request, self.size))
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class RenditionURLs:
+    """
+    Represent images of `.values()` rows the way `ImageRenditionField(size)` represents the images
+    of `field_name` of `model`, called with the stored name and the renditions of an image.
+    """
+
+    def __init__(self, model, field_name, size, request=None):
+        self.storage = model._meta.get_field(field_name).storage
+        self.size = requested_size(request, size)
+        self.request = request
+
+    def __call__(self, name, renditions):
+        if not name:
+            return None
+        url = stored_rendition_url(self.storage, name, renditions or {}, self.size)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
@@ -0,0 +1,366 @@
+import bisect
+import contextvars
+import logging
+import math
+import time
+from collections import Counter
+from urllib.parse import parse_qsl, urlencode
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery import current_app
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.serializers import BaseSerializer
+
+from utils.cache import SharedCounters
+
+logger = logging.getLogger(__name__)
+
+request_metrics = SharedCounters('http:metrics', indexed=True)
+
+_profile = contextvars.ContextVar('request_profile', default=None)
+
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+
+class RequestProfile:
+    """
+    Time a request spent running SQL queries and serializers.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.query_templates = Counter()
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def repeated_queries(self):
+        """
+        SQL templates run at least `REPEATED_QUERY_THRESHOLD` times, the usual sign of N+1 queries.
+        """
+        return {
+            sql: count for sql, count in self.query_templates.items()
+            if count >= settings.REPEATED_QUERY_THRESHOLD
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.query_time += time.perf_counter() - started
+        profile.query_templates[sql] += 1
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # Installed on every connection rather than with `execute_wrapper()` around the request, as the
+    # async views run their queries on the connections of other threads.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_serializers():
+    """
+    Add the time spent in `Serializer.data`, which runs `to_representation()`, to the profile of the
+    current request.
+    """
+    data = BaseSerializer.data.fget
+    if getattr(data, 'instrumented', False):
+        return
+
+    def timed_data(serializer):
+        profile = _profile.get()
+        if profile is None or profile.serializing:
+            return data(serializer)
+        profile.serializing = True
+        started = time.perf_counter()
+        try:
+            return data(serializer)
+        finally:
+            profile.serializer_time += time.perf_counter() - started
+            profile.serializing = False
+
+    timed_data.instrumented = True
+    BaseSerializer.data = property(timed_data)
+
+
+def _format_labels(labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+
+    def counter_name(self, labels, field):
+        return f'{self.name}?{urlencode(labels)}#{field}'
+
+    def series(self, values):
+        """
+        Counted fields by labels of the series of this metric among the shared counter `values`.
+        """
+        series = {}
+        for name, value in values.items():
+            metric, _, rest = name.partition('?')
+            if metric == self.name:
+                labels, _, field = rest.rpartition('#')
+                series.setdefault(labels, {})[field] = value
+        return sorted((parse_qsl(labels), fields) for labels, fields in series.items())
+
+    def expose(self, values):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for labels, fields in self.series(values):
+            lines.extend(self.expose_series(labels, fields))
+        return lines
+
+    def expose_series(self, labels, fields):
+        raise NotImplementedError
+
+
+class CounterMetric(Metric):
+    type = 'counter'
+
+    def inc(self, **labels):
+        request_metrics.incr(self.counter_name(labels, 'total'))
+
+    def expose_series(self, labels, fields):
+        return [f'{self.name}{_format_labels(labels)} {fields.get("total", 0)}']
+
+
+class GaugeMetric(Metric):
+    """
+    Gauge measured when the metrics are scraped, by `collect()` returning the values by labels.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, collect):
+        super().__init__(name, documentation)
+        self.collect = collect
+
+    def expose(self, values):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f'{self.name}{_format_labels(labels)} {value}')
+        return lines
+
+
+class HistogramMetric(Metric):
+    """
+    Histogram kept in shared counters, one per bucket and one for the sum of the observed values.
+
+    The shared counters are integers, the sum is counted in units of 1 / `scale`.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets, scale=1):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+        self.scale = scale
+
+    def observe(self, value, **labels):
+        request_metrics.incr(self.counter_name(labels, bisect.bisect_left(self.buckets, value)))
+        request_metrics.incr(self.counter_name(labels, 'sum'), round(value * self.scale))
+
+    def expose_series(self, labels, fields):
+        lines = []
+        count = 0
+        for index, bound in enumerate(self.buckets + (math.inf,)):
+            count += fields.get(str(index), 0)
+            le = '+Inf' if bound == math.inf else repr(float(bound))
+            lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", le)])} {count}')
+        lines.append(f'{self.name}_sum{_format_labels(labels)} {fields.get("sum", 0) / self.scale}')
+        lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return lines
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_DURATION = HistogramMetric(
+    'http_request_duration_seconds', 'Time to handle a request.', LATENCY_BUCKETS, scale=10 ** 6,
+)
+DB_QUERIES = HistogramMetric(
+    'http_request_db_queries', 'SQL queries run by a request.', (0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+DB_DURATION = HistogramMetric(
+    'http_request_db_duration_seconds', 'Time a request spent running SQL queries.', LATENCY_BUCKETS,
+    scale=10 ** 6,
+)
+SERIALIZER_DURATION = HistogramMetric(
+    'http_request_serializer_duration_seconds', 'Time a request spent in serializers.', LATENCY_BUCKETS,
+    scale=10 ** 6,
+)
+RESPONSE_SIZE = HistogramMetric(
+    'http_response_size_bytes', 'Size of the response body.', (256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+REPEATED_QUERIES = CounterMetric(
+    'http_request_repeated_queries_total', 'Requests which ran the same SQL template many times, likely N+1 queries.',
+)
+
+
+def queue_depths():
+    """
+    Messages waiting in every task queue, by queue. Empty when the broker cannot be reached.
+    """
+    depths = {}
+    try:
+        with current_app.connection_for_read() as connection:
+            connection.ensure_connection(max_retries=1)
+            channel = connection.default_channel
+            for name in current_app.amqp.queues:
+                try:
+                    depths[(('queue', name),)] = channel.queue_declare(name, passive=True).message_count
+                except connection.channel_errors:
+                    # The queue has not been declared by a worker or producer yet.
+                    depths[(('queue', name),)] = 0
+                    channel = connection.channel()
+    except Exception:
+        logger.warning('Cannot read the depths of the task queues', exc_info=True)
+    return depths
+
+
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+TASK_DURATION = HistogramMetric(
+    'celery_task_duration_seconds', 'Time to run a task.', TASK_BUCKETS, scale=10 ** 6,
+)
+TASKS = CounterMetric(
+    'celery_tasks_total', 'Tasks run, by their final state: SUCCESS, FAILURE or RETRY.',
+)
+QUEUE_DEPTH = GaugeMetric(
+    'celery_queue_depth', 'Messages waiting in a task queue.', queue_depths,
+)
+
+METRICS = (REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZER_DURATION, RESPONSE_SIZE, REPEATED_QUERIES,
+           TASK_DURATION, TASKS, QUEUE_DEPTH)
+
+
+def render_metrics():
+    """
+    Request metrics of all processes in the Prometheus text format.
+    """
+    values = request_metrics.get(sorted(request_metrics.names()))
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.expose(values))
+    return '\n'.join(lines) + '\n'
+
+
+def view_label(request):
+    # Unresolved requests share one label, so that scanning random URLs does not add series.
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match.route
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Record the latency, SQL queries, serializer time and response size of every request.
+
+    They are exported as Prometheus metrics labelled by URL name, and sent in a `Server-Timing`
+    header when `SERVER_TIMING` is on. Requests running the same SQL template at least
+    `REPEATED_QUERY_THRESHOLD` times are logged as likely N+1 queries.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        self.record(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _profile.reset(token)
+        self.record(request, response, profile)
+        return response
+
+    @staticmethod
+    def record(request, response, profile):
+        duration = time.perf_counter() - profile.started
+        view = view_label(request)
+        method = request.method if request.method in METHODS else 'other'
+
+        REQUEST_DURATION.observe(duration, view=view, method=method, status=response.status_code)
+        DB_QUERIES.observe(profile.queries, view=view)
+        DB_DURATION.observe(profile.query_time, view=view)
+        SERIALIZER_DURATION.observe(profile.serializer_time, view=view)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(len(response.content), view=view)
+
+        repeated = profile.repeated_queries()
+        if repeated:
+            REPEATED_QUERIES.inc(view=view)
+            for sql, count in repeated.items():
+                logger.warning('Likely N+1 queries in %s %s (%s): ran %d times: %s',
+                               request.method, request.path, view, count, sql)
+
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={profile.query_time * 1000:.1f};desc="{profile.queries} queries", '
+                f'serializer;dur={profile.serializer_time * 1000:.1f}, '
+                f'total;dur={duration * 1000:.1f}'
+            )
+
+
+_task_started = {}
+
+
+def task_queue(task):
+    delivery_info = task.request.delivery_info or {}
+    # Eagerly run tasks have no delivery info, they are labelled with the queue they are routed to.
+    return delivery_info.get('routing_key') or task.app.amqp.router.route({}, task.name)['queue'].name
+
+
+@task_prerun.connect
+def task_started(task_id, task, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def task_finished(task_id, task, state, **kwargs):
+    started = _task_started.pop(task_id, None)
+    queue = task_queue(task)
+    if started is not None:
+        TASK_DURATION.observe(time.perf_counter() - started, task=task.name, queue=queue)
+    TASKS.inc(task=task.name, queue=queue, state=state or 'UNKNOWN')
+
+
+@worker_process_shutdown.connect
+def flush_task_metrics(**kwargs):
+    request_metrics.flush()
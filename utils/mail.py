@@ -1,16 +1,173 @@
+import logging
+import smtplib
 import time
+from functools import lru_cache
 
-from celery import shared_task
+import redis
+from celery import group, shared_task
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
 
+from quizzes.models import Quiz, QuizEmailDelivery
+from users.models import Profile
 
-@shared_task(serializer='json', name="send_mail")
-def send_quiz_link_to_students(recipient_emails, quiz_unique_link):
+logger = logging.getLogger(__name__)
+
+# Reserves the next send slot if it is free. The key holds the time of the next free slot, slots
+# are 1 / QUIZ_EMAIL_RATE_LIMIT seconds apart for every worker.
+# KEYS: the slot key. ARGV: the current time, the interval between slots in seconds.
+# Returns how many seconds are left until the next slot, as a string, "0" if it was reserved.
+RESERVE_SEND_SLOT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local next_slot = tonumber(redis.call('GET', KEYS[1]) or '0')
+if next_slot > now then
+    return tostring(next_slot - now)
+end
+redis.call('SET', KEYS[1], tostring(now + interval), 'PX', math.ceil(interval * 1000) + 1000)
+return '0'
+"""
+
+
+@lru_cache(maxsize=None)
+def get_reserve_send_slot_script():
+    client = redis.Redis.from_url(settings.QUIZ_EMAIL_RATE_REDIS_URL, decode_responses=True)
+    return client.register_script(RESERVE_SEND_SLOT_SCRIPT)
+
+
+def reserve_send_slot():
+    """
+    Reserve the slot to send one message in, shared by every worker. Returns 0 once reserved, else
+    how many seconds are left until the next free slot.
+    """
+    wait = get_reserve_send_slot_script()(
+        keys=[settings.QUIZ_EMAIL_RATE_KEY], args=[time.time(), 1 / settings.QUIZ_EMAIL_RATE_LIMIT]
+    )
+    return float(wait)
+
+
+def build_quiz_link_message(email, first_name, quiz_unique_link):
     complete_quiz_link = f'https://namdvilidomeini.com/quiz/{quiz_unique_link}'
     subject = 'Quiz Link'
-    message = f'Hello,\n\nHere is your quiz link:\n\n {complete_quiz_link}\n\nBest regards!'
-    from_email = settings.EMAIL_HOST_USER
-    recipient_list = recipient_emails
+    greeting = f'Hello {first_name},' if first_name else 'Hello,'
+    message = f'{greeting}\n\nHere is your quiz link:\n\n {complete_quiz_link}\n\nBest regards!'
+    return EmailMessage(subject, message, settings.EMAIL_HOST_USER, [email])
+
+
+@shared_task(serializer='json', name="send_mail")
+def send_quiz_link_to_students(recipient_emails, quiz_unique_link):
+    """
+    Record a delivery for every recipient and fan the deliveries out in chunks across the workers.
+    """
+    quiz = Quiz.objects.filter(unique_link=quiz_unique_link).first()
+    if quiz is None:
+        logger.warning("Not sending the link of unknown quiz %s", quiz_unique_link)
+        return
+    deliveries = QuizEmailDelivery.objects.bulk_create(
+        QuizEmailDelivery(quiz=quiz, email=email) for email in dict.fromkeys(recipient_emails)
+    )
+    delivery_ids = [delivery.id for delivery in deliveries]
+    chunk_size = settings.QUIZ_EMAIL_CHUNK_SIZE
+
+    group(
+        send_quiz_link_chunk.s(delivery_ids[i:i + chunk_size])
+        for i in range(0, len(delivery_ids), chunk_size)
+    ).apply_async()
+
+
+@shared_task(bind=True, serializer='json', name="send_quiz_link_chunk",
+             max_retries=settings.QUIZ_EMAIL_MAX_RETRIES, default_retry_delay=60)
+def send_quiz_link_chunk(self, delivery_ids):
+    """
+    Send the quiz link to every pending delivery of the chunk over one SMTP connection.
+
+    Recipients rejected by the server are marked failed right away, transient errors are retried
+    for the failed recipients only. Messages are sent at most QUIZ_EMAIL_RATE_LIMIT per second across
+    all workers: once the next send slot is taken, the rest of the chunk is queued again for when it
+    is free rather than waiting in the worker.
+    """
+    deliveries = list(
+        QuizEmailDelivery.objects
+        .filter(id__in=delivery_ids, status=QuizEmailDelivery.Status.PENDING)
+        .select_related('quiz')
+        .order_by('id')
+    )
+    if not deliveries or defer_deliveries(self, deliveries):
+        return
+
+    first_names = dict(
+        Profile.objects
+        .filter(user__email__in=[delivery.email for delivery in deliveries])
+        .values_list('user__email', 'first_name')
+    )
+
+    retry_ids = []
+    connection = get_connection()
+
+    try:
+        connection.open()
+    except (smtplib.SMTPException, OSError) as exc:
+        for delivery in deliveries:
+            delivery.attempts += 1
+            delivery.error = str(exc)
+            delivery.date_updated = timezone.now()
+            if self.request.retries >= self.max_retries:
+                delivery.status = QuizEmailDelivery.Status.FAILED
+        QuizEmailDelivery.objects.bulk_update(deliveries, ['status', 'attempts', 'error', 'date_updated'])
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc)
+        return
+
+    reconnect = False
+    try:
+        for index, delivery in enumerate(deliveries):
+            # The slot of the first message was reserved before connecting.
+            if index and defer_deliveries(self, deliveries[index:]):
+                deliveries = deliveries[:index]
+                break
+            message = build_quiz_link_message(delivery.email, first_names.get(delivery.email),
+                                              delivery.quiz.unique_link)
+
+            delivery.attempts += 1
+            delivery.date_updated = timezone.now()
+            try:
+                if reconnect:
+                    # Without an open connection the backend would connect again for every message.
+                    connection.open()
+                    reconnect = False
+                connection.send_messages([message])
+            except smtplib.SMTPRecipientsRefused as exc:
+                delivery.status = QuizEmailDelivery.Status.FAILED
+                delivery.error = str(exc)
+            except (smtplib.SMTPException, OSError) as exc:
+                delivery.error = str(exc)
+                if self.request.retries >= self.max_retries:
+                    delivery.status = QuizEmailDelivery.Status.FAILED
+                else:
+                    retry_ids.append(delivery.id)
+                # The connection may be unusable now, the next message opens a new one.
+                connection.close()
+                reconnect = True
+            else:
+                delivery.status = QuizEmailDelivery.Status.SENT
+                delivery.error = ''
+    finally:
+        connection.close()
+
+    QuizEmailDelivery.objects.bulk_update(deliveries, ['status', 'attempts', 'error', 'date_updated'])
+
+    if retry_ids:
+        raise self.retry(args=[retry_ids])
+
 
-    send_mail(subject, message, from_email, recipient_list)
+def defer_deliveries(task, deliveries):
+    """
+    Reserve the send slot of the first of `deliveries`, or queue them again for when the next slot
+    is free, keeping the retries of `task`. Returns whether they were queued again.
+    """
+    wait = reserve_send_slot()
+    if not wait:
+        return False
+    task.apply_async(args=[[delivery.id for delivery in deliveries]], countdown=wait, retries=task.request.retries)
+    return True
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utils.schema import build_schema
+
+
+class Command(BaseCommand):
+    help = ("Generate the OpenAPI schema into OPENAPI_SCHEMA_ROOT, where the schema view serves it from. "
+            "Run it on every deployment, running processes keep the schema they have loaded until restarted.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', default=settings.OPENAPI_SCHEMA_ROOT, help="Directory to write the schema to.")
+
+    def handle(self, *args, **options):
+        version = build_schema(options['root'])
+        self.stdout.write(self.style.SUCCESS(f"OpenAPI schema {version} written to {options['root']}."))
@@ -0,0 +1,77 @@
+import copy
+
+from django.db.models.fields.files import FieldFile
+
+
+def _comparable(value):
+    if isinstance(value, FieldFile):
+        return value.name
+    if isinstance(value, (list, dict)):
+        return copy.deepcopy(value)
+    return value
+
+
+class LoadedValuesMixin:
+    """
+    Model mixin which records the values of the loaded fields when the instance is loaded from the
+    database and after every save, e.g. for the save signals to know the previous values.
+    """
+
+    _loaded_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._record_loaded_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._record_loaded_values(fields)
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        super().save(force_insert=force_insert, force_update=force_update, using=using,
+                     update_fields=update_fields)
+        self._record_loaded_values(update_fields)
+
+    def get_loaded_value(self, attname, default=None):
+        """
+        Value of the field in the database, as loaded or last saved, or `default` if it is unknown.
+        """
+        return (self._loaded_values or {}).get(attname, default)
+
+    def get_dirty_fields(self):
+        """
+        Names of the loaded fields whose value differs from the one in the database.
+        """
+        loaded_values = self._loaded_values or {}
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and not field.primary_key
+            and (field.attname not in loaded_values
+                 or _comparable(self.__dict__[field.attname]) != loaded_values[field.attname])
+        ]
+
+    def _record_loaded_values(self, fields=None):
+        if fields is None or self._loaded_values is None:
+            self._loaded_values = {'pk': self.pk}
+            fields = None
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (fields is None or field.name in fields or field.attname in fields):
+                self._loaded_values[field.attname] = _comparable(self.__dict__[field.attname])
+
+
+class DirtyFieldsMixin(LoadedValuesMixin):
+    """
+    Model mixin which saves only the fields that changed since the instance was loaded.
+
+    `save()` without `update_fields` on an existing instance updates only the changed fields, and
+    does nothing at all, not even sending the save signals, when none changed.
+    """
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        if (update_fields is None and not force_insert and not self._state.adding
+                and self._loaded_values is not None and self._loaded_values.get('pk') == self.pk):
+            update_fields = self.get_dirty_fields()
+        super().save(force_insert=force_insert, force_update=force_update, using=using,
+                     update_fields=update_fields)
@@ -0,0 +1,82 @@
+from django.core.exceptions import ValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key related field which loads all the instances of a list at once.
+
+    With `many=True`, and as a field of the child of a `BulkListSerializer`, the primary keys of
+    all the items are loaded with one query instead of one query per item.
+    """
+
+    _prefetched = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def _pk(self, value):
+        if isinstance(value, bool):
+            raise TypeError(value)
+        return self.get_queryset().model._meta.pk.to_python(value)
+
+    def prefetch(self, values):
+        """
+        Load the instances of the primary keys among `values` which are not loaded yet.
+        """
+        if self._prefetched is None:
+            self._prefetched = {}
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self._pk(value))
+            except (TypeError, ValueError, ValidationError):
+                continue
+        pks.difference_update(self._prefetched)
+        if pks:
+            self._prefetched.update(self.get_queryset().in_bulk(pks))
+
+    def to_internal_value(self, data):
+        if self._prefetched is None:
+            return super().to_internal_value(data)
+        try:
+            pk = self._pk(data)
+        except (TypeError, ValueError, ValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in self._prefetched:
+            self.fail('does_not_exist', pk_value=data)
+        return self._prefetched[pk]
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child_relation.prefetch(data)
+        return super().to_internal_value(data)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    List serializer loading the related instances of the `BulkPrimaryKeyRelatedField`s of all its
+    items at once.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            for name, field in self.child.fields.items():
+                if field.read_only:
+                    continue
+                values = [item[name] for item in data if isinstance(item, dict) and name in item]
+                if isinstance(field, BulkPrimaryKeyRelatedField):
+                    field.prefetch(values)
+                elif isinstance(field, BulkManyRelatedField):
+                    field.child_relation.prefetch(
+                        value for item_values in values if isinstance(item_values, list) for value in item_values
+                    )
+        return super().to_internal_value(data)
@@ -0,0 +1,31 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Types orjson does not serialize itself, and dates and times, are converted by the encoder of DRF,
+# so that `Decimal`, `timedelta` and datetimes render as they do with `JSONRenderer`.
+_encoder = JSONEncoder()
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` serializing with orjson, several times faster on large responses.
+
+    The output is the same, except that NaN and infinite floats render as null instead of failing.
+    Indented output, asked for with e.g. `Accept: application/json; indent=4`, is rendered by
+    `JSONRenderer`, as orjson only indents by two spaces.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        content = orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+        # Like `JSONRenderer`, escape the line separators which are valid JSON but not JavaScript.
+        if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+            content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return content
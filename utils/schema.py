@@ -0,0 +1,147 @@
+"""
+Prebuilt OpenAPI schema.
+
+Generating the schema introspects every view and serializer, so it is built once by the
+`build_schema` command into `OPENAPI_SCHEMA_ROOT` and only read by the schema view. Every format is
+stored with a gzipped copy, and a manifest holding the version of the schema, a hash of its content
+which the ETags of the schema responses are made of.
+
+With `OPENAPI_SCHEMA_PREBUILT` off, e.g. in development, the schema is generated on the first
+request of each process instead.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+MANIFEST_NAME = 'manifest.json'
+
+SCHEMA_FORMATS = {
+    'yaml': (OpenApiYamlRenderer, OpenApiYamlRenderer.media_type),
+    'json': (OpenApiJsonRenderer, OpenApiJsonRenderer.media_type),
+}
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """
+    Bearer JWT security scheme of `ClaimsJWTAuthentication`, spectacular only resolves the exact class.
+    """
+    target_class = 'utils.authentication.ClaimsJWTAuthentication'
+
+
+class SchemaNotBuilt(Exception):
+    pass
+
+
+class SchemaArtifact:
+    """
+    One format of the schema, with its gzipped copy.
+    """
+
+    def __init__(self, content, version, schema_format, compressed=None):
+        self.content = content
+        self.version = version
+        self.format = schema_format
+        self.content_type = SCHEMA_FORMATS[schema_format][1]
+        self.compressed = compressed if compressed is not None else gzip.compress(content, mtime=0)
+
+    def etag(self, gzipped):
+        return f'"{self.version}-{self.format}{"-gzip" if gzipped else ""}"'
+
+
+def generate_schema():
+    """
+    Introspect the API and render the schema in every format, by format.
+    """
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    contents = {
+        schema_format: renderer().render(schema, renderer_context={})
+        for schema_format, (renderer, _) in SCHEMA_FORMATS.items()
+    }
+    version = hashlib.sha256(contents['json']).hexdigest()[:16]
+    return {
+        schema_format: SchemaArtifact(content, version, schema_format)
+        for schema_format, content in contents.items()
+    }
+
+
+def build_schema(root=None):
+    """
+    Generate the schema and write it to `root`, `OPENAPI_SCHEMA_ROOT` by default. Returns its version.
+
+    Files are replaced atomically, the manifest last, so that running processes never read a
+    partially written schema.
+    """
+    root = root or settings.OPENAPI_SCHEMA_ROOT
+    os.makedirs(root, exist_ok=True)
+    artifacts = generate_schema()
+    version = artifacts['json'].version
+    files = {}
+    for schema_format, artifact in artifacts.items():
+        name = f'openapi-{version}.{schema_format}'
+        _write(os.path.join(root, name), artifact.content)
+        _write(os.path.join(root, f'{name}.gz'), artifact.compressed)
+        files[schema_format] = name
+    _write(os.path.join(root, MANIFEST_NAME), json.dumps({'version': version, 'files': files}).encode())
+
+    for name in os.listdir(root):
+        if name.startswith('openapi-') and name.split('.gz')[0] not in files.values():
+            os.remove(os.path.join(root, name))
+    return version
+
+
+def _write(path, content):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+def load_schema(root=None):
+    """
+    Read the schema built by `build_schema()`, by format.
+    """
+    root = root or settings.OPENAPI_SCHEMA_ROOT
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as file:
+            manifest = json.load(file)
+        artifacts = {}
+        for schema_format, name in manifest['files'].items():
+            with open(os.path.join(root, name), 'rb') as file:
+                content = file.read()
+            with open(os.path.join(root, f'{name}.gz'), 'rb') as file:
+                compressed = file.read()
+            artifacts[schema_format] = SchemaArtifact(content, manifest['version'], schema_format, compressed)
+    except (OSError, KeyError, ValueError) as exc:
+        raise SchemaNotBuilt(f"No schema in {root}, run `manage.py build_schema`.") from exc
+    return artifacts
+
+
+class SchemaStore:
+    """
+    The schema of this process, loaded once, or generated once when it is not prebuilt.
+    """
+
+    def __init__(self):
+        self._artifacts = None
+        self._lock = threading.Lock()
+
+    def get(self, schema_format):
+        if self._artifacts is None:
+            with self._lock:
+                if self._artifacts is None:
+                    self._artifacts = load_schema() if settings.OPENAPI_SCHEMA_PREBUILT else generate_schema()
+        return self._artifacts[schema_format]
+
+    def clear(self):
+        self._artifacts = None
+
+
+schema_store = SchemaStore()
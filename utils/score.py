@@ -5,6 +5,16 @@ def calculate_score(quiz, user_answers):
     total_score = 0
     total_max_score = 0
 
+    # Load the correct answers and max scores of all answered questions up front instead of
+    # querying them for every question.
+    question_ids = [answer_data['question'].id for answer_data in user_answers]
+    correct_answer_ids = {}
+    for question_id, answer_id in Answer.objects.filter(question_id__in=question_ids,
+                                                        is_correct=True).values_list('question_id', 'id'):
+        correct_answer_ids.setdefault(question_id, set()).add(answer_id)
+    max_scores = dict(QuestionScore.objects.filter(quiz=quiz, question_id__in=question_ids)
+                      .values_list('question_id', 'score'))
+
     for answer_data in user_answers:
         question_total_score = 0
         question = answer_data['question']
@@ -12,18 +22,18 @@ def calculate_score(quiz, user_answers):
 
         if answer_type in [0, 1]:
             selected_answers = answer_data['selected_answers']
-            correct_answer_ids = Answer.objects.filter(question=question, is_correct=True).values_list('id', flat=True)
+            question_correct_ids = correct_answer_ids.get(question.id, set())
             user_selected_ids = [answer.id for answer in selected_answers]
-            correct_selected_ids = set(correct_answer_ids) & set(user_selected_ids)
-            incorrect_selected_ids = set(user_selected_ids) - set(correct_answer_ids)
+            correct_selected_ids = question_correct_ids & set(user_selected_ids)
+            incorrect_selected_ids = set(user_selected_ids) - question_correct_ids
 
-            question_max_score = QuestionScore.objects.get(quiz=quiz, question=question).score
+            question_max_score = max_scores[question.id]
             total_max_score += question_max_score
             correct_answer_count = len(correct_selected_ids)
             incorrect_answer_count = len(incorrect_selected_ids)
 
             if correct_answer_count > 0:
-                partial_score = (correct_answer_count / len(correct_answer_ids)) * question_max_score
+                partial_score = (correct_answer_count / len(question_correct_ids)) * question_max_score
                 question_total_score += partial_score
 
             if incorrect_answer_count > 0:
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import posixpath
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import cached_property
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    File system storage which names files after the SHA-256 of their content.
+
+    `question_images/photo.JPG` is stored as `question_images/<sha256>.jpg`, so a URL always serves
+    the same bytes and can be cached forever, a replaced file gets a new URL and identical uploads
+    are stored once. Names under `addressed_prefixes` are already derived from the content and are
+    kept as they are.
+    """
+
+    addressed_prefixes = ('renditions/',)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if not name.startswith(self.addressed_prefixes):
+            name = self.hashed_name(name, content)
+            if self.exists(name):
+                return name
+        return super().save(name, content, max_length=max_length)
+
+    @staticmethod
+    def hashed_name(name, content):
+        sha256 = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        dirname, basename = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(basename)[1].lower()
+        return posixpath.join(dirname, f'{sha256.hexdigest()}{extension}')
+
+
+def media_signature(name, expires):
+    return signing.Signer(salt='protected-media').signature(f'{name}:{expires}')
+
+
+def is_valid_media_signature(name, expires, signature):
+    """
+    Whether `signature` is the signature of the protected file `name` and `expires`, a unix time,
+    has not passed.
+    """
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    return expires > time.time() and constant_time_compare(signature or '', media_signature(name, expires))
+
+
+class ProtectedContentHashStorage(ContentHashStorage):
+    """
+    Content hash storage in `PROTECTED_MEDIA_ROOT`, which is only served to authorized users
+    through `utils.views.ProtectedMediaView`.
+
+    URLs are signed and expire, so that they can be used in `<img src>` by whoever the API handed
+    them to. The expiry is rounded to `PROTECTED_MEDIA_URL_TTL`, which keeps the URL of a file the
+    same for a while, and a URL is valid for at least `PROTECTED_MEDIA_URL_TTL` seconds.
+    """
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PROTECTED_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+        elif setting == 'PROTECTED_MEDIA_URL':
+            self.__dict__.pop('base_url', None)
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PROTECTED_MEDIA_ROOT)
+
+    @cached_property
+    def base_url(self):
+        if self._base_url is not None and not self._base_url.endswith('/'):
+            self._base_url += '/'
+        return self._value_or_setting(self._base_url, settings.PROTECTED_MEDIA_URL)
+
+    def url(self, name):
+        ttl = settings.PROTECTED_MEDIA_URL_TTL
+        expires = (int(time.time()) // ttl + 2) * ttl
+        query = urlencode({'expires': expires, 'signature': media_signature(name, expires)})
+        return f'{super().url(name)}?{query}'
+
+
+def protected_storage():
+    return storages['protected']
@@ -0,0 +1,188 @@
+"""
+Query-count budgets of the API endpoints, checked by the test suite.
+
+Every endpoint of an urlconf is requested with growing amounts of data, the number of SQL queries it
+runs must not grow with the data, which is how N+1 queries show, and must stay within its budget.
+Failures list the queries grouped by SQL template, the repeated ones first.
+"""
+import re
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.urls import URLPattern, URLResolver
+from rest_framework.reverse import reverse
+
+from utils.authentication import _local_states
+from utils.cache import tagged_cache
+from utils.token import create_custom_token
+
+
+def sql_template(sql):
+    """
+    The SQL on one line with its lists of parameters and savepoint names collapsed, so that the same
+    query with more parameters, e.g. `IN (%s, %s)`, has the same template.
+    """
+    sql = ' '.join(sql.split())
+    sql = re.sub(r'\((?:%s, )+%s\)', '(%s, ...)', sql)
+    sql = re.sub(r'(\([^()]*\))(?:, \1)+', r'\1, ...', sql)
+    return re.sub(r'"s\d+_x\d+"', '"s..."', sql)
+
+
+class QueryRecorder:
+    """
+    Context manager recording the SQL templates of the queries run on the default database.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql_template(sql))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+
+def format_queries(queries):
+    """
+    The queries grouped by SQL template, the most repeated first.
+    """
+    return '\n'.join(f'{count:5} x {sql}' for sql, count in Counter(queries).most_common())
+
+
+def format_growth(runs):
+    """
+    The SQL templates whose count changes between the runs, with their count in every run.
+    """
+    counts = {size: Counter(queries) for size, queries in runs.items()}
+    templates = {sql for counter in counts.values() for sql in counter}
+    lines = []
+    for sql in sorted(templates, key=lambda sql: [-counts[size][sql] for size in reversed(runs)]):
+        template_counts = [counts[size][sql] for size in runs]
+        if len(set(template_counts)) > 1:
+            lines.append(f'{" -> ".join(f"{count:3}" for count in template_counts)} x {sql}')
+    return '\n'.join(lines)
+
+
+def url_names(urlpatterns, namespace=None):
+    names = []
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLResolver):
+            names.extend(url_names(pattern.url_patterns, pattern.namespace or namespace))
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.append(f'{namespace}:{pattern.name}' if namespace else pattern.name)
+    return names
+
+
+class QueryBudget:
+    """
+    Query budget of one endpoint: the request to make and the most queries it may run.
+
+    `args`, `data` and `params` are callables taking the test case, so that they can refer to the
+    data created for the run. The request is authenticated as the `user` attribute of the test case,
+    or anonymous when `user` is None.
+    """
+
+    def __init__(self, url_name, queries, method='get', args=None, data=None, params=None, user='user',
+                 format='json'):
+        self.url_name = url_name
+        self.queries = queries
+        self.method = method
+        self.args = args
+        self.data = data
+        self.params = params
+        self.user = user
+        self.format = format
+
+    def __str__(self):
+        return f'{self.method.upper()} {self.url_name}'
+
+
+class QueryBudgetTestMixin:
+    """
+    Check the `query_budgets` of the endpoints of `urlconf`, mixed into an `APITestCase`.
+
+    `create_data(size)` creates the data of one run, with `size` items of what the endpoints list or
+    process, e.g. questions, results or users. Each run is rolled back before the next one. Every
+    named URL of `urlconf` needs a budget, or an entry with the reason in `unbudgeted_urls`.
+    """
+
+    urlconf = None
+    data_sizes = (1, 10, 100)
+    query_budgets = ()
+    unbudgeted_urls = {}
+
+    def create_data(self, size):
+        raise NotImplementedError
+
+    def test_every_endpoint_has_a_budget(self):
+        app_name = getattr(self.urlconf, 'app_name', None)
+        budgeted = {budget.url_name for budget in self.query_budgets} | set(self.unbudgeted_urls)
+
+        missing = [name for name in url_names(self.urlconf.urlpatterns, app_name) if name not in budgeted]
+
+        self.assertFalse(missing, f'Endpoints without a query budget: {", ".join(missing)}')
+
+    def test_query_budgets(self):
+        for budget in self.query_budgets:
+            with self.subTest(endpoint=str(budget)):
+                self.check_query_budget(budget)
+
+    def check_query_budget(self, budget):
+        runs = {}
+        for size in self.data_sizes:
+            savepoint = transaction.savepoint()
+            try:
+                self.create_data(size)
+                runs[size] = self.run_budget(budget, size)
+            finally:
+                transaction.savepoint_rollback(savepoint)
+
+        counts = {size: len(queries) for size, queries in runs.items()}
+        sizes = list(runs)
+        for smaller, larger in zip(sizes, sizes[1:]):
+            if counts[larger] > counts[smaller]:
+                self.fail(f'{budget} runs more queries with more data, {counts} by data size:\n'
+                          f'{format_growth(runs)}')
+        for size, queries in runs.items():
+            if len(queries) > budget.queries:
+                self.fail(f'{budget} ran {len(queries)} queries with {size} items, its budget is '
+                          f'{budget.queries}:\n{format_queries(queries)}')
+
+    def run_budget(self, budget, size):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        tagged_cache.clear_local()
+        _local_states.clear()
+
+        user = getattr(self, budget.user) if budget.user else None
+        if user is not None:
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {create_custom_token(user).access_token}')
+        else:
+            self.client.credentials()
+        url = reverse(budget.url_name, args=budget.args(self) if budget.args else None)
+        params = budget.params(self) if budget.params else None
+        if params:
+            url = f'{url}?{urlencode(params, doseq=True)}'
+
+        request = getattr(self.client, budget.method)
+        data = budget.data(self) if budget.data else None
+        with QueryRecorder() as recorder:
+            if budget.method == 'get':
+                response = request(url)
+            else:
+                response = request(url, data, format=budget.format)
+
+        self.assertLess(response.status_code, 400,
+                        f'{budget} failed with {size} items: {response.status_code} {response.content[:1000]!r}')
+        return recorder.queries
+
@@ -1,11 +1,41 @@
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+
+from utils.blacklist import get_blacklist_backend
+
+# User fields copied into the token, see `utils.authentication.ClaimsJWTAuthentication`.
+USER_CLAIMS = ('role', 'status', 'is_staff')
+
+
+class CustomRefreshToken(RefreshToken):
+    """
+    Refresh token which keeps its blacklist in the configured `TOKEN_BLACKLIST` backend.
+    """
+
+    def check_blacklist(self):
+        if get_blacklist_backend().is_blacklisted(self[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        if not get_blacklist_backend().blacklist(self):
+            raise TokenError(_("Token is blacklisted"))
+
+    @classmethod
+    def for_user(cls, user):
+        # Skip the outstanding token row of `BlacklistMixin`, the backend decides what to store.
+        token = super(BlacklistMixin, cls).for_user(user)
+        get_blacklist_backend().register(token, user)
+        return token
 
 
 def create_custom_token(user):
     # Create a new RefreshToken and customize its payload
-    token = RefreshToken.for_user(user)
+    token = CustomRefreshToken.for_user(user)
 
-    # Add custom claim (user role) to the token payload
-    token['role'] = user.role  # Adjust this based on your User model field for roles
+    # Add custom claims (user role, status and staff flag) to the token payload
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
 
     return token
@@ -0,0 +1,197 @@
+import posixpath
+import re
+from io import BytesIO
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from drf_spectacular.utils import extend_schema
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound, \
+    PermissionDenied, ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from utils.cache import tagged_cache
+from utils.db import get_database_metrics
+from utils.instrumentation import render_metrics
+from utils.parsers import ORJSONParser
+from utils.renderers import ORJSONRenderer
+from utils.schema import SCHEMA_FORMATS, SchemaNotBuilt, schema_store
+from utils.storage import is_valid_media_signature, protected_storage
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncJSONView(View):
+    """
+    Base class for async JSON endpoints served by the ASGI application.
+
+    DRF views cannot be async, so this parses the JSON body into `request.data`, authenticates the
+    request and checks the permissions like DRF does, and renders `APIException`s the way DRF's
+    exception handler does. The DRF request wrapping the request is available as `drf_request`,
+    e.g. for the serializer context.
+    """
+
+    authentication_classes = ()
+    permission_classes = ()
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.drf_request = Request(request, authenticators=[auth() for auth in self.authentication_classes])
+        try:
+            request.data = self.parse(request)
+            await self.check_permissions(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(exc)
+
+    @staticmethod
+    def parse(request):
+        if not request.body:
+            return {}
+        return ORJSONParser().parse(BytesIO(request.body))
+
+    async def check_permissions(self, request):
+        if self.authentication_classes:
+            # Authenticators may use the cache, which is sync only.
+            request.user = await sync_to_async(lambda: self.drf_request.user)()
+        for permission in self.permission_classes:
+            if not permission().has_permission(self.drf_request, self):
+                if self.authentication_classes and not self.drf_request.successful_authenticator:
+                    raise NotAuthenticated()
+                raise PermissionDenied(getattr(permission, 'message', None))
+
+    def handle_exception(self, exc):
+        data = exc.detail if isinstance(exc, ValidationError) else {'detail': exc.detail}
+        response = JsonResponse(data, status=exc.status_code, safe=False)
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)) and self.authentication_classes:
+            response['WWW-Authenticate'] = self.authentication_classes[0]().authenticate_header(self.drf_request)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = str(int(exc.wait))
+        return response
+
+    @staticmethod
+    def render(data, status=200):
+        """
+        JSON response rendered like the responses of the sync views.
+        """
+        return HttpResponse(ORJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+class PrometheusMetricsView(View):
+    """
+    Request metrics of all processes for Prometheus.
+
+    Prometheus scrapes the application servers directly with the `METRICS_TOKEN` bearer token, nginx
+    does not pass it on. Without a configured token the metrics are not served at all.
+    """
+
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        if not token or not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponseForbidden()
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class SchemaView(View):
+    """
+    The OpenAPI schema, prebuilt by `manage.py build_schema`, see `utils.schema`.
+
+    YAML by default, JSON with `?format=json` or an `Accept` header asking for JSON. The response is
+    gzipped when the client accepts it, and its ETag lets clients revalidate it for free.
+    """
+
+    accepts_gzip = re.compile(r'\bgzip\b')
+
+    def get(self, request):
+        schema_format = request.GET.get('format')
+        if schema_format is None:
+            schema_format = 'json' if 'json' in request.headers.get('Accept', '') else 'yaml'
+        if schema_format not in SCHEMA_FORMATS:
+            return HttpResponse(f"Unknown format, use one of {', '.join(SCHEMA_FORMATS)}.", status=400,
+                                content_type='text/plain')
+        try:
+            artifact = schema_store.get(schema_format)
+        except SchemaNotBuilt as exc:
+            return HttpResponse(str(exc), status=503, content_type='text/plain')
+
+        gzipped = bool(self.accepts_gzip.search(request.headers.get('Accept-Encoding', '')))
+        etag = artifact.etag(gzipped)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(artifact.compressed if gzipped else artifact.content,
+                                    content_type=artifact.content_type)
+            if gzipped:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
+
+
+class ProtectedMediaView(APIView):
+    """
+    Serve a file of the protected storage to the holders of its signed URL, see
+    `utils.storage.ProtectedContentHashStorage`.
+
+    Django only checks the signature, the file is sent by nginx from the internal location the
+    `X-Accel-Redirect` header points to.
+    """
+
+    # Browsers fetch images without the Authorization header, the signed URL is the authorization.
+    authentication_classes = ()
+    permission_classes = ()
+
+    @extend_schema(exclude=True)
+    def get(self, request, path):
+        path = posixpath.normpath(path)
+        if path.startswith(('/', '../')) or path in ('.', '..'):
+            raise NotFound()
+        if not is_valid_media_signature(path, request.query_params.get('expires'),
+                                        request.query_params.get('signature')):
+            raise PermissionDenied('The URL is invalid or has expired.')
+
+        if settings.DEBUG:
+            # There is no nginx in front of the development server.
+            storage = protected_storage()
+            if not storage.exists(path):
+                raise NotFound()
+            return FileResponse(storage.open(path))
+
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = settings.PROTECTED_MEDIA_INTERNAL_URL + quote(path)
+        # Let nginx set the content type of the file.
+        del response['Content-Type']
+        return response
+
+
+class CacheMetricsView(APIView):
+    """
+    Hit and miss counts of the cached API responses and querysets, summed over all processes.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses={200: dict})
+    def get(self, request):
+        return Response(tagged_cache.metrics.get())
+
+
+class DatabaseMetricsView(APIView):
+    """
+    Database connection usage of the application and of the database server or PgBouncer.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses={200: dict})
+    def get(self, request):
+        return Response(get_database_metrics())